@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Benchmark per-request allocations: plain session.run vs I/O-bound buffers
+Runs locally against sentiment-model.onnx (no S3 needed)
+
+Usage:
+    python bench_allocations.py [model.onnx] [requests]
+"""
+
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import onnxruntime as ort
+
+from inference_onnx import preprocess_text_input, preprocess_text_input_into
+from weave_runtime.execution_context import ExecutionContext
+
+MODEL_FILE = sys.argv[1] if len(sys.argv) > 1 else "sentiment-model.onnx"
+REQUESTS = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+
+TEXTS = [
+    "This product is amazing! I love it!",
+    "Terrible quality. Would not recommend.",
+    "Best purchase ever! Highly recommend!",
+    "Not good at all. Disappointed.",
+    "It's okay, nothing special.",
+]
+
+
+def run_plain(session, input_name, text):
+    """Legacy path: fresh feature array + fresh outputs every call"""
+    input_data = preprocess_text_input(text)
+    return session.run(None, {input_name: input_data})
+
+
+def run_bound(ctx, text):
+    """Bound path: features written in place, outputs reused"""
+    features = ctx.input_buffer(1)
+    preprocess_text_input_into(text, features[0])
+    return ctx.run(1)
+
+
+def measure(name, fn):
+    """Report latency percentiles and transient bytes allocated per request"""
+    # Warm up (creates pooled buffers, primes ORT kernels)
+    for text in TEXTS:
+        fn(text)
+
+    latencies = np.empty(REQUESTS, dtype=np.float64)
+    for i in range(REQUESTS):
+        text = TEXTS[i % len(TEXTS)]
+        start = time.perf_counter_ns()
+        fn(text)
+        latencies[i] = (time.perf_counter_ns() - start) / 1000.0
+
+    tracemalloc.start()
+    transient = np.empty(REQUESTS, dtype=np.int64)
+    for i in range(REQUESTS):
+        text = TEXTS[i % len(TEXTS)]
+        before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        fn(text)
+        _, peak = tracemalloc.get_traced_memory()
+        transient[i] = peak - before
+    tracemalloc.stop()
+
+    p50, p99 = np.percentile(latencies, [50, 99])
+    print(f"  {name:8s} p50={p50:7.1f}us  p99={p99:7.1f}us  "
+          f"alloc/request={transient.mean():8.0f} B (max {transient.max()} B)")
+
+
+if __name__ == "__main__":
+    print("="*70)
+    print(f"ALLOCATION BENCHMARK: {MODEL_FILE} ({REQUESTS} requests)")
+    print("="*70)
+
+    session = ort.InferenceSession(MODEL_FILE, providers=['CPUExecutionProvider'])
+    input_name = session.get_inputs()[0].name
+    ctx = ExecutionContext(session)
+
+    # Both paths must agree before their timings mean anything
+    for text in TEXTS:
+        plain = run_plain(session, input_name, text)[0]
+        bound = run_bound(ctx, text)[0]
+        assert np.allclose(plain, bound), f"Outputs differ for: {text}"
+
+    measure("plain", lambda text: run_plain(session, input_name, text))
+    measure("bound", lambda text: run_bound(ctx, text))
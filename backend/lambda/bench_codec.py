@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Benchmark response encoding across batch sizes, codecs and float precision
+Builds realistic classifier responses with postprocess_batch (no model needed)
+
+Usage:
+    python bench_codec.py [repeats]
+"""
+
+import sys
+import time
+
+import numpy as np
+
+from weave_runtime.codec import CODECS, get_codec, orjson
+from weave_runtime.postprocess import postprocess_batch
+
+REPEATS = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+BATCH_SIZES = [1, 8, 64, 256, 1024]
+PRECISIONS = [None, 4]
+
+
+def build_response(batch_size, precision):
+    """Response body shaped like the handler's for a batch of 2-class scores"""
+    rng = np.random.default_rng(batch_size)
+    logits = rng.standard_normal((batch_size, 2)).astype(np.float32)
+    probs = np.exp(logits) / np.exp(logits).sum(axis=1, keepdims=True)
+    return {
+        'prediction': postprocess_batch(probs.astype(np.float32), precision=precision),
+        'model': 'sentiment-model.onnx',
+        'uid': 'user123',
+        'batch_size': batch_size,
+        'latency_ms': 3,
+        'cached': True,
+        'model_type': 'onnx',
+    }
+
+
+def time_encode(codec, body):
+    """Median encode time in microseconds"""
+    samples = np.empty(REPEATS, dtype=np.float64)
+    for i in range(REPEATS):
+        start = time.perf_counter_ns()
+        codec.dumps(body)
+        samples[i] = (time.perf_counter_ns() - start) / 1000.0
+    return float(np.median(samples))
+
+
+if __name__ == "__main__":
+    names = [name for name in CODECS if name != 'orjson' or orjson is not None]
+
+    print("="*70)
+    print(f"CODEC BENCHMARK ({REPEATS} repeats, codecs: {', '.join(names)})")
+    print("="*70)
+    print(f"  {'codec':8s} {'batch':>6s} {'precision':>9s} {'encode_us':>10s} {'bytes':>9s}")
+
+    for name in names:
+        codec = get_codec(name)
+        for batch_size in BATCH_SIZES:
+            for precision in PRECISIONS:
+                body = build_response(batch_size, precision)
+                encode_us = time_encode(codec, body)
+                size = len(codec.dumps(body).encode('utf-8'))
+                print(f"  {name:8s} {batch_size:6d} {str(precision):>9s} {encode_us:10.1f} {size:9d}")
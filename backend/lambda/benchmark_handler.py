@@ -0,0 +1,375 @@
+#!/usr/bin/env python3
+"""
+Reproducible benchmark suite for the inference handler
+Drives inference_onnx.lambda_handler in-process against local model files
+
+Covers: cold vs warm, batch sizes 1-1024, input lengths, every model
+generator that can build offline, and mock vs real inference. Results
+(throughput, p50/p95/p99, allocations) go to a JSON file.
+
+Usage:
+    python benchmark_handler.py                 # full suite -> bench_results.json
+    python benchmark_handler.py --quick         # CI-sized run
+    python benchmark_handler.py --output out.json --models smart_sentiment_model
+"""
+
+import argparse
+import glob
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# Generators that only need numpy + onnx; the rest are tried and skipped if
+# their dependencies (torch, transformers, scikit-learn) aren't installed
+GENERATORS = [
+    'create_simple_onnx.py',
+    'create_text_onnx.py',
+    'create_sklearn_model.py',
+    'create_better_demo_model.py',
+    'create_accurate_sentiment_model.py',
+    'create_smart_sentiment_model.py',
+    'create_demo_model.py',
+]
+
+# Downloads a pretrained transformer and pip-installs packages: opt-in only
+NETWORK_GENERATORS = [
+    'create_real_sentiment_model.py',
+]
+
+BATCH_SIZES = [1, 8, 64, 256, 1024]
+INPUT_LENGTHS = [16, 128, 512]
+QUICK_BATCH_SIZES = [1, 64]
+QUICK_INPUT_LENGTHS = [128]
+
+MOCK_MODEL = 'mock-missing-model.onnx'
+BENCH_UID = 'bench'
+
+# Corpus vocabulary: sentiment keywords the preprocessor reacts to, plus filler
+CORPUS_WORDS = (
+    'love great excellent amazing wonderful good nice happy recommend quality value '
+    'hate bad terrible awful horrible worst poor disappointing waste broken useless '
+    'the a product service it was is this really very not never would quite and but '
+    'delivery price box order again time day experience support team color size'
+).split()
+
+
+def synthetic_corpus(count: int, length: int, seed: int = 1234) -> list:
+    """Deterministic sentences of roughly `length` characters"""
+    rng = random.Random(seed * 100003 + length)
+    texts = []
+    for _ in range(count):
+        words = []
+        size = 0
+        while size < length:
+            word = rng.choice(CORPUS_WORDS)
+            words.append(word)
+            size += len(word) + 1
+        texts.append(' '.join(words)[:length])
+    return texts
+
+
+def build_model_variants(model_dir: str, include_network: bool = False, only: list = None,
+                         timeout: int = 600) -> dict:
+    """
+    Run each model generator in a scratch directory and collect its .onnx output
+
+    Generators all write into their working directory (most to
+    sentiment-model.onnx), so each runs in its own temp dir and the result is
+    renamed to <variant>.onnx inside model_dir.
+
+    Returns:
+        {variant: {"path": ..., "build_s": ...} or {"skipped": reason}}
+    """
+    os.makedirs(model_dir, exist_ok=True)
+    variants = {}
+
+    # The checked-in model is always available
+    checked_in = os.path.join(HERE, 'sentiment-model.onnx')
+    if os.path.exists(checked_in) and (not only or 'repo_sentiment_model' in only):
+        shutil.copy2(checked_in, os.path.join(model_dir, 'repo_sentiment_model.onnx'))
+        variants['repo_sentiment_model'] = {
+            'path': os.path.join(model_dir, 'repo_sentiment_model.onnx'), 'build_s': 0.0
+        }
+
+    generators = GENERATORS + (NETWORK_GENERATORS if include_network else [])
+    for script in generators:
+        variant = os.path.splitext(script)[0].replace('create_', '', 1)
+        if only and variant not in only:
+            continue
+
+        print(f"  Building {variant}...")
+        workdir = tempfile.mkdtemp(prefix=f"weave_{variant}_")
+        start = time.perf_counter()
+        try:
+            proc = subprocess.run(
+                [sys.executable, os.path.join(HERE, script)],
+                cwd=workdir, capture_output=True, text=True, timeout=timeout
+            )
+            built = sorted(glob.glob(os.path.join(workdir, '*.onnx')))
+            if proc.returncode != 0 or not built:
+                reason = (proc.stderr.strip().splitlines() or ['no .onnx produced'])[-1]
+                variants[variant] = {'skipped': reason}
+                print(f"    [SKIP] {reason}")
+                continue
+
+            target = os.path.join(model_dir, f"{variant}.onnx")
+            shutil.move(built[0], target)
+            variants[variant] = {'path': target, 'build_s': round(time.perf_counter() - start, 3)}
+        except subprocess.TimeoutExpired:
+            variants[variant] = {'skipped': f'timed out after {timeout}s'}
+            print("    [SKIP] timed out")
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    return variants
+
+
+def percentiles(samples_ms: list) -> dict:
+    """p50/p95/p99/mean of a list of latencies"""
+    ordered = sorted(samples_ms)
+    n = len(ordered)
+
+    def pick(q):
+        return round(ordered[min(n - 1, max(0, int(q / 100.0 * n + 0.5) - 1))], 4)
+
+    return {
+        'p50_ms': pick(50),
+        'p95_ms': pick(95),
+        'p99_ms': pick(99),
+        'mean_ms': round(sum(ordered) / n, 4),
+    }
+
+
+def make_event(model_name: str, texts: list) -> dict:
+    """Function URL-style event for a batch (a single string for batch 1)"""
+    body = {
+        'uid': BENCH_UID,
+        'model_name': model_name,
+        'input': texts if len(texts) > 1 else texts[0],
+    }
+    return {'body': json.dumps(body), 'headers': {}}
+
+
+def invoke(handler, event: dict) -> float:
+    """Call the handler once and return its latency in ms (raises on non-200)"""
+    start = time.perf_counter_ns()
+    response = handler.lambda_handler(event, None)
+    elapsed = (time.perf_counter_ns() - start) / 1e6
+    if response['statusCode'] != 200:
+        raise RuntimeError(f"Handler returned {response['statusCode']}: {response['body'][:200]}")
+    return elapsed
+
+
+def bench_warm(handler, model_name: str, batch_size: int, length: int, iterations: int,
+               alloc_iterations: int) -> dict:
+    """Warm latency, throughput and allocations for one scenario"""
+    texts = synthetic_corpus(batch_size, length)
+    event = make_event(model_name, texts)
+
+    # Make sure the model (and the pooled buffers for this batch size) are warm
+    for _ in range(3):
+        invoke(handler, event)
+
+    samples = []
+    wall_start = time.perf_counter()
+    for _ in range(iterations):
+        samples.append(invoke(handler, event))
+    wall_s = time.perf_counter() - wall_start
+
+    tracemalloc.start()
+    peaks = []
+    for _ in range(alloc_iterations):
+        before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        invoke(handler, event)
+        _, peak = tracemalloc.get_traced_memory()
+        peaks.append(peak - before)
+    tracemalloc.stop()
+
+    result = {
+        'phase': 'warm',
+        'batch_size': batch_size,
+        'input_length': length,
+        'iterations': iterations,
+        'requests_per_s': round(iterations / wall_s, 2),
+        'items_per_s': round(iterations * batch_size / wall_s, 2),
+        'alloc_bytes_per_request': int(sum(peaks) / len(peaks)) if peaks else None,
+    }
+    result.update(percentiles(samples))
+    return result
+
+
+def bench_cold_load(handler, model_name: str, repeats: int) -> dict:
+    """In-process cold load: drop the cached model, then time the next request"""
+    event = make_event(model_name, synthetic_corpus(1, 128))
+    samples = []
+    for _ in range(repeats):
+        handler.reset_model_cache()
+        samples.append(invoke(handler, event))
+    result = {'phase': 'cold_load', 'batch_size': 1, 'input_length': 128, 'iterations': repeats}
+    result.update(percentiles(samples))
+    return result
+
+
+def bench_cold_process(model_dir: str, model_name: str, repeats: int) -> dict:
+    """
+    Fresh interpreter per sample: module import plus first request
+
+    This is the closest local stand-in for a Lambda cold start.
+    """
+    script = (
+        "import json, time\n"
+        "t0 = time.perf_counter()\n"
+        "import inference_onnx as h\n"
+        "t1 = time.perf_counter()\n"
+        f"event = {{'uid': {BENCH_UID!r}, 'model_name': {model_name!r}, 'input': 'great product'}}\n"
+        "r = h.lambda_handler(event, None)\n"
+        "t2 = time.perf_counter()\n"
+        "print(json.dumps({'import_ms': (t1 - t0) * 1000, 'first_ms': (t2 - t1) * 1000,"
+        " 'status': r['statusCode']}))\n"
+    )
+    env = dict(os.environ, LOCAL_MODEL_DIR=model_dir, EMF_METRICS='0', LOG_LEVEL='ERROR')
+
+    imports, firsts = [], []
+    for _ in range(repeats):
+        proc = subprocess.run([sys.executable, '-c', script], cwd=HERE, env=env,
+                              capture_output=True, text=True)
+        if proc.returncode != 0:
+            reason = (proc.stderr.strip().splitlines() or [f'exit status {proc.returncode}'])[-1]
+            raise RuntimeError(f"Cold-process sample for {model_name} failed: {reason}\n{proc.stderr}")
+        sample = json.loads(proc.stdout.strip().splitlines()[-1])
+        if sample['status'] != 200:
+            raise RuntimeError(f"Cold-process first request for {model_name} returned {sample['status']}")
+        imports.append(sample['import_ms'])
+        firsts.append(sample['first_ms'])
+
+    result = {'phase': 'cold_process', 'batch_size': 1, 'input_length': 13, 'iterations': repeats}
+    result['import'] = percentiles(imports)
+    result['first_request'] = percentiles(firsts)
+    result.update(percentiles([a + b for a, b in zip(imports, firsts)]))
+    return result
+
+
+def environment_info() -> dict:
+    """Versions and host details recorded alongside the results"""
+    import numpy
+    import onnxruntime
+
+    info = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'numpy': numpy.__version__,
+        'onnxruntime': onnxruntime.__version__,
+    }
+    try:
+        info['git_commit'] = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=HERE, capture_output=True, text=True
+        ).stdout.strip() or None
+    except OSError:
+        info['git_commit'] = None
+    return info
+
+
+def run_suite(args) -> dict:
+    """Build models, then benchmark every variant (plus the mock path)"""
+    batch_sizes = QUICK_BATCH_SIZES if args.quick else BATCH_SIZES
+    lengths = QUICK_INPUT_LENGTHS if args.quick else INPUT_LENGTHS
+    item_budget = 2000 if args.quick else 20000
+
+    model_dir = args.model_dir or tempfile.mkdtemp(prefix='weave_bench_models_')
+
+    print("\n[1/3] Building model variants...")
+    variants = build_model_variants(model_dir, args.include_network, args.models)
+
+    # Configure the handler before importing it: it reads env at import time
+    os.environ['LOCAL_MODEL_DIR'] = model_dir
+    os.environ.setdefault('EMF_METRICS', '0')
+    os.environ.setdefault('LOG_LEVEL', 'ERROR')
+    os.environ.setdefault('HISTOGRAM_FLUSH_EVERY', str(10**9))
+    os.environ.setdefault('HISTOGRAM_FLUSH_SECONDS', str(10**9))
+    sys.path.insert(0, HERE)
+    import inference_onnx as handler
+
+    targets = [(name, info['path']) for name, info in variants.items() if 'path' in info]
+    if not args.models or 'mock' in args.models:
+        targets.append(('mock', None))
+
+    print("\n[2/3] Benchmarking...")
+    results = []
+    for variant, path in targets:
+        model_name = os.path.basename(path) if path else MOCK_MODEL
+        print(f"  {variant}")
+
+        entry = {'variant': variant, 'path': 'real' if path else 'mock',
+                 'model_bytes': os.path.getsize(path) if path else None, 'scenarios': []}
+
+        entry['scenarios'].append(bench_cold_load(handler, model_name, 3 if args.quick else 10))
+        if not args.skip_process:
+            entry['scenarios'].append(bench_cold_process(model_dir, model_name, 2 if args.quick else 5))
+
+        handler.reset_model_cache()
+        for batch_size in batch_sizes:
+            for length in lengths:
+                iterations = max(10, min(500, item_budget // batch_size))
+                alloc_iterations = max(3, iterations // 10)
+                scenario = bench_warm(handler, model_name, batch_size, length,
+                                      iterations, alloc_iterations)
+                entry['scenarios'].append(scenario)
+                print(f"    batch={batch_size:5d} len={length:4d} "
+                      f"p50={scenario['p50_ms']:8.3f}ms p99={scenario['p99_ms']:8.3f}ms "
+                      f"{scenario['items_per_s']:10.0f} items/s")
+        results.append(entry)
+
+    if not args.model_dir:
+        shutil.rmtree(model_dir, ignore_errors=True)
+
+    return {
+        'suite': 'weave-inference-handler',
+        'version': 1,
+        'created': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'quick': args.quick,
+        'environment': environment_info(),
+        'variants': {name: {k: v for k, v in info.items() if k != 'path'}
+                     for name, info in variants.items()},
+        'results': results,
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--output', default='bench_results.json', help='Results JSON file')
+    parser.add_argument('--quick', action='store_true', help='Small CI-sized run')
+    parser.add_argument('--models', nargs='*', help='Only these variants (and/or "mock")')
+    parser.add_argument('--model-dir', help='Keep built models here instead of a temp dir')
+    parser.add_argument('--include-network', action='store_true',
+                        help='Also run generators that download models / pip install')
+    parser.add_argument('--skip-process', action='store_true',
+                        help='Skip fresh-interpreter cold start samples')
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+
+    print("="*70)
+    print(" "*18 + "INFERENCE HANDLER BENCHMARK")
+    print("="*70)
+
+    report = run_suite(args)
+
+    print(f"\n[3/3] Writing {args.output}...")
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    print(f"\n[SUCCESS] {len(report['results'])} variants benchmarked -> {args.output}")
@@ -0,0 +1,220 @@
+"""
+Content-addressed build cache shared by the package builders
+Wheels cached by URL and hash, extracted once into reusable layers, deterministic zips
+
+Layout (WEAVE_BUILD_CACHE, default ~/.cache/weave-build):
+    wheels/<sha256(url)>/<file>.whl + meta.json   downloaded wheels, hash verified
+    layers/<sha256(wheel)>/                       extracted wheels, read-only inputs
+    pip/<sha256(requirements + flags)>/           pip --target installs
+    artifacts/<kind>-<fingerprint>.zip            assembled dependency zips
+"""
+
+import fnmatch
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import urllib.request
+import zipfile
+
+CACHE_DIR = os.environ.get('WEAVE_BUILD_CACHE',
+                           os.path.join(os.path.expanduser('~'), '.cache', 'weave-build'))
+
+# Fixed zip metadata so identical content gives byte-identical archives
+ZIP_EPOCH = (1980, 1, 1, 0, 0, 0)
+NATIVE_PATTERNS = ['*.so', '*.so.*']
+
+# Never shipped from dependency layers (matches build_clean_package)
+EXCLUDE_PATTERNS = ['*.dist-info', '__pycache__', '*.pyc']
+
+
+def sha256_file(path: str) -> str:
+    """Hex SHA-256 of a file"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def sha256_text(text: str) -> str:
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def cache_path(*parts) -> str:
+    path = os.path.join(CACHE_DIR, *parts)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return path
+
+
+def cached_wheel(url: str, sha256: str = None) -> tuple:
+    """
+    Download a wheel once; later calls reuse it after re-checking its hash
+
+    Args:
+        url: Wheel URL; a "#sha256=..." fragment (as on PyPI) is verified
+        sha256: Expected hash, overrides the URL fragment
+
+    Returns:
+        (wheel_path, sha256, hit)
+    """
+    url, _, fragment = url.partition('#')
+    if sha256 is None and fragment.startswith('sha256='):
+        sha256 = fragment[len('sha256='):]
+
+    entry_dir = cache_path('wheels', sha256_text(url), '')
+    wheel_path = os.path.join(entry_dir, url.rsplit('/', 1)[-1])
+    meta_path = os.path.join(entry_dir, 'meta.json')
+
+    if os.path.exists(wheel_path) and os.path.exists(meta_path):
+        with open(meta_path) as f:
+            meta = json.load(f)
+        actual = sha256_file(wheel_path)
+        if actual == meta['sha256'] and (sha256 is None or actual == sha256):
+            return wheel_path, actual, True
+
+    fd, temp_path = tempfile.mkstemp(dir=entry_dir, suffix='.part')
+    os.close(fd)
+    try:
+        urllib.request.urlretrieve(url, temp_path)
+        actual = sha256_file(temp_path)
+        if sha256 is not None and actual != sha256:
+            raise ValueError(f"Hash mismatch for {url}: expected {sha256}, got {actual}")
+        os.replace(temp_path, wheel_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+    with open(meta_path, 'w') as f:
+        json.dump({'url': url, 'sha256': actual}, f)
+    return wheel_path, actual, False
+
+
+def extracted_layer(wheel_path: str, sha256: str = None) -> tuple:
+    """
+    Extract a wheel into layers/<sha256>/ once and reuse it afterwards
+
+    Returns:
+        (layer_dir, hit)
+    """
+    sha256 = sha256 or sha256_file(wheel_path)
+    layer_dir = cache_path('layers', sha256)
+    if os.path.isdir(layer_dir):
+        return layer_dir, True
+
+    temp_dir = tempfile.mkdtemp(dir=os.path.dirname(layer_dir), prefix='.extract-')
+    try:
+        with zipfile.ZipFile(wheel_path) as zf:
+            zf.extractall(temp_dir)
+        os.replace(temp_dir, layer_dir)
+    except OSError:
+        # Lost a race with another build extracting the same wheel
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        if not os.path.isdir(layer_dir):
+            raise
+    return layer_dir, False
+
+
+def pip_layer(requirements: list, pip_args: list = None) -> tuple:
+    """
+    `pip install --target` into a cache directory keyed by requirements and flags
+
+    Pinned requirements give stable layers; unpinned ones are cached as-is
+    until the cache entry is deleted.
+
+    Returns:
+        (layer_dir, fingerprint, hit)
+    """
+    pip_args = list(pip_args or [])
+    fingerprint = sha256_text(json.dumps([sorted(requirements), pip_args, sys.version_info[:2]]))
+    layer_dir = cache_path('pip', fingerprint)
+    if os.path.isdir(layer_dir):
+        return layer_dir, fingerprint, True
+
+    temp_dir = tempfile.mkdtemp(dir=os.path.dirname(layer_dir), prefix='.install-')
+    cmd = [sys.executable, '-m', 'pip', 'install', '--quiet', '--target', temp_dir] + pip_args + requirements
+    try:
+        subprocess.run(cmd, check=True)
+        os.replace(temp_dir, layer_dir)
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+    return layer_dir, fingerprint, False
+
+
+def matches(name: str, patterns: list) -> bool:
+    return any(fnmatch.fnmatch(name, pattern) for pattern in patterns)
+
+
+def directory_entries(source_dir: str, prefix: str = '', exclude: list = None) -> list:
+    """(arcname, path) pairs for every file under source_dir, sorted"""
+    exclude = exclude or []
+    entries = []
+    for dirpath, dirs, files in os.walk(source_dir):
+        dirs[:] = sorted(d for d in dirs if not matches(d, exclude))
+        for name in files:
+            if matches(name, exclude):
+                continue
+            path = os.path.join(dirpath, name)
+            arcname = prefix + os.path.relpath(path, source_dir).replace(os.sep, '/')
+            entries.append((arcname, path))
+    return sorted(entries)
+
+
+def layer_entries(layer_dirs: list, prefix: str = '') -> list:
+    """Entries for several layers; a later layer wins on duplicate paths"""
+    merged = {}
+    for layer_dir in layer_dirs:
+        for arcname, path in directory_entries(layer_dir, prefix, EXCLUDE_PATTERNS):
+            merged[arcname] = path
+    return sorted(merged.items())
+
+
+def write_deterministic_zip(entries: list, zip_path: str, mode: str = 'w') -> int:
+    """
+    Write (arcname, path) entries so identical content gives identical bytes
+
+    Entries are written in the given order with timestamps fixed to
+    1980-01-01 and permissions normalized (0755 for native libs, 0644
+    otherwise). mode='a' appends to an existing deterministic zip.
+
+    Returns:
+        Size of the zip in bytes
+    """
+    with zipfile.ZipFile(zip_path, mode, zipfile.ZIP_DEFLATED, compresslevel=9) as zf:
+        for arcname, path in entries:
+            info = zipfile.ZipInfo(arcname, date_time=ZIP_EPOCH)
+            info.compress_type = zipfile.ZIP_DEFLATED
+            perms = 0o755 if matches(arcname.rsplit('/', 1)[-1], NATIVE_PATTERNS) else 0o644
+            info.external_attr = (0o100000 | perms) << 16
+            info.create_system = 3
+            with open(path, 'rb') as f:
+                zf.writestr(info, f.read())
+    return os.path.getsize(zip_path)
+
+
+def cached_artifact(kind: str, fingerprint: str, entries_fn) -> tuple:
+    """
+    artifacts/<kind>-<fingerprint>.zip, built by zipping entries_fn() on a miss
+
+    Returns:
+        (zip_path, hit)
+    """
+    zip_path = cache_path('artifacts', f"{kind}-{fingerprint[:16]}.zip")
+    if os.path.exists(zip_path):
+        return zip_path, True
+
+    temp_path = zip_path + '.part'
+    write_deterministic_zip(entries_fn(), temp_path)
+    os.replace(temp_path, zip_path)
+    return zip_path, False
+
+
+def fingerprint_entries(entries: list) -> str:
+    """Hash of arcnames and file contents: changes iff the zip content would"""
+    digest = hashlib.sha256()
+    for arcname, path in entries:
+        digest.update(arcname.encode('utf-8') + b'\0' + sha256_file(path).encode('ascii') + b'\n')
+    return digest.hexdigest()
@@ -8,7 +8,6 @@ import os
 import sys
 import shutil
 import zipfile
-import urllib.request
 import subprocess
 
 PACKAGE_DIR = "lambda_clean"
@@ -28,13 +27,12 @@ WHEELS = {
 }
 
 def download_wheel(name, url, dest_dir):
-    """Download a wheel file"""
-    filename = url.split('/')[-1]
-    filepath = os.path.join(dest_dir, filename)
+    """Download a wheel file (reused from the build cache when already fetched)"""
+    from build_cache import cached_wheel
     
-    print(f"  Downloading {name}...")
     try:
-        urllib.request.urlretrieve(url, filepath)
+        filepath, _, hit = cached_wheel(url)
+        print(f"  {'Cached' if hit else 'Downloaded'} {name}")
         return filepath
     except Exception as e:
         print(f"  ERROR: {e}")
@@ -85,6 +83,8 @@ def create_package():
     # Copy Lambda handler
     print("\n[*] Copying Lambda handler...")
     shutil.copy2("inference_onnx.py", os.path.join(PACKAGE_DIR, "inference_onnx.py"))
+    shutil.copytree("weave_runtime", os.path.join(PACKAGE_DIR, "weave_runtime"),
+                    ignore=shutil.ignore_patterns("__pycache__", "*.pyc"))
     
     # Create zip
     print("\n[*] Creating deployment package...")
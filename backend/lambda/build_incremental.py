@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+Incremental, content-addressed Lambda package build
+Rebuilds only what changed; handler-only changes produce a handler-only artifact
+
+Dependencies come from cached wheels (build_clean_package's pinned URLs) or a
+cached pip --target install, each extracted once into an immutable layer. The
+dependency zip is keyed by the layers' hashes and reused as long as they don't
+change, so a handler edit costs one tiny zip plus an append. All zips are
+deterministic: unchanged content is byte-identical across builds and machines.
+
+Outputs (current directory):
+    lambda-handler-only.zip     handlers + weave_runtime (for a function with the deps layer)
+    lambda-deployment.zip       full package (deps + handler), assembled from the cached deps zip
+    lambda-layer.zip            deps under python/ for a Lambda layer (--layer or --deploy)
+    .build_state.json           fingerprints of the last build and deploy
+
+Usage:
+    python build_incremental.py                       # build, report what changed
+    python build_incremental.py --source pip          # deps via pip (manylinux wheels)
+    python build_incremental.py --deploy              # publish layer if deps changed, then code
+"""
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import time
+
+import build_cache
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+LAMBDA_FUNCTION_NAME = "weave-inference"
+LAYER_NAME = "weave-inference-deps"
+BUCKET = "weave-model-storage"
+
+HANDLER_ZIP = "lambda-handler-only.zip"
+FULL_ZIP = "lambda-deployment.zip"
+LAYER_ZIP = "lambda-layer.zip"
+STATE_FILE = ".build_state.json"
+
+# validate_upload.py is the upload-validation function, deployed from the same code
+HANDLER_FILES = ["inference_onnx.py", "validate_upload.py"]
+HANDLER_PACKAGES = ["weave_runtime"]
+
+PIP_REQUIREMENTS = ["onnxruntime", "numpy", "orjson"]
+PIP_ARGS = ["--platform", "manylinux2014_x86_64", "--only-binary=:all:",
+            "--python-version", "3.11", "--implementation", "cp"]
+
+# Direct upload limit for update-function-code / publish-layer-version
+DIRECT_UPLOAD_BYTES = 50 * 1024 * 1024
+
+
+def handler_entries() -> list:
+    """(arcname, path) for the handler module and runtime package"""
+    entries = [(name, os.path.join(HERE, name)) for name in HANDLER_FILES]
+    for package in HANDLER_PACKAGES:
+        entries += build_cache.directory_entries(
+            os.path.join(HERE, package), package + '/', ['__pycache__', '*.pyc']
+        )
+    return sorted(entries)
+
+
+def dependency_layers(source: str) -> tuple:
+    """
+    Cached layers for the dependencies
+
+    Returns:
+        (layer_dirs, fingerprint, stats)
+    """
+    stats = {'hits': 0, 'misses': 0}
+    if source == 'pip':
+        layer_dir, fingerprint, hit = build_cache.pip_layer(PIP_REQUIREMENTS, PIP_ARGS)
+        stats['hits' if hit else 'misses'] += 1
+        return [layer_dir], fingerprint, stats
+
+    from build_clean_package import WHEELS
+
+    layer_dirs, hashes = [], []
+    for name, url in WHEELS.items():
+        wheel_path, sha256, wheel_hit = build_cache.cached_wheel(url)
+        layer_dir, layer_hit = build_cache.extracted_layer(wheel_path, sha256)
+        stats['hits' if wheel_hit and layer_hit else 'misses'] += 1
+        print(f"  {name:<14} {'cached' if wheel_hit else 'downloaded'}")
+        layer_dirs.append(layer_dir)
+        hashes.append(sha256)
+
+    fingerprint = build_cache.sha256_text(json.dumps(
+        [hashes, build_cache.EXCLUDE_PATTERNS]
+    ))
+    return layer_dirs, fingerprint, stats
+
+
+def load_state() -> dict:
+    if os.path.exists(STATE_FILE):
+        with open(STATE_FILE) as f:
+            return json.load(f)
+    return {}
+
+
+def save_state(state: dict) -> None:
+    with open(STATE_FILE, 'w') as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+
+
+def build(source: str, layer: bool) -> dict:
+    """Build artifacts; returns fingerprints, what changed and timings"""
+    start = time.perf_counter()
+    previous = load_state().get('built', {})
+
+    print("\n[*] Resolving dependency layers...")
+    layer_dirs, deps_fingerprint, stats = dependency_layers(source)
+
+    handler = handler_entries()
+    handler_fingerprint = build_cache.fingerprint_entries(handler)
+
+    deps_changed = previous.get('deps') != deps_fingerprint
+    handler_changed = previous.get('handler') != handler_fingerprint
+
+    print("\n[*] Creating artifacts...")
+    build_cache.write_deterministic_zip(handler, HANDLER_ZIP)
+    print(f"  {HANDLER_ZIP}: {os.path.getsize(HANDLER_ZIP) / 1024:.1f} KB")
+
+    deps_zip, deps_hit = build_cache.cached_artifact(
+        'deps', deps_fingerprint, lambda: build_cache.layer_entries(layer_dirs)
+    )
+    # Copy the cached deps zip and append the handler: no recompression
+    shutil.copyfile(deps_zip, FULL_ZIP)
+    build_cache.write_deterministic_zip(handler, FULL_ZIP, mode='a')
+    print(f"  {FULL_ZIP}: {os.path.getsize(FULL_ZIP) / 1024 / 1024:.2f} MB "
+          f"(deps zip {'reused' if deps_hit else 'built'})")
+
+    if layer:
+        layer_zip, layer_hit = build_cache.cached_artifact(
+            'layer', deps_fingerprint, lambda: build_cache.layer_entries(layer_dirs, 'python/')
+        )
+        shutil.copyfile(layer_zip, LAYER_ZIP)
+        print(f"  {LAYER_ZIP}: {os.path.getsize(LAYER_ZIP) / 1024 / 1024:.2f} MB "
+              f"({'reused' if layer_hit else 'built'})")
+
+    state = load_state()
+    state['built'] = {'deps': deps_fingerprint, 'handler': handler_fingerprint, 'source': source}
+    save_state(state)
+
+    return {
+        'deps': deps_fingerprint,
+        'handler': handler_fingerprint,
+        'deps_changed': deps_changed,
+        'handler_changed': handler_changed,
+        'cache': stats,
+        'seconds': round(time.perf_counter() - start, 2),
+    }
+
+
+def run_aws(args: list, description: str) -> str:
+    """Run an aws CLI command, returning stdout (raises on failure)"""
+    print(f"\n[*] {description}...")
+    result = subprocess.run(['aws'] + args, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"{description} failed: {result.stderr.strip()}")
+    return result.stdout.strip()
+
+
+def deploy(result: dict) -> None:
+    """
+    Publish the deps layer only when it changed, then update the function code
+
+    The function runs with HANDLER_ZIP as code and the layer for
+    dependencies, so a handler-only change uploads a few KB.
+    """
+    state = load_state()
+    deployed = state.get('deployed', {})
+
+    if deployed.get('deps') != result['deps'] or not deployed.get('layer_arn'):
+        layer_zip = LAYER_ZIP
+        if os.path.getsize(layer_zip) > DIRECT_UPLOAD_BYTES:
+            key = f"layers/{LAYER_NAME}-{result['deps'][:16]}.zip"
+            run_aws(['s3', 'cp', layer_zip, f"s3://{BUCKET}/{key}"], "Uploading layer to S3")
+            content = ['--content', f"S3Bucket={BUCKET},S3Key={key}"]
+        else:
+            content = ['--zip-file', f"fileb://{layer_zip}"]
+        layer_arn = run_aws(['lambda', 'publish-layer-version', '--layer-name', LAYER_NAME,
+                             '--compatible-runtimes', 'python3.11',
+                             '--query', 'LayerVersionArn', '--output', 'text'] + content,
+                            "Publishing dependency layer")
+        run_aws(['lambda', 'update-function-configuration', '--function-name', LAMBDA_FUNCTION_NAME,
+                 '--layers', layer_arn], "Attaching layer")
+        run_aws(['lambda', 'wait', 'function-updated', '--function-name', LAMBDA_FUNCTION_NAME],
+                "Waiting for configuration update")
+        deployed = {'deps': result['deps'], 'layer_arn': layer_arn}
+    else:
+        print(f"\n[INFO] Dependencies unchanged, keeping {deployed['layer_arn']}")
+
+    if deployed.get('handler') != result['handler']:
+        run_aws(['lambda', 'update-function-code', '--function-name', LAMBDA_FUNCTION_NAME,
+                 '--zip-file', f"fileb://{HANDLER_ZIP}"], "Updating function code")
+        deployed['handler'] = result['handler']
+    else:
+        print("[INFO] Handler unchanged, nothing to upload")
+
+    state['deployed'] = deployed
+    save_state(state)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--source', choices=['wheels', 'pip'], default='wheels',
+                        help="build_clean_package's pinned wheels, or pip with manylinux flags")
+    parser.add_argument('--layer', action='store_true', help=f'Also write {LAYER_ZIP}')
+    parser.add_argument('--deploy', action='store_true',
+                        help='Publish the layer if deps changed and update the function code')
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+
+    print("="*70)
+    print(" "*18 + "INCREMENTAL LAMBDA PACKAGE BUILD")
+    print("="*70)
+    print(f"\n[INFO] Cache: {build_cache.CACHE_DIR}")
+
+    try:
+        result = build(args.source, args.layer or args.deploy)
+    except Exception as e:
+        print(f"\n[ERROR] Build failed: {e}")
+        sys.exit(1)
+
+    if result['deps_changed']:
+        summary = "dependencies changed: deploy the full package or publish a new layer"
+    elif result['handler_changed']:
+        summary = f"handler-only change: {HANDLER_ZIP} is all that needs deploying"
+    else:
+        summary = "nothing changed since the last build"
+    print(f"\n[SUCCESS] Built in {result['seconds']}s "
+          f"(cache {result['cache']['hits']} hit / {result['cache']['misses']} miss): {summary}")
+
+    if args.deploy:
+        try:
+            deploy(result)
+        except Exception as e:
+            print(f"\n[ERROR] {e}")
+            sys.exit(1)
+        print(f"\n[SUCCESS] {LAMBDA_FUNCTION_NAME} is up to date")
@@ -16,10 +16,11 @@ docker run --rm \
   public.ecr.aws/lambda/python:3.11 \
   bash -c "
     echo 'Installing dependencies...'
-    pip install onnxruntime numpy -t lambda_package_clean/ --no-cache-dir
+    pip install onnxruntime numpy orjson -t lambda_package_clean/ --no-cache-dir
     
     echo 'Copying Lambda handler...'
     cp inference_onnx.py lambda_package_clean/
+    cp -r weave_runtime lambda_package_clean/
     
     echo 'Creating zip package...'
     cd lambda_package_clean
@@ -40,7 +40,7 @@ def build_package():
     print("      (This may take a minute...)")
     
     # Download for manylinux (Amazon Linux compatible)
-    cmd = f'pip download onnxruntime numpy --platform manylinux2014_x86_64 --python-version 311 --only-binary=:all: --dest {PACKAGE_DIR}_wheels'
+    cmd = f'pip download onnxruntime numpy orjson --platform manylinux2014_x86_64 --python-version 311 --only-binary=:all: --dest {PACKAGE_DIR}_wheels'
     
     os.makedirs(f"{PACKAGE_DIR}_wheels", exist_ok=True)
     
@@ -70,6 +70,8 @@ def build_package():
     # Copy Lambda handler
     print("\n[4/5] Adding Lambda handler...")
     shutil.copy2("inference_onnx.py", os.path.join(PACKAGE_DIR, "inference_onnx.py"))
+    shutil.copytree("weave_runtime", os.path.join(PACKAGE_DIR, "weave_runtime"),
+                    ignore=shutil.ignore_patterns("__pycache__", "*.pyc"))
     
     # Create final zip
     print("\n[5/5] Creating ZIP package...")
@@ -0,0 +1,412 @@
+#!/usr/bin/env python3
+"""
+Build a slim Lambda package: traced imports, pruned dependencies, precompiled bytecode
+Reports zip size and measured import time before and after
+
+build_clean_package.py ships everything its wheels contain (sympy, mpmath,
+coloredlogs, humanfriendly, tests, C headers) and skips .pyc files, so every
+cold start recompiles the handler's whole import graph. This builder:
+
+  1. stages the same dependencies (wheels, or the local site-packages),
+  2. runs the handler in an isolated interpreter (-S -E: staged packages plus
+     the Lambda-provided boto3 only), once on ONNX Runtime and once on the
+     NumPy micro-runtime, and records every imported module and every native
+     library mapped into the process,
+  3. drops untouched packages and subpackages, tests, headers, stubs and
+     unused native libraries, then re-runs the trace to prove the result still works,
+  4. precompiles bytecode for the target Python with unchecked-hash pycs
+     (Lambda's read-only /var/task can't cache recompiled bytecode, and zip
+     mtimes don't survive the round trip, so timestamp pycs would be ignored),
+  5. writes a deterministic zip and reports size and import time.
+
+Bytecode only helps when the build runs on the target Python minor version
+(3.11 for the cp311 wheels); otherwise compilation is skipped with a warning.
+
+Usage:
+    python build_slim_package.py                          # wheels from build_clean_package
+    python build_slim_package.py --source site            # copy from local site-packages
+    python build_slim_package.py --optimize 2             # also emit .opt-2.pyc (set PYTHONOPTIMIZE=2)
+"""
+
+import argparse
+import compileall
+import fnmatch
+import importlib.metadata
+import importlib.util
+import json
+import os
+import py_compile
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from build_cache import directory_entries, write_deterministic_zip
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+PACKAGE_DIR = "lambda_slim"
+ZIP_FILE = "lambda-slim.zip"
+TARGET_PYTHON = "3.11"
+
+# What the handler needs from pip (site source); wheels come from build_clean_package
+REQUIREMENTS = ["onnxruntime", "numpy", "orjson"]
+
+# Provided by the Lambda Python runtime: visible to the trace, never packaged
+RUNTIME_PROVIDED = ["boto3", "botocore", "s3transfer", "jmespath", "dateutil", "urllib3", "six"]
+
+HANDLER_FILES = ["inference_onnx.py"]
+HANDLER_PACKAGES = ["weave_runtime"]
+
+# Removed from kept packages unless the trace touched something inside
+PRUNE_DIRS = {"tests", "test", "testing", "include", "benchmarks", "docs", "examples", "__pycache__"}
+PRUNE_PATTERNS = ["*.pyi", "*.pxd", "*.pyx", "*.h", "*.hpp", "*.c", "*.cpp", "*.f", "*.f90",
+                  "py.typed", "*.dist-info", "*.egg-info"]
+NATIVE_PATTERNS = ["*.so", "*.so.*"]
+
+# MICRO_RUNTIME settings the trace serves under: ORT is imported lazily and the
+# trace model fits the micro-runtime, so one run alone would miss a runtime
+TRACE_RUNTIMES = ["0", "1"]
+
+# Runs inside the isolated interpreter; prints what was imported and mapped
+TRACE_SCRIPT = r"""
+import json, os, sys, time
+sys.path[:0] = [p for p in os.environ['SLIM_TRACE_PATH'].split(os.pathsep) if p]
+start = time.perf_counter()
+import inference_onnx
+import_ms = (time.perf_counter() - start) * 1000
+for model_name in (os.environ.get('SLIM_TRACE_MODEL', ''), 'slim-trace-missing.onnx'):
+    for text in ('great product', ['bad service', 'love it']):
+        event = {'uid': 'slim', 'model_name': model_name, 'input': text}
+        response = inference_onnx.lambda_handler(event, None)
+        if response['statusCode'] != 200:
+            raise SystemExit('trace request failed: ' + response['body'])
+        # A model that fails to load is served by mock inference, still with a 200
+        if model_name != 'slim-trace-missing.onnx' and not json.loads(response['body'])['cached']:
+            raise SystemExit('trace model fell back to mock inference: ' + model_name)
+files = sorted({os.path.realpath(m.__file__) for m in list(sys.modules.values())
+                if getattr(m, '__file__', None)})
+native = []
+with open('/proc/self/maps') as f:
+    for line in f:
+        parts = line.split()
+        if len(parts) >= 6 and '.so' in parts[-1]:
+            native.append(os.path.realpath(parts[-1]))
+print(json.dumps({'files': files, 'native': sorted(set(native)), 'import_ms': import_ms}))
+"""
+
+IMPORT_SCRIPT = r"""
+import os, sys, time
+sys.path[:0] = [p for p in os.environ['SLIM_TRACE_PATH'].split(os.pathsep) if p]
+start = time.perf_counter()
+import inference_onnx
+print((time.perf_counter() - start) * 1000)
+"""
+
+
+def stage_from_wheels(staging: str) -> None:
+    """Download and extract build_clean_package's pinned manylinux wheels"""
+    from build_clean_package import WHEELS, download_wheel, extract_wheel
+
+    temp_dir = tempfile.mkdtemp(prefix="weave_wheels_")
+    try:
+        for name, url in WHEELS.items():
+            wheel_path = download_wheel(name, url, temp_dir)
+            if not wheel_path:
+                raise RuntimeError(f"Could not download {name}")
+            extract_wheel(wheel_path, staging)
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+def resolve_distributions(names: list) -> list:
+    """Distributions for `names` plus their non-extra requirements, recursively"""
+    seen = {}
+    pending = list(names)
+    while pending:
+        name = pending.pop()
+        key = name.lower().replace('_', '-')
+        if key in seen:
+            continue
+        dist = importlib.metadata.distribution(name)
+        seen[key] = dist
+        for requirement in dist.requires or []:
+            if 'extra ==' in requirement:
+                continue
+            pending.append(requirement.split(';')[0].split('[')[0].split('(')[0]
+                           .split('<')[0].split('>')[0].split('=')[0].split('!')[0]
+                           .split('~')[0].strip())
+    return list(seen.values())
+
+
+def stage_from_site(staging: str, requirements: list) -> None:
+    """Copy installed distributions (as their RECORD lists them) into staging"""
+    for dist in resolve_distributions(requirements):
+        print(f"  Staging {dist.metadata['Name']} {dist.version}")
+        for entry in dist.files or []:
+            if entry.parts[0] == '..' or '__pycache__' in entry.parts:
+                continue
+            source = entry.locate()
+            if not os.path.isfile(source):
+                continue
+            target = os.path.join(staging, *entry.parts)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            shutil.copy2(source, target)
+
+
+def copy_handler(staging: str) -> None:
+    """Handler module and runtime package, without bytecode"""
+    for name in HANDLER_FILES:
+        shutil.copy2(os.path.join(HERE, name), os.path.join(staging, name))
+    for name in HANDLER_PACKAGES:
+        shutil.copytree(os.path.join(HERE, name), os.path.join(staging, name),
+                        ignore=shutil.ignore_patterns("__pycache__", "*.pyc"))
+
+
+def make_runtime_shim(shim_dir: str) -> None:
+    """Symlink the runtime-provided packages so the isolated trace can import them"""
+    for name in RUNTIME_PROVIDED:
+        spec = importlib.util.find_spec(name)
+        if spec is None or not spec.origin:
+            print(f"  [WARNING] {name} not installed locally; the trace may fail")
+            continue
+        path = os.path.dirname(spec.origin) if spec.submodule_search_locations else spec.origin
+        os.symlink(path, os.path.join(shim_dir, os.path.basename(path)))
+
+
+def run_isolated(script: str, package_dir: str, shim_dir: str, flags: list = None,
+                 extra_env: dict = None) -> str:
+    """Run a script with only the stdlib, package_dir and the runtime shim importable"""
+    env = {
+        'PATH': os.environ.get('PATH', ''),
+        'SLIM_TRACE_PATH': os.pathsep.join([package_dir, shim_dir]),
+        'SLIM_TRACE_MODEL': 'sentiment-model.onnx',
+        'LOCAL_MODEL_DIR': HERE,
+        'EMF_METRICS': '0',
+        'LOG_LEVEL': 'ERROR',
+        'HISTOGRAM_FLUSH_EVERY': str(10**9),
+        'AWS_DEFAULT_REGION': os.environ.get('AWS_DEFAULT_REGION', 'us-east-1'),
+    }
+    env.update(extra_env or {})
+    # -B throughout: the trace must not leave bytecode behind in the staged tree
+    cmd = [sys.executable, '-S', '-E', '-B'] + (flags or []) + ['-c', script]
+    proc = subprocess.run(cmd, cwd=tempfile.gettempdir(), env=env, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"Isolated run failed:\n{proc.stderr.strip()[-2000:]}")
+    return proc.stdout.strip().splitlines()[-1]
+
+
+def trace_imports(package_dir: str, shim_dir: str) -> dict:
+    """Files imported and native libraries mapped under package_dir, across TRACE_RUNTIMES"""
+    root = os.path.realpath(package_dir) + os.sep
+    trace = {'files': set(), 'native': set()}
+    for micro_runtime in TRACE_RUNTIMES:
+        result = json.loads(run_isolated(TRACE_SCRIPT, package_dir, shim_dir,
+                                         extra_env={'MICRO_RUNTIME': micro_runtime}))
+        trace['files'].update(path for path in result['files'] if path.startswith(root))
+        trace['native'].update(path for path in result['native'] if path.startswith(root))
+        trace['import_ms'] = result['import_ms']
+    return trace
+
+
+def measure_import(package_dir: str, shim_dir: str, repeats: int, flags: list = None) -> dict:
+    """Median cold `import inference_onnx` time over fresh interpreters"""
+    samples = [float(run_isolated(IMPORT_SCRIPT, package_dir, shim_dir, flags))
+               for _ in range(repeats)]
+    return {'median_ms': round(statistics.median(samples), 2),
+            'min_ms': round(min(samples), 2), 'repeats': repeats}
+
+
+def matches(name: str, patterns: list) -> bool:
+    return any(fnmatch.fnmatch(name, pattern) for pattern in patterns)
+
+
+def prune(package_dir: str, trace: dict, keep: list) -> dict:
+    """
+    Remove everything the trace shows the handler never needs
+
+    Returns:
+        {"top_level": [...removed], "files": count, "bytes": total}
+    """
+    used = trace['files'] | trace['native']
+    root = os.path.realpath(package_dir)
+    protected = set(HANDLER_FILES) | set(HANDLER_PACKAGES)
+    removed = {'top_level': [], 'files': 0, 'bytes': 0}
+
+    def is_used(path: str) -> bool:
+        path = os.path.realpath(path)
+        return path in used or any(u.startswith(path + os.sep) for u in used)
+
+    def kept(path: str) -> bool:
+        rel = os.path.relpath(path, root)
+        return rel.split(os.sep)[0] in protected or any(fnmatch.fnmatch(rel, k) for k in keep)
+
+    def remove(path: str) -> None:
+        if os.path.isdir(path) and not os.path.islink(path):
+            for dirpath, _, files in os.walk(path):
+                for name in files:
+                    removed['bytes'] += os.path.getsize(os.path.join(dirpath, name))
+                    removed['files'] += 1
+            shutil.rmtree(path)
+        else:
+            removed['bytes'] += os.path.getsize(path)
+            removed['files'] += 1
+            os.remove(path)
+
+    # Whole top-level packages (and their *.libs / *.dist-info) nobody imported
+    for name in sorted(os.listdir(root)):
+        path = os.path.join(root, name)
+        if kept(path):
+            continue
+        if matches(name, PRUNE_PATTERNS) or not is_used(path):
+            removed['top_level'].append(name)
+            remove(path)
+
+    # Untouched subpackages, tests, headers, stubs and native libraries nothing
+    # loaded, inside the packages that stay
+    for dirpath, dirs, files in os.walk(root, topdown=True):
+        for name in list(dirs):
+            path = os.path.join(dirpath, name)
+            subpackage = os.path.exists(os.path.join(path, '__init__.py'))
+            if (name in PRUNE_DIRS or subpackage) and not kept(path) and not is_used(path):
+                remove(path)
+                dirs.remove(name)
+        for name in files:
+            path = os.path.join(dirpath, name)
+            if kept(path) or os.path.realpath(path) in used:
+                continue
+            if matches(name, PRUNE_PATTERNS) or matches(name, NATIVE_PATTERNS):
+                remove(path)
+
+    return removed
+
+
+def compile_package(package_dir: str, optimize: int) -> int:
+    """Precompile bytecode (unchecked-hash) for the running Python; returns .pyc count"""
+    levels = sorted({0, optimize})
+    compileall.compile_dir(package_dir, quiet=1, optimize=levels, workers=0,
+                           invalidation_mode=py_compile.PycInvalidationMode.UNCHECKED_HASH)
+    return sum(1 for _, _, files in os.walk(package_dir) for f in files if f.endswith('.pyc'))
+
+
+def build(args) -> dict:
+    """Stage, trace, prune, compile and zip; returns the size/import report"""
+    args.package_dir = os.path.abspath(args.package_dir)
+    if os.path.exists(args.package_dir):
+        shutil.rmtree(args.package_dir)
+    os.makedirs(args.package_dir)
+    shim_dir = tempfile.mkdtemp(prefix="weave_runtime_shim_")
+
+    try:
+        print(f"\n[1/6] Staging dependencies ({args.source})...")
+        if args.source == 'wheels':
+            stage_from_wheels(args.package_dir)
+        else:
+            stage_from_site(args.package_dir, REQUIREMENTS)
+        copy_handler(args.package_dir)
+        make_runtime_shim(shim_dir)
+
+        print("\n[2/6] Tracing handler imports...")
+        trace = trace_imports(args.package_dir, shim_dir)
+        print(f"  {len(trace['files'])} files imported, {len(trace['native'])} native libraries mapped")
+
+        before_zip = os.path.join(tempfile.gettempdir(), 'weave_slim_before.zip')
+        before = {
+            'zip_bytes': write_deterministic_zip(directory_entries(args.package_dir), before_zip),
+            'import': measure_import(args.package_dir, shim_dir, args.repeats),
+        }
+        os.remove(before_zip)
+
+        print("\n[3/6] Pruning...")
+        removed = prune(args.package_dir, trace, args.keep or [])
+        print(f"  Removed {removed['files']} files ({removed['bytes'] / 1024 / 1024:.1f} MB)")
+        for name in removed['top_level']:
+            print(f"    - {name}")
+
+        print("\n[4/6] Verifying the pruned package...")
+        trace_imports(args.package_dir, shim_dir)
+        print("  Handler imports and serves real (ONNX Runtime and micro-runtime) + mock requests")
+
+        print("\n[5/6] Precompiling bytecode...")
+        target_ok = '.'.join(map(str, sys.version_info[:2])) == args.python_version
+        pyc_count = 0
+        if target_ok:
+            pyc_count = compile_package(args.package_dir, args.optimize)
+            print(f"  {pyc_count} .pyc files (optimize levels {sorted({0, args.optimize})})")
+        else:
+            print(f"  [WARNING] Building with Python {sys.version_info[0]}.{sys.version_info[1]}, "
+                  f"target is {args.python_version}: skipping bytecode")
+
+        flags = ['-' + 'O' * args.optimize] if args.optimize else []
+        after_import = measure_import(args.package_dir, shim_dir, args.repeats, flags)
+
+        print(f"\n[6/6] Creating {args.zip_file}...")
+        after = {
+            'zip_bytes': write_deterministic_zip(directory_entries(args.package_dir), args.zip_file),
+            'import': after_import,
+        }
+    finally:
+        shutil.rmtree(shim_dir, ignore_errors=True)
+
+    if not args.keep_dir:
+        shutil.rmtree(args.package_dir)
+
+    return {
+        'source': args.source,
+        'python': args.python_version,
+        'optimize': args.optimize,
+        'pyc_files': pyc_count,
+        'removed_top_level': removed['top_level'],
+        'removed_files': removed['files'],
+        'removed_bytes': removed['bytes'],
+        'before': before,
+        'after': after,
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--source', choices=['wheels', 'site'], default='wheels',
+                        help='Pinned wheels from build_clean_package, or local site-packages')
+    parser.add_argument('--python-version', default=TARGET_PYTHON,
+                        help='Target Lambda Python (bytecode is only built on a matching interpreter)')
+    parser.add_argument('--optimize', type=int, choices=[0, 1, 2], default=0,
+                        help='Also emit .opt-N.pyc; needs PYTHONOPTIMIZE=N and only pays off if '
+                             'the runtime has matching stdlib/boto3 bytecode (compare the report)')
+    parser.add_argument('--keep', nargs='*', help='Extra glob patterns (relative paths) to never prune')
+    parser.add_argument('--repeats', type=int, default=5, help='Import time samples')
+    parser.add_argument('--package-dir', default=PACKAGE_DIR)
+    parser.add_argument('--zip-file', default=ZIP_FILE)
+    parser.add_argument('--keep-dir', action='store_true', help='Leave the package directory')
+    parser.add_argument('--report', help='Write the size/import report as JSON')
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+
+    print("="*70)
+    print(" "*18 + "BUILDING SLIM LAMBDA PACKAGE")
+    print("="*70)
+
+    try:
+        report = build(args)
+    except Exception as e:
+        print(f"\n[ERROR] {e}")
+        sys.exit(1)
+
+    before, after = report['before'], report['after']
+    print("\n" + "="*70)
+    print(f"  Zip size:    {before['zip_bytes'] / 1024 / 1024:8.2f} MB -> "
+          f"{after['zip_bytes'] / 1024 / 1024:8.2f} MB")
+    print(f"  Import time: {before['import']['median_ms']:8.1f} ms -> "
+          f"{after['import']['median_ms']:8.1f} ms (median of {after['import']['repeats']})")
+    if args.optimize:
+        print(f"\n  Set PYTHONOPTIMIZE={args.optimize} on the function to use the .opt-{args.optimize}.pyc files")
+
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    print(f"\n[SUCCESS] Package created: {args.zip_file}")
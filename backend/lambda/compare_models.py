@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+Model variant comparison: size, session creation, latency, memory, accuracy
+Builds every available generator variant and writes one comparison table
+
+Each variant is measured in its own fresh interpreter so peak memory and
+session creation aren't skewed by models measured before it. Accuracy is
+scored against a labelled sample set (sentiment_samples.jsonl by default)
+through the same preprocessing and postprocessing the handler uses.
+
+Usage:
+    python compare_models.py                              # all offline variants
+    python compare_models.py --samples my_labels.jsonl --output compare.json
+    python compare_models.py --include-network            # + transformer model
+"""
+
+import argparse
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmark_handler import build_model_variants, percentiles, synthetic_corpus
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+BATCH_SIZES = [1, 8, 64, 256]
+SESSION_REPEATS = 5
+LATENCY_ITERATIONS = 200
+DEFAULT_SAMPLES = os.path.join(HERE, 'sentiment_samples.jsonl')
+
+
+def load_samples(path: str) -> list:
+    """Labelled samples: one {"text": ..., "label": ...} object per line"""
+    samples = []
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                sample = json.loads(line)
+                samples.append((sample['text'], sample['label']))
+    return samples
+
+
+def max_rss_mb() -> float:
+    """Peak resident set size of this process so far"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 2)
+
+
+def measure_variant(model_path: str, samples_path: str, batch_sizes: list) -> dict:
+    """
+    Measure one model (called in a fresh subprocess via --measure)
+
+    Uses the handler's own manifest, preprocessors and postprocess_batch so
+    the numbers match what a request would see, minus HTTP and JSON.
+    """
+    os.environ.setdefault('EMF_METRICS', '0')
+    os.environ.setdefault('LOG_LEVEL', 'ERROR')
+    sys.path.insert(0, HERE)
+
+    import onnxruntime as ort
+    import inference_onnx
+    from weave_runtime.manifest import build_manifest, parse_manifest
+    from weave_runtime.postprocess import postprocess_batch
+
+    baseline_rss = max_rss_mb()
+
+    with open(model_path, 'rb') as f:
+        model_bytes = f.read()
+
+    session_ms = []
+    for _ in range(SESSION_REPEATS):
+        start = time.perf_counter()
+        session = ort.InferenceSession(model_bytes, providers=['CPUExecutionProvider'])
+        session_ms.append((time.perf_counter() - start) * 1000)
+
+    manifest = parse_manifest(build_manifest(session, model_bytes))
+    feeds_for = inference_onnx.PREPROCESSORS[manifest['preprocessor']['kind']]
+    output_names = [manifest['outputs'][manifest['primary_output']]['name']]
+    labels, task = manifest['labels'], manifest['task']
+
+    latency = {}
+    for batch_size in batch_sizes:
+        texts = synthetic_corpus(batch_size, 128)
+        for _ in range(5):
+            session.run(output_names, feeds_for(texts, manifest))
+
+        samples_ms = []
+        iterations = max(20, LATENCY_ITERATIONS // max(1, batch_size // 8))
+        for _ in range(iterations):
+            start = time.perf_counter()
+            output = session.run(output_names, feeds_for(texts, manifest))[0]
+            postprocess_batch(output, labels, task=task)
+            samples_ms.append((time.perf_counter() - start) * 1000)
+        stats = percentiles(samples_ms)
+        stats['items_per_s'] = round(batch_size * 1000.0 / stats['mean_ms'], 1)
+        latency[str(batch_size)] = stats
+
+    texts, expected = zip(*load_samples(samples_path))
+    output = session.run(output_names, feeds_for(list(texts), manifest))[0]
+    predicted = list(postprocess_batch(output, labels, task=task)['label'])
+    correct = sum(1 for got, want in zip(predicted, expected) if got == want)
+
+    return {
+        'size_bytes': len(model_bytes),
+        'session_create': percentiles(session_ms),
+        'latency': latency,
+        'accuracy': round(correct / len(expected), 4),
+        'correct': correct,
+        'samples': len(expected),
+        'peak_rss_mb': max_rss_mb(),
+        'model_rss_mb': round(max_rss_mb() - baseline_rss, 2),
+    }
+
+
+def run_measurement(model_path: str, samples_path: str, batch_sizes: list) -> dict:
+    """Run measure_variant in a fresh interpreter and parse its JSON result"""
+    cmd = [sys.executable, os.path.abspath(__file__), '--measure', model_path,
+           '--samples', samples_path, '--batch-sizes'] + [str(b) for b in batch_sizes]
+    proc = subprocess.run(cmd, cwd=HERE, capture_output=True, text=True)
+    if proc.returncode != 0:
+        return {'error': (proc.stderr.strip().splitlines() or ['measurement failed'])[-1]}
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def latency_per_accuracy_point(result: dict, batch_size: str = '1') -> float:
+    """p50 latency divided by accuracy percentage points above chance (50%)"""
+    above_chance = (result['accuracy'] - 0.5) * 100
+    if above_chance <= 0:
+        return None
+    return round(result['latency'][batch_size]['p50_ms'] / above_chance, 5)
+
+
+def print_table(rows: list, batch_sizes: list) -> None:
+    """One comparison table, best accuracy first"""
+    header = (f"  {'variant':<28} {'size KB':>8} {'session ms':>10} {'RSS MB':>7} {'acc':>6}"
+              + ''.join(f" {'p50@' + str(b):>9}" for b in batch_sizes)
+              + f" {'ms/acc-pt':>10}")
+    print(header)
+    print("  " + "-" * (len(header) - 2))
+    for row in rows:
+        if 'error' in row:
+            print(f"  {row['variant']:<28} [ERROR] {row['error']}")
+            continue
+        cost = row['ms_per_accuracy_point']
+        print(f"  {row['variant']:<28} {row['size_bytes'] / 1024:>8.1f} "
+              f"{row['session_create']['p50_ms']:>10.2f} {row['model_rss_mb']:>7.1f} "
+              f"{row['accuracy']:>6.1%}"
+              + ''.join(f" {row['latency'][str(b)]['p50_ms']:>9.3f}" for b in batch_sizes)
+              + f" {cost if cost is not None else '-':>10}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--samples', default=DEFAULT_SAMPLES, help='Labelled JSONL sample set')
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=BATCH_SIZES)
+    parser.add_argument('--models', nargs='*', help='Only these variants')
+    parser.add_argument('--model-dir', help='Keep built models here instead of a temp dir')
+    parser.add_argument('--include-network', action='store_true',
+                        help='Also build variants that download models / pip install')
+    parser.add_argument('--output', default='model_comparison.json')
+    parser.add_argument('--measure', help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+
+    if args.measure:
+        print(json.dumps(measure_variant(args.measure, args.samples, args.batch_sizes)))
+        sys.exit(0)
+
+    print("="*70)
+    print(" "*20 + "MODEL VARIANT COMPARISON")
+    print("="*70)
+
+    model_dir = args.model_dir or tempfile.mkdtemp(prefix='weave_compare_models_')
+
+    print("\n[1/3] Building model variants...")
+    variants = build_model_variants(model_dir, args.include_network, args.models)
+
+    print(f"\n[2/3] Measuring ({len(load_samples(args.samples))} labelled samples)...")
+    rows = []
+    for variant, info in variants.items():
+        if 'path' not in info:
+            continue
+        print(f"  {variant}")
+        row = {'variant': variant}
+        row.update(run_measurement(info['path'], args.samples, args.batch_sizes))
+        if 'error' not in row:
+            row['ms_per_accuracy_point'] = latency_per_accuracy_point(row)
+        rows.append(row)
+
+    rows.sort(key=lambda row: (-row.get('accuracy', -1), row.get('size_bytes', 0)))
+
+    print("\n[3/3] Comparison (latency at input length 128, p50 in ms)\n")
+    print_table(rows, args.batch_sizes)
+
+    skipped = {name: info['skipped'] for name, info in variants.items() if 'skipped' in info}
+    for name, reason in skipped.items():
+        print(f"  [SKIP] {name}: {reason}")
+
+    report = {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'samples_file': os.path.basename(args.samples),
+        'batch_sizes': args.batch_sizes,
+        'variants': rows,
+        'skipped': skipped,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    if not args.model_dir:
+        shutil.rmtree(model_dir, ignore_errors=True)
+
+    print(f"\n[SUCCESS] Comparison written to {args.output}")
@@ -1,63 +1,228 @@
+#!/usr/bin/env python3
 """
-Create a simple sklearn model and convert to ONNX
-No PyTorch needed!
+Train a TF-IDF + logistic regression sentiment model and export it to ONNX
+scikit-learn is only needed here; the exported model runs on ONNX Runtime alone
+
+The IDF weights and the linear layer are baked into the graph, which takes
+sparse (row, term) index / term-count value pairs: scoring costs O(tokens in
+the batch), not O(vocabulary). The vocabulary and tokenizer settings ride in
+the model metadata, where the handler's "tfidf_sparse" preprocessor reads them.
 """
 
-from sklearn.linear_model import LogisticRegression
-from sklearn.feature_extraction.text import TfidfVectorizer
+import json
+import time
+
 import numpy as np
-import pickle
+import onnx
+from onnx import helper, TensorProto, numpy_helper
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
 
-# Create a simple sentiment classifier
 print("Creating sklearn sentiment model...")
 
-# Training data (simple examples)
+# Training data (short reviews; sentiment_samples.jsonl is kept for evaluation)
 texts = [
     "I love this product",
     "This is amazing",
     "Great quality",
     "Excellent service",
     "Best purchase ever",
+    "Works perfectly and looks great",
+    "Really happy with this, highly recommend",
+    "Fantastic value, would buy again",
+    "Arrived quickly and works as described",
+    "Beautiful design and very comfortable",
+    "Exceeded my expectations",
+    "Good product for the price",
+    "Wonderful experience, the team was helpful",
+    "Very pleased with the quality",
+    "Awesome, my kids love it",
+    "Solid build and great battery life",
+    "Five stars, would recommend to friends",
+    "Impressed with how well it works",
+    "Nice and sturdy, exactly what I wanted",
+    "Delivery was fast and support was friendly",
     "I hate this",
     "Terrible quality",
     "Worst product",
     "Very disappointed",
-    "Complete waste of money"
+    "Complete waste of money",
+    "Broke after two days",
+    "Would not recommend this to anyone",
+    "Not good at all, returning it",
+    "Cheap material and it feels flimsy",
+    "Stopped working within a week",
+    "Awful customer service, never again",
+    "Poor quality and overpriced",
+    "Did not work as advertised",
+    "The worst purchase I have made",
+    "Useless, it arrived damaged",
+    "Horrible smell and bad fit",
+    "Not worth the money",
+    "Disappointing, the box was empty",
+    "Defective item and slow refund",
+    "I regret buying this",
 ]
 
-labels = [1, 1, 1, 1, 1, 0, 0, 0, 0, 0]  # 1=positive, 0=negative
+labels = [1] * 20 + [0] * 20  # 1=positive, 0=negative
+LABEL_NAMES = ['negative', 'positive']
 
-# Create TF-IDF vectorizer
-vectorizer = TfidfVectorizer(max_features=128)
+# Create TF-IDF vectorizer (unigrams + bigrams so "not good" is a feature)
+vectorizer = TfidfVectorizer(max_features=2048, ngram_range=(1, 2))
 X = vectorizer.fit_transform(texts)
 
 # Train logistic regression
-model = LogisticRegression()
+model = LogisticRegression(C=10.0, max_iter=1000)
 model.fit(X, labels)
 
 print("✅ Model trained")
 print(f"Accuracy on training data: {model.score(X, labels):.2%}")
 
-# Save the model and vectorizer
-with open('sentiment_model.pkl', 'wb') as f:
-    pickle.dump({'model': model, 'vectorizer': vectorizer}, f)
+# ----------------------------------------------------------------------------
+# Export: vocabulary lookup happens in the preprocessor, TF-IDF + linear in ONNX
+# ----------------------------------------------------------------------------
+
+vocabulary = [None] * len(vectorizer.vocabulary_)
+for term, index in vectorizer.vocabulary_.items():
+    vocabulary[index] = term
+
+idf = vectorizer.idf_.astype(np.float32)
+
+# Class scores as a (vocab, classes) matrix; binary LR is softmax over [0, z]
+coef = model.coef_.astype(np.float32)
+intercept = model.intercept_.astype(np.float32)
+if coef.shape[0] == 1:
+    W = np.zeros((len(vocabulary), 2), dtype=np.float32)
+    W[:, 1] = coef[0]
+    b = np.array([0.0, intercept[0]], dtype=np.float32)
+else:
+    W = coef.T.copy()
+    b = intercept
+num_classes = W.shape[1]
+
+# Sparse input: COO (row, term) pairs, term counts, and the dense (batch, vocab) shape
+indices_input = helper.make_tensor_value_info('indices', TensorProto.INT64, [None, 2])
+values_input = helper.make_tensor_value_info('values', TensorProto.FLOAT, [None])
+shape_input = helper.make_tensor_value_info('dense_shape', TensorProto.INT64, [2])
+output_tensor = helper.make_tensor_value_info('output', TensorProto.FLOAT, [None, num_classes])
+
+initializers = [
+    numpy_helper.from_array(idf, 'idf'),
+    numpy_helper.from_array(W, 'W'),
+    numpy_helper.from_array(b, 'b'),
+    numpy_helper.from_array(np.array(0, dtype=np.int64), 'zero'),
+    numpy_helper.from_array(np.array(1, dtype=np.int64), 'one'),
+    numpy_helper.from_array(np.array([0], dtype=np.int64), 'start'),
+    numpy_helper.from_array(np.array([1], dtype=np.int64), 'end'),
+    numpy_helper.from_array(np.array([num_classes], dtype=np.int64), 'classes'),
+    numpy_helper.from_array(np.array([1], dtype=np.int64), 'axis1'),
+    numpy_helper.from_array(np.array(1e-12, dtype=np.float32), 'eps'),
+]
+
+nodes = [
+    # Split the COO pairs
+    helper.make_node('Gather', ['indices', 'zero'], ['rows'], axis=1),
+    helper.make_node('Gather', ['indices', 'one'], ['terms'], axis=1),
 
-print("✅ Model saved to sentiment_model.pkl")
+    # TF-IDF: count * idf[term]
+    helper.make_node('Gather', ['idf', 'terms'], ['term_idf']),
+    helper.make_node('Mul', ['values', 'term_idf'], ['tfidf']),
+
+    # Per-row L2 norm via scatter-add of the squares
+    helper.make_node('Slice', ['dense_shape', 'start', 'end'], ['batch']),
+    helper.make_node('ConstantOfShape', ['batch'], ['row_zeros'],
+                     value=numpy_helper.from_array(np.zeros(1, dtype=np.float32))),
+    helper.make_node('Mul', ['tfidf', 'tfidf'], ['squares']),
+    helper.make_node('ScatterElements', ['row_zeros', 'rows', 'squares'], ['sum_squares'],
+                     axis=0, reduction='add'),
+    helper.make_node('Sqrt', ['sum_squares'], ['norms']),
+    helper.make_node('Max', ['norms', 'eps'], ['safe_norms']),
+    helper.make_node('Gather', ['safe_norms', 'rows'], ['entry_norms']),
+    helper.make_node('Div', ['tfidf', 'entry_norms'], ['normalized']),
+
+    # Linear layer over the nonzeros only: scatter-add W[term] * x into (batch, classes)
+    helper.make_node('Gather', ['W', 'terms'], ['term_weights']),
+    helper.make_node('Unsqueeze', ['normalized', 'axis1'], ['normalized_col']),
+    helper.make_node('Mul', ['term_weights', 'normalized_col'], ['contributions']),
+    helper.make_node('Unsqueeze', ['rows', 'axis1'], ['rows_col']),
+    helper.make_node('Shape', ['contributions'], ['contributions_shape']),
+    helper.make_node('Expand', ['rows_col', 'contributions_shape'], ['scatter_rows']),
+    helper.make_node('Concat', ['batch', 'classes'], ['logits_shape'], axis=0),
+    helper.make_node('ConstantOfShape', ['logits_shape'], ['logit_zeros'],
+                     value=numpy_helper.from_array(np.zeros(1, dtype=np.float32))),
+    helper.make_node('ScatterElements', ['logit_zeros', 'scatter_rows', 'contributions'],
+                     ['sparse_logits'], axis=0, reduction='add'),
+    helper.make_node('Add', ['sparse_logits', 'b'], ['logits']),
+    helper.make_node('Softmax', ['logits'], ['output'], axis=1),
+]
+
+graph = helper.make_graph(
+    nodes,
+    'tfidf_logistic_regression',
+    [indices_input, values_input, shape_input],
+    [output_tensor],
+    initializers
+)
+
+# ScatterElements reduction needs opset 16
+onnx_model = helper.make_model(graph, producer_name='weave-sentiment-sklearn')
+onnx_model.opset_import[0].version = 16
+onnx_model.ir_version = 8
+
+metadata = {
+    'preprocessor': 'tfidf_sparse',
+    'labels': json.dumps([LABEL_NAMES[c] for c in model.classes_]),
+    'vocabulary': json.dumps(vocabulary),
+    'token_pattern': vectorizer.token_pattern,
+    'lowercase': 'true' if vectorizer.lowercase else 'false',
+    'ngram_range': json.dumps(list(vectorizer.ngram_range)),
+}
+for key, value in metadata.items():
+    entry = onnx_model.metadata_props.add()
+    entry.key, entry.value = key, value
+
+# Validate
+onnx.checker.check_model(onnx_model)
+
+output_file = 'sentiment-model.onnx'
+with open(output_file, 'wb') as f:
+    f.write(onnx_model.SerializeToString())
+
+print(f"✅ Model exported to {output_file} ({len(onnx_model.SerializeToString()) / 1024:.1f} KB, "
+      f"{len(vocabulary)} terms)")
+
+# ----------------------------------------------------------------------------
+# Check parity with scikit-learn through the handler's own preprocessor
+# ----------------------------------------------------------------------------
+
+import onnxruntime as ort
+from inference_onnx import tfidf_feeds
+from weave_runtime.manifest import build_manifest, parse_manifest
+
+session = ort.InferenceSession(output_file, providers=['CPUExecutionProvider'])
+manifest = parse_manifest(build_manifest(session))
 
-# Test the model
 test_texts = [
     "This is great!",
-    "I don't like it"
+    "I don't like it",
+    "not good, would not buy again",
+    "zzz unknown words only",
 ]
 
-for text in test_texts:
-    X_test = vectorizer.transform([text])
-    prediction = model.predict(X_test)[0]
-    proba = model.predict_proba(X_test)[0]
-    sentiment = "positive" if prediction == 1 else "negative"
+onnx_proba = session.run(None, tfidf_feeds(test_texts, manifest))[0]
+sklearn_proba = model.predict_proba(vectorizer.transform(test_texts))
+max_diff = float(np.abs(onnx_proba - sklearn_proba).max())
+
+for text, proba in zip(test_texts, onnx_proba):
+    sentiment = LABEL_NAMES[int(np.argmax(proba))]
     print(f"Text: '{text}' -> {sentiment} (confidence: {max(proba):.2%})")
 
-print("\n" + "="*50)
-print("To convert to ONNX, install: pip install skl2onnx")
-print("Then run the conversion script")
+print(f"Max probability difference vs scikit-learn: {max_diff:.2e}")
+if max_diff > 1e-4:
+    raise SystemExit("[ERROR] ONNX export doesn't match scikit-learn")
 
+start = time.perf_counter()
+iterations = 1000
+for _ in range(iterations):
+    session.run(None, tfidf_feeds(test_texts[:1], manifest))
+print(f"Scoring one text (preprocess + inference): {(time.perf_counter() - start) / iterations * 1e6:.0f} µs")
@@ -49,7 +49,7 @@ def create_package():
     
     # Install dependencies
     print(f"\n[*] Installing dependencies...")
-    deps = ["onnxruntime", "numpy"]
+    deps = ["onnxruntime", "numpy", "orjson"]
     
     for dep in deps:
         cmd = f'pip install {dep} -t {PACKAGE_DIR} --upgrade'
@@ -59,6 +59,8 @@ def create_package():
     # Copy Lambda handler
     print(f"\n[*] Copying Lambda handler...")
     shutil.copy2("inference_onnx.py", os.path.join(PACKAGE_DIR, "inference_onnx.py"))
+    shutil.copytree("weave_runtime", os.path.join(PACKAGE_DIR, "weave_runtime"),
+                    ignore=shutil.ignore_patterns("__pycache__", "*.pyc"))
     
     # Create zip file
     print(f"\n[*] Creating deployment package: {ZIP_FILE}")
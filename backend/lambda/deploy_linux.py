@@ -51,7 +51,8 @@ def create_linux_package():
     # Use --platform to get Linux wheels
     deps = [
         "onnxruntime",
-        "numpy"
+        "numpy",
+        "orjson"
     ]
     
     for dep in deps:
@@ -71,6 +72,8 @@ def create_linux_package():
     # Copy Lambda handler
     print(f"\n[*] Copying Lambda handler...")
     shutil.copy2("inference_onnx.py", os.path.join(PACKAGE_DIR, "inference_onnx.py"))
+    shutil.copytree("weave_runtime", os.path.join(PACKAGE_DIR, "weave_runtime"),
+                    ignore=shutil.ignore_patterns("__pycache__", "*.pyc"))
     
     # Create zip
     print(f"\n[*] Creating deployment package: {ZIP_FILE}")
@@ -20,6 +20,11 @@ if os.path.exists(ZIP_FILE):
 print("\n[*] Creating package with handler only...")
 with zipfile.ZipFile(ZIP_FILE, 'w', zipfile.ZIP_DEFLATED) as zipf:
     zipf.write("inference_onnx.py", "inference_onnx.py")
+    for root, dirs, files in os.walk("weave_runtime"):
+        dirs[:] = [d for d in dirs if d != '__pycache__']
+        for file in files:
+            if file.endswith('.py'):
+                zipf.write(os.path.join(root, file))
 
 size_kb = os.path.getsize(ZIP_FILE) / 1024
 print(f"[SUCCESS] Created: {ZIP_FILE} ({size_kb:.2f} KB)")
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Generate model manifests (<model>.manifest.json) next to ONNX models
+Run at upload time so the handler's first cold start reads the manifest instead of deriving it
+
+Usage:
+    python generate_manifest.py model.onnx [more.onnx ...]            # write alongside each file
+    python generate_manifest.py model.onnx --uid user123              # upload model + manifest to S3
+    python generate_manifest.py --uid user123 --existing model.onnx   # manifest for a model already in S3
+"""
+
+import argparse
+import base64
+import os
+import sys
+
+import onnxruntime as ort
+
+from weave_runtime.manifest import build_manifest, manifest_key, serialize_manifest, MANIFEST_SUFFIX
+
+BUCKET_NAME = os.environ.get('MODEL_BUCKET', 'weave-model-storage')
+
+
+def manifest_for(model_bytes: bytes) -> dict:
+    session = ort.InferenceSession(model_bytes, providers=['CPUExecutionProvider'])
+    return build_manifest(session, model_bytes)
+
+
+def describe(manifest: dict) -> str:
+    inputs = ', '.join(f"{i['name']}:{i['dtype']}{i['shape']}" for i in manifest['inputs'])
+    labels = len(manifest['labels']) if manifest['labels'] else 'none'
+    return (f"{manifest['preprocessor']['kind']} -> {manifest['task']} "
+            f"(inputs {inputs}; labels {labels}; io_binding {manifest['runtime']['io_binding']})")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('models', nargs='*', help='Local .onnx files')
+    parser.add_argument('--uid', help='Upload to s3://BUCKET/<uid>/ instead of writing locally')
+    parser.add_argument('--existing', nargs='*', default=[],
+                        help='Model names already in S3 under --uid (only the manifest is uploaded)')
+    parser.add_argument('--bucket', default=BUCKET_NAME)
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if not args.models and not args.existing:
+        print(__doc__)
+        sys.exit(1)
+    if args.existing and not args.uid:
+        print("[ERROR] --existing needs --uid")
+        sys.exit(1)
+
+    s3 = None
+    if args.uid:
+        import boto3
+        s3 = boto3.client('s3')
+
+    failed = False
+    jobs = [(path, None) for path in args.models] + [(None, name) for name in args.existing]
+    for path, existing in jobs:
+        model_name = existing or os.path.basename(path)
+        try:
+            if existing:
+                response = s3.get_object(Bucket=args.bucket, Key=f"{args.uid}/{model_name}")
+                model_bytes = response['Body'].read()
+            else:
+                with open(path, 'rb') as f:
+                    model_bytes = f.read()
+
+            manifest = manifest_for(model_bytes)
+            text = serialize_manifest(manifest)
+
+            if s3 is None:
+                with open(path + MANIFEST_SUFFIX, 'w') as f:
+                    f.write(text + '\n')
+                print(f"[SUCCESS] {path + MANIFEST_SUFFIX}: {describe(manifest)}")
+                continue
+
+            if not existing:
+                # S3 verifies and keeps the checksum; identical uploads share one cached session
+                checksum = base64.b64encode(bytes.fromhex(manifest['sha256'])).decode('ascii')
+                s3.put_object(Bucket=args.bucket, Key=f"{args.uid}/{model_name}", Body=model_bytes,
+                              ChecksumSHA256=checksum)
+            key = manifest_key(args.uid, model_name)
+            s3.put_object(Bucket=args.bucket, Key=key, Body=text.encode('utf-8'),
+                          ContentType='application/json')
+            print(f"[SUCCESS] s3://{args.bucket}/{key}: {describe(manifest)}")
+        except Exception as e:
+            print(f"[ERROR] {model_name}: {e}")
+            failed = True
+
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,790 @@
+#!/usr/bin/env python3
+"""
+Concurrent load generator with a local Function URL stand-in
+Sizes capacity before launches without touching AWS
+
+The stand-in is an HTTP server that turns requests into Function URL (payload
+v2.0) events and hands them to a pool of handler instances. Like Lambda, each
+instance is its own process serving one request at a time; a request that
+finds no idle instance spawns a new one (a real cold start: fresh interpreter,
+imports, model load) or gets a 429 once --max-instances are busy.
+
+With --shared-process the stand-in instead imports the handler once and serves
+every request through lambda_handler_async, like a long-running host (one
+process, shared sessions, --max-instances inference workers behind the
+handler's own per-uid admission control).
+
+With --tenant-limit requests pass weave_runtime.admission first (per-uid
+concurrency limits, weighted fair queuing, bounded per-tenant queues that
+answer 429 when full); with --shared-process it replaces the handler's
+default admission settings.
+
+The load generator sweeps either concurrency (closed loop: N clients sending
+back-to-back) or arrival rate (open loop: Poisson arrivals, latency measured
+from the scheduled arrival so queueing shows up) and reports
+latency-vs-throughput curves and error rates. --mode tenants measures a small
+tenant's latency alone and while a large tenant floods the same stand-in.
+
+Usage:
+    python load_test.py                                   # both sweeps, defaults
+    python load_test.py --mode closed --concurrency 1 4 16 32 --duration 10
+    python load_test.py --mode open --rates 50 100 200 400 --batch-size 8
+    python load_test.py --mode tenants --max-instances 4 --tenant-limit 2
+    python load_test.py --mode closed --shared-process --max-instances 8
+    python load_test.py --serve --port 8080               # stand-in only (curl it)
+    python load_test.py --url http://127.0.0.1:8080/      # load an existing endpoint
+"""
+
+import argparse
+import base64
+import http.client
+import json
+import multiprocessing
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+from benchmark_handler import percentiles, synthetic_corpus
+from weave_runtime.admission import AdmissionController, Rejected, request_tenant
+from weave_runtime.metrics import emit_admission_metrics
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+DEFAULT_CONCURRENCY = [1, 2, 4, 8, 16]
+DEFAULT_RATES = [25, 50, 100, 200]
+
+# Seconds between admission metric flushes in --serve mode
+ADMISSION_FLUSH_SECONDS = float(os.environ.get('ADMISSION_FLUSH_SECONDS', '60'))
+
+# Function URLs pass these content types through as text; anything else is base64
+TEXT_CONTENT_TYPES = ('application/json', 'text/', 'application/x-www-form-urlencoded')
+
+
+# ============================================================================
+# Function URL stand-in
+# ============================================================================
+
+def instance_main(conn, env: dict) -> None:
+    """
+    One handler instance: import the handler, then serve events from the pipe
+
+    Runs in a spawned process so every instance pays a real cold start.
+    """
+    os.environ.update(env)
+    sys.path.insert(0, HERE)
+    import inference_onnx
+
+    while True:
+        event = conn.recv()
+        if event is None:
+            break
+        try:
+            response = inference_onnx.lambda_handler(event, None)
+        except Exception as e:
+            # Lambda turns an unhandled exception into a 502 from the URL
+            response = {'statusCode': 502, 'body': json.dumps({'message': str(e)})}
+        conn.send(response)
+
+
+class Instance:
+    """A handler process plus the bookkeeping Lambda keeps per instance"""
+
+    def __init__(self, ctx, env: dict):
+        self.conn, child = ctx.Pipe()
+        self.process = ctx.Process(target=instance_main, args=(child, env), daemon=True)
+        self.process.start()
+        child.close()
+        self.served = 0
+        self.idle_since = time.monotonic()
+
+    def invoke(self, event: dict) -> dict:
+        self.conn.send(event)
+        self.served += 1
+        return self.conn.recv()
+
+    def stop(self) -> None:
+        try:
+            self.conn.send(None)
+        except (BrokenPipeError, OSError):
+            pass
+        self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.process.terminate()
+
+
+class InstancePool:
+    """
+    Lambda-style instance management
+
+    Idle instances are reused most-recently-used first (so the pool shrinks
+    naturally under lighter load), instances idle past idle_timeout are
+    reaped, and recycle_after retires an instance after that many requests
+    to force periodic cold starts.
+    """
+
+    def __init__(self, env: dict, max_instances: int = 32, idle_timeout: float = 300.0,
+                 recycle_after: int = 0):
+        self.ctx = multiprocessing.get_context('spawn')
+        self.env = env
+        self.max_instances = max_instances
+        self.idle_timeout = idle_timeout
+        self.recycle_after = recycle_after
+        self.lock = threading.Lock()
+        self.idle = []
+        self.total = 0
+        self.cold_starts = 0
+        self.throttles = 0
+
+    def prewarm(self, count: int) -> None:
+        """Start instances and push one request through each"""
+        event = {'uid': 'loadtest', 'model_name': self.env.get('LOADTEST_MODEL', ''), 'input': 'warm'}
+        instances = []
+        for _ in range(min(count, self.max_instances)):
+            instances.append(Instance(self.ctx, self.env))
+        for instance in instances:
+            instance.invoke(event)
+            instance.idle_since = time.monotonic()
+        with self.lock:
+            self.total += len(instances)
+            self.idle.extend(instances)
+
+    def acquire(self) -> tuple:
+        """(instance, cold) for one request; (None, False) when throttled"""
+        to_stop = []
+        with self.lock:
+            now = time.monotonic()
+            while self.idle and now - self.idle[0].idle_since > self.idle_timeout:
+                to_stop.append(self.idle.pop(0))
+                self.total -= 1
+
+            if self.idle:
+                instance, cold = self.idle.pop(), False
+            elif self.total < self.max_instances:
+                self.total += 1
+                self.cold_starts += 1
+                instance, cold = None, True
+            else:
+                self.throttles += 1
+                instance, cold = None, False
+
+        for old in to_stop:
+            old.stop()
+
+        if cold:
+            # Spawn outside the lock so other requests aren't blocked on it
+            instance = Instance(self.ctx, self.env)
+        return instance, cold
+
+    def release(self, instance) -> None:
+        """Return an instance after a request (or retire it)"""
+        if self.recycle_after and instance.served >= self.recycle_after:
+            instance.stop()
+            with self.lock:
+                self.total -= 1
+            return
+        instance.idle_since = time.monotonic()
+        with self.lock:
+            self.idle.append(instance)
+
+    def discard(self, instance) -> None:
+        """Drop an instance whose process died"""
+        instance.stop()
+        with self.lock:
+            self.total -= 1
+
+    def shutdown(self) -> None:
+        with self.lock:
+            idle, self.idle = self.idle, []
+        for instance in idle:
+            instance.stop()
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {'instances': self.total, 'idle': len(self.idle),
+                    'cold_starts': self.cold_starts, 'throttles': self.throttles}
+
+
+def build_function_url_event(method: str, path: str, headers: dict, body: bytes,
+                             source_ip: str) -> dict:
+    """Function URL (payload format 2.0) event for one HTTP request"""
+    raw_path, _, query = path.partition('?')
+    headers = {key.lower(): value for key, value in headers.items()}
+    content_type = headers.get('content-type', '')
+    is_text = not body or content_type.startswith(TEXT_CONTENT_TYPES)
+    now = time.time()
+
+    event = {
+        'version': '2.0',
+        'routeKey': '$default',
+        'rawPath': raw_path,
+        'rawQueryString': query,
+        'headers': headers,
+        'requestContext': {
+            'accountId': 'anonymous',
+            'domainName': headers.get('host', 'localhost'),
+            'http': {
+                'method': method,
+                'path': raw_path,
+                'protocol': 'HTTP/1.1',
+                'sourceIp': source_ip,
+                'userAgent': headers.get('user-agent', ''),
+            },
+            'requestId': str(uuid.uuid4()),
+            'routeKey': '$default',
+            'stage': '$default',
+            'time': time.strftime('%d/%b/%Y:%H:%M:%S +0000', time.gmtime(now)),
+            'timeEpoch': int(now * 1000),
+        },
+        'isBase64Encoded': not is_text,
+    }
+    if body:
+        event['body'] = body.decode('utf-8') if is_text else base64.b64encode(body).decode('ascii')
+    if query:
+        event['queryStringParameters'] = dict(
+            part.partition('=')[::2] for part in query.split('&') if part
+        )
+    return event
+
+
+class SharedProcessHost:
+    """
+    One in-process handler serving every request thread
+
+    Same interface as InstancePool (acquire / release / discard / stats), so
+    the stand-in can host the handler the way a long-running server would:
+    requests go through lambda_handler_async, whose max_concurrency workers
+    share sessions and whose admission control queues or rejects (429) each
+    tenant's excess requests. With admission control off, max_concurrency
+    bounds invocations in flight instead (beyond it requests get 429, like
+    reserved concurrency).
+    """
+
+    def __init__(self, env: dict, max_concurrency: int = 32, admission: AdmissionController = None):
+        env = dict(env, INFERENCE_THREADS=str(max_concurrency))
+        os.environ.update(env)
+        sys.path.insert(0, HERE)
+        import inference_onnx
+        from weave_runtime import histogram, metrics
+        # metrics and histogram were imported (for admission) before env was set
+        metrics.EMF_ENABLED = env.get('EMF_METRICS', '1') != '0'
+        inference_onnx.latency_histograms.flush_seconds = float(
+            env.get('HISTOGRAM_FLUSH_SECONDS', histogram.FLUSH_SECONDS))
+        inference_onnx.latency_histograms.flush_every = int(
+            env.get('HISTOGRAM_FLUSH_EVERY', histogram.FLUSH_EVERY))
+        if admission is not None:
+            inference_onnx.request_admission = admission
+        self.handler = inference_onnx
+        self.env = env
+        self.max_concurrency = max_concurrency
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.served = 0
+        self.throttles = 0
+
+    def prewarm(self, count: int) -> None:
+        """Load the model with one request (count doesn't matter: there is one process)"""
+        self.invoke({'uid': 'loadtest', 'model_name': self.env.get('LOADTEST_MODEL', ''), 'input': 'warm'})
+
+    def acquire(self) -> tuple:
+        """(host, cold) for one request; (None, False) when throttled"""
+        with self.lock:
+            if self.in_flight >= self.max_concurrency and self.handler.request_admission is None:
+                self.throttles += 1
+                return None, False
+            self.in_flight += 1
+            return self, self.served == 0
+
+    def invoke(self, event: dict) -> dict:
+        try:
+            return self.handler.lambda_handler_async(event).result()
+        except Exception as e:
+            return {'statusCode': 502, 'body': json.dumps({'message': str(e)})}
+
+    def release(self, instance) -> None:
+        with self.lock:
+            self.in_flight -= 1
+            self.served += 1
+
+    discard = release
+
+    def shutdown(self) -> None:
+        pass
+
+    def stats(self) -> dict:
+        with self.lock:
+            stats = {'instances': 1, 'in_flight': self.in_flight, 'served': self.served,
+                     'throttles': self.throttles}
+        stats['sessions'] = self.handler.session_registry.stats()
+        if self.handler.model_prefetcher is not None:
+            stats['prefetch'] = self.handler.model_prefetcher.stats()
+        if self.handler.model_revalidator is not None:
+            stats['revalidation'] = self.handler.model_revalidator.stats()
+        if self.handler.request_admission is not None:
+            stats['admission'] = self.handler.request_admission.stats()
+        return stats
+
+
+def make_request_handler(pool: InstancePool, admission: AdmissionController = None):
+    """BaseHTTPRequestHandler class bound to an instance pool (and admission layer)"""
+
+    class FunctionUrlHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        # Headers and body go out in separate writes; without this, Nagle plus
+        # delayed ACKs add ~40ms to every keep-alive response
+        disable_nagle_algorithm = True
+
+        def log_message(self, format, *args):
+            pass
+
+        def send_json(self, status: int, payload: dict, extra_headers: dict = None) -> None:
+            data = json.dumps(payload).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            for key, value in (extra_headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def handle_invoke(self):
+            length = int(self.headers.get('Content-Length') or 0)
+            body = self.rfile.read(length) if length else b''
+            event = build_function_url_event(self.command, self.path, dict(self.headers),
+                                             body, self.client_address[0])
+
+            ticket = None
+            if admission is not None:
+                try:
+                    payload = json.loads(body)
+                except ValueError:
+                    payload = None
+                try:
+                    ticket = admission.acquire(*request_tenant(payload))
+                except Rejected as e:
+                    self.send_json(429, {'Message': 'Rate Exceeded.', 'reason': e.reason},
+                                   {'Retry-After': f"{e.retry_after:g}"})
+                    return
+
+            try:
+                instance, cold = pool.acquire()
+                if instance is None:
+                    # What a Function URL returns when concurrency is exhausted
+                    self.send_json(429, {'Message': 'Rate Exceeded.'})
+                    return
+
+                start = time.perf_counter()
+                try:
+                    response = instance.invoke(event)
+                except (EOFError, BrokenPipeError, OSError):
+                    pool.discard(instance)
+                    self.send_json(502, {'Message': 'Internal Server Error'})
+                    return
+                pool.release(instance)
+                duration_ms = (time.perf_counter() - start) * 1000
+            finally:
+                if ticket is not None:
+                    admission.release(ticket)
+
+            status = response.get('statusCode', 200)
+            payload = response.get('body', '')
+            if response.get('isBase64Encoded'):
+                data = base64.b64decode(payload)
+            else:
+                data = payload.encode('utf-8') if isinstance(payload, str) else json.dumps(payload).encode('utf-8')
+
+            self.send_response(status)
+            headers = {'Content-Type': 'application/json'}
+            headers.update(response.get('headers') or {})
+            for key, value in headers.items():
+                if key.lower() != 'content-length':
+                    self.send_header(key, value)
+            self.send_header('Content-Length', str(len(data)))
+            # Stand-in extras so clients can separate cold starts from queueing
+            self.send_header('X-Weave-Cold-Start', '1' if cold else '0')
+            self.send_header('X-Weave-Duration-Ms', f"{duration_ms:.3f}")
+            if ticket is not None:
+                self.send_header('X-Weave-Queue-Ms', f"{ticket.wait_ms:.3f}")
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            if self.path == '/_stats':
+                stats = pool.stats()
+                if admission is not None:
+                    stats['admission'] = admission.stats()
+                self.send_json(200, stats)
+            else:
+                self.handle_invoke()
+
+        do_POST = handle_invoke
+        do_PUT = handle_invoke
+
+    return FunctionUrlHandler
+
+
+def start_stand_in(model_dir: str, host: str = '127.0.0.1', port: int = 0, max_instances: int = 32,
+                   idle_timeout: float = 300.0, recycle_after: int = 0, prewarm: int = 0,
+                   model_name: str = '', admission: AdmissionController = None,
+                   shared_process: bool = False) -> tuple:
+    """
+    Start the stand-in in a background thread
+
+    Args:
+        admission: Optional admission layer; its capacity should be max_instances
+        shared_process: Serve from one in-process handler shared by all request
+                        threads instead of a pool of instance processes (the
+                        admission layer then replaces the handler's own)
+
+    Returns:
+        (server, pool, url)
+    """
+    env = {
+        'LOCAL_MODEL_DIR': model_dir,
+        'EMF_METRICS': '0',
+        'LOG_LEVEL': 'ERROR',
+        'HISTOGRAM_FLUSH_EVERY': str(10**9),
+        'HISTOGRAM_FLUSH_SECONDS': str(10**9),
+        'LOADTEST_MODEL': model_name,
+    }
+    if shared_process:
+        pool = SharedProcessHost(env, max_instances, admission)
+        admission = None
+    else:
+        pool = InstancePool(env, max_instances, idle_timeout, recycle_after)
+    if prewarm:
+        pool.prewarm(prewarm)
+
+    server = ThreadingHTTPServer((host, port), make_request_handler(pool, admission))
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    url = f"http://{host}:{server.server_address[1]}/"
+    return server, pool, url
+
+
+# ============================================================================
+# Load generator
+# ============================================================================
+
+class Client:
+    """Keep-alive HTTP client for one load thread"""
+
+    def __init__(self, url: str, timeout: float = 60.0):
+        parts = urlsplit(url)
+        self.path = parts.path or '/'
+        self.https = parts.scheme == 'https'
+        self.netloc = parts.netloc
+        self.timeout = timeout
+        self.conn = None
+
+    def post(self, payload: bytes) -> tuple:
+        """(status, cold) for one request; raises on transport errors"""
+        for attempt in range(2):
+            if self.conn is None:
+                cls = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+                self.conn = cls(self.netloc, timeout=self.timeout)
+            try:
+                self.conn.request('POST', self.path, payload, {'Content-Type': 'application/json'})
+                response = self.conn.getresponse()
+                response.read()
+                return response.status, response.getheader('X-Weave-Cold-Start') == '1'
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                # Stale keep-alive connection: reconnect once
+                self.conn.close()
+                self.conn = None
+                if attempt:
+                    raise
+
+
+def request_payloads(model_name: str, batch_size: int, count: int = 64, uid: str = 'loadtest') -> list:
+    """A rotating set of request bodies"""
+    payloads = []
+    for i, length in enumerate([32, 128, 512] * (count // 3 + 1)):
+        texts = synthetic_corpus(batch_size, length, seed=i)
+        body = {'uid': uid, 'model_name': model_name,
+                'input': texts if batch_size > 1 else texts[0]}
+        payloads.append(json.dumps(body).encode('utf-8'))
+    return payloads[:count]
+
+
+def summarize(samples: list, duration_s: float) -> dict:
+    """
+    Latency/throughput/error summary for one load level
+
+    samples: (latency_ms, status, cold) tuples; status None = transport error
+    """
+    ok = [latency for latency, status, _ in samples if status == 200]
+    throttled = sum(1 for _, status, _ in samples if status == 429)
+    errors = sum(1 for _, status, _ in samples if status != 200)
+    result = {
+        'requests': len(samples),
+        'ok': len(ok),
+        'throttled': throttled,
+        'errors': errors,
+        'error_rate': round(errors / len(samples), 4) if samples else 0.0,
+        'throughput_rps': round(len(ok) / duration_s, 2) if duration_s else 0.0,
+        'cold_starts': sum(1 for _, _, cold in samples if cold),
+    }
+    if ok:
+        result.update(percentiles(ok))
+        result['max_ms'] = round(max(ok), 4)
+    return result
+
+
+def run_closed_loop(url: str, payloads: list, concurrency: int, duration: float) -> dict:
+    """N clients, each sending its next request as soon as the last one returns"""
+    samples = []
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def worker(index):
+        client = Client(url)
+        local = []
+        i = index
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                status, cold = client.post(payloads[i % len(payloads)])
+            except OSError:
+                status, cold = None, False
+                client.conn = None
+            local.append(((time.perf_counter() - start) * 1000, status, cold))
+            i += concurrency
+        with lock:
+            samples.extend(local)
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    result = {'mode': 'closed', 'concurrency': concurrency, 'duration_s': round(elapsed, 3)}
+    result.update(summarize(samples, elapsed))
+    return result
+
+
+def run_open_loop(url: str, payloads: list, rate: float, duration: float,
+                  max_inflight: int = 256, seed: int = 42) -> dict:
+    """
+    Poisson arrivals at `rate` requests/s, independent of response times
+
+    Latency is measured from each request's scheduled arrival, so time spent
+    waiting for a free sender counts (no coordinated omission).
+    """
+    rng = random.Random(seed)
+    samples = []
+    lock = threading.Lock()
+    local = threading.local()
+
+    def send(scheduled, payload):
+        client = getattr(local, 'client', None)
+        if client is None:
+            client = local.client = Client(url)
+        try:
+            status, cold = client.post(payload)
+        except OSError:
+            status, cold = None, False
+            client.conn = None
+        sample = ((time.perf_counter() - scheduled) * 1000, status, cold)
+        with lock:
+            samples.append(sample)
+
+    start = time.perf_counter()
+    next_arrival = start
+    i = 0
+    with ThreadPoolExecutor(max_workers=max_inflight) as executor:
+        while True:
+            next_arrival += rng.expovariate(rate)
+            if next_arrival - start >= duration:
+                break
+            delay = next_arrival - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            executor.submit(send, next_arrival, payloads[i % len(payloads)])
+            i += 1
+    elapsed = time.perf_counter() - start
+
+    result = {'mode': 'open', 'offered_rps': rate, 'duration_s': round(elapsed, 3)}
+    result.update(summarize(samples, elapsed))
+    return result
+
+
+def run_tenant_spike(url: str, model_name: str, duration: float, small_rate: float,
+                     big_concurrency: int, big_batch: int, max_inflight: int = 256) -> dict:
+    """
+    A small tenant's latency alone, then while a large tenant floods the endpoint
+
+    The small tenant sends single-item requests as Poisson arrivals; the
+    large one runs a closed loop of big batches from many clients. With
+    per-tenant admission the small tenant's p99 should barely move.
+    """
+    small = request_payloads(model_name, 1, uid='tenant-small')
+    big = request_payloads(model_name, big_batch, uid='tenant-big')
+
+    alone = run_open_loop(url, small, small_rate, duration, max_inflight)
+
+    spike = {}
+    flood = threading.Thread(
+        target=lambda: spike.update(run_closed_loop(url, big, big_concurrency, duration))
+    )
+    flood.start()
+    contended = run_open_loop(url, small, small_rate, duration, max_inflight, seed=7)
+    flood.join()
+
+    return {'small_alone': alone, 'small_during_spike': contended, 'big_spike': spike}
+
+
+def print_curve(title: str, key: str, rows: list) -> None:
+    """Latency-vs-throughput table"""
+    print(f"\n{title}")
+    print(f"  {key:>10} {'rps':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} "
+          f"{'errors':>7} {'429s':>6} {'cold':>5}")
+    for row in rows:
+        print(f"  {row[key]:>10} {row['throughput_rps']:>9.1f} {row.get('p50_ms', 0):>9.2f} "
+              f"{row.get('p95_ms', 0):>9.2f} {row.get('p99_ms', 0):>9.2f} "
+              f"{row['error_rate']:>7.2%} {row['throttled']:>6} {row['cold_starts']:>5}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--mode', choices=['closed', 'open', 'both', 'tenants'], default='both')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=DEFAULT_CONCURRENCY)
+    parser.add_argument('--rates', type=float, nargs='+', default=DEFAULT_RATES,
+                        help='Open-loop arrival rates (requests/s)')
+    parser.add_argument('--duration', type=float, default=10.0, help='Seconds per load level')
+    parser.add_argument('--batch-size', type=int, default=1)
+    parser.add_argument('--model-name', default='sentiment-model.onnx')
+    parser.add_argument('--model-dir', default=HERE, help='LOCAL_MODEL_DIR for the stand-in')
+    parser.add_argument('--max-instances', type=int, default=32,
+                        help='Reserved concurrency: requests beyond it get 429')
+    parser.add_argument('--idle-timeout', type=float, default=300.0,
+                        help='Seconds before an idle instance is reaped')
+    parser.add_argument('--recycle-after', type=int, default=0,
+                        help='Retire instances after N requests (forces cold starts)')
+    parser.add_argument('--prewarm', type=int, default=0, help='Instances to start warm')
+    parser.add_argument('--shared-process', action='store_true',
+                        help='One multithreaded handler process instead of Lambda-style instances')
+    parser.add_argument('--max-inflight', type=int, default=256,
+                        help='Open-loop sender threads')
+    parser.add_argument('--tenant-limit', type=int, default=0,
+                        help='Per-uid concurrency limit; enables admission control (0 = off)')
+    parser.add_argument('--tenant-queue', type=int, default=16,
+                        help='Per-uid queue length before requests get 429')
+    parser.add_argument('--queue-timeout', type=float, default=10.0,
+                        help='Seconds a request may wait for a slot before 429')
+    parser.add_argument('--tenant-weight', action='append', default=[], metavar='UID=WEIGHT',
+                        help='Fair-queuing weight for a uid (default 1)')
+    parser.add_argument('--small-rate', type=float, default=20.0,
+                        help='Tenants mode: small tenant arrival rate (requests/s)')
+    parser.add_argument('--big-concurrency', type=int, default=16,
+                        help='Tenants mode: large tenant clients')
+    parser.add_argument('--big-batch', type=int, default=64,
+                        help='Tenants mode: large tenant batch size')
+    parser.add_argument('--url', help='Load this endpoint instead of starting the stand-in')
+    parser.add_argument('--serve', action='store_true', help='Only run the stand-in')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=0)
+    parser.add_argument('--output', default='load_results.json')
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+
+    print("="*70)
+    print(" "*22 + "WEAVE LOAD TEST")
+    print("="*70)
+
+    server = pool = admission = None
+    url = args.url
+    if not url:
+        if args.tenant_limit:
+            weights = {uid: float(weight) for uid, _, weight in
+                       (item.partition('=') for item in args.tenant_weight)}
+            admission = AdmissionController(args.max_instances, args.tenant_limit, args.tenant_queue,
+                                            args.queue_timeout, weights)
+        server, pool, url = start_stand_in(
+            args.model_dir, args.host, args.port if args.serve else 0, args.max_instances,
+            args.idle_timeout, args.recycle_after, args.prewarm, args.model_name, admission,
+            args.shared_process
+        )
+        print(f"\nFunction URL stand-in: {url} (max {args.max_instances} "
+              + ("concurrent, shared process" if args.shared_process else "instances")
+              + (f", {args.tenant_limit} per tenant)" if admission else ")"))
+
+    if args.serve:
+        if admission is not None:
+            def flush_admission():
+                while True:
+                    time.sleep(ADMISSION_FLUSH_SECONDS)
+                    emit_admission_metrics(admission.flush())
+            threading.Thread(target=flush_admission, daemon=True).start()
+
+        print("Serving until Ctrl+C (GET /_stats for pool stats)")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
+        pool.shutdown()
+        sys.exit(0)
+
+    payloads = request_payloads(args.model_name, args.batch_size)
+    report = {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'target': args.url or 'stand-in',
+        'model_name': args.model_name,
+        'batch_size': args.batch_size,
+        'duration_s': args.duration,
+        'closed_loop': [],
+        'open_loop': [],
+        'admission': {'tenant_limit': args.tenant_limit, 'tenant_queue': args.tenant_queue}
+                     if admission else None,
+    }
+
+    try:
+        if args.mode in ('closed', 'both'):
+            for concurrency in args.concurrency:
+                row = run_closed_loop(url, payloads, concurrency, args.duration)
+                report['closed_loop'].append(row)
+                print(f"  closed c={concurrency:<4} {row['throughput_rps']:8.1f} rps  "
+                      f"p99={row.get('p99_ms', 0):.2f}ms  errors={row['error_rate']:.2%}")
+            print_curve("Closed loop (latency vs throughput)", 'concurrency', report['closed_loop'])
+
+        if args.mode in ('open', 'both'):
+            for rate in args.rates:
+                row = run_open_loop(url, payloads, rate, args.duration, args.max_inflight)
+                report['open_loop'].append(row)
+                print(f"  open  λ={rate:<6g} {row['throughput_rps']:8.1f} rps  "
+                      f"p99={row.get('p99_ms', 0):.2f}ms  errors={row['error_rate']:.2%}")
+            print_curve("Open loop, Poisson arrivals (latency vs throughput)", 'offered_rps',
+                        report['open_loop'])
+
+        if args.mode == 'tenants':
+            report['tenants'] = run_tenant_spike(url, args.model_name, args.duration, args.small_rate,
+                                                 args.big_concurrency, args.big_batch, args.max_inflight)
+            print(f"\nTenant isolation ({'admission on' if admission else 'admission off'})")
+            print(f"  {'scenario':<22} {'rps':>9} {'p50 ms':>9} {'p99 ms':>9} {'429s':>6} {'errors':>7}")
+            for name, row in report['tenants'].items():
+                print(f"  {name:<22} {row['throughput_rps']:>9.1f} {row.get('p50_ms', 0):>9.2f} "
+                      f"{row.get('p99_ms', 0):>9.2f} {row['throttled']:>6} {row['error_rate']:>7.2%}")
+    finally:
+        if pool:
+            report['pool'] = pool.stats()
+            if admission is not None:
+                report['pool']['admission'] = admission.stats()
+            server.shutdown()
+            pool.shutdown()
+
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n[SUCCESS] Results written to {args.output}")
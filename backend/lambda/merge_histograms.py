@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Merge latency histogram flushes from many Lambda instances
+Reads CloudWatch log exports (one JSON record per line) and prints merged percentiles
+
+Usage:
+    python merge_histograms.py logs1.txt [logs2.txt ...]
+    aws logs filter-log-events ... | python merge_histograms.py -
+"""
+
+import json
+import sys
+
+from weave_runtime.histogram import merge_serialized
+
+
+def read_flushes(paths):
+    """Yield latency_histograms records from log files (or '-' for stdin)"""
+    for path in paths:
+        stream = sys.stdin if path == '-' else open(path)
+        try:
+            for line in stream:
+                # Exported lines may carry a timestamp/request-id prefix
+                start = line.find('{')
+                if start < 0 or '"latency_histograms"' not in line:
+                    continue
+                try:
+                    record = json.loads(line[start:])
+                except ValueError:
+                    continue
+                if record.get('event') == 'latency_histograms':
+                    yield record
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+
+    records = list(read_flushes(sys.argv[1:]))
+    merged = merge_serialized(records)
+
+    print("="*70)
+    print(f"MERGED LATENCY PERCENTILES ({len(records)} flushes, ms)")
+    print("="*70)
+    print(f"  {'model':32s} {'stage':12s} {'count':>8s} {'p50':>9s} {'p99':>9s} {'p99.9':>9s} {'max':>9s}")
+
+    for key in sorted(merged):
+        model, stage = key.rsplit('|', 1)
+        summary = merged[key].summary(scale=1000.0)
+        print(f"  {model[:32]:32s} {stage:12s} {summary['count']:8d} "
+              f"{summary['p50']:9.3f} {summary['p99']:9.3f} {summary['p999']:9.3f} {summary['max']:9.3f}")
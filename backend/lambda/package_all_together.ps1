@@ -31,6 +31,7 @@ if (Test-Path "package_temp\python") {
 # Add the Lambda handler
 Write-Host "[3/4] Adding Lambda handler..." -ForegroundColor Yellow
 Copy-Item "inference_onnx.py" -Destination "package_temp\inference_onnx.py"
+Copy-Item "weave_runtime" -Destination "package_temp\weave_runtime" -Recurse -Exclude "__pycache__"
 
 # Create final zip
 Write-Host "[4/4] Creating final package..." -ForegroundColor Yellow
@@ -48,6 +49,7 @@ Write-Host "Created: lambda-complete.zip ($sizeMB MB)" -ForegroundColor Green
 Write-Host ""
 Write-Host "This package contains:" -ForegroundColor Yellow
 Write-Host "  - inference_onnx.py (your handler)" -ForegroundColor White
+Write-Host "  - weave_runtime (handler helpers)" -ForegroundColor White
 Write-Host "  - onnxruntime (Linux)" -ForegroundColor White
 Write-Host "  - numpy (Linux)" -ForegroundColor White
 Write-Host "  - All dependencies" -ForegroundColor White
@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+"""
+Performance regression gate against a checked-in baseline
+Fails (exit 1) when a key metric regresses beyond its noise-aware threshold
+
+Every repeat runs in a fresh interpreter and yields one sample per metric:
+import time, first-request cold load, in-process cold load, warm p50/p99 per
+model and batch size. A metric fails only when all of these hold:
+
+  * its median moved up by more than max(--threshold, 3x the baseline's
+    relative spread, measured as scaled MAD),
+  * a one-sided Mann-Whitney U test says current > baseline with p < --alpha, and
+  * the move exceeds timer noise: MIN_DELTA_MS, capped at 5% of the baseline.
+
+Package size is deterministic and compared directly.
+
+Baselines are machine specific: record them on the machine that runs the gate.
+
+Usage:
+    python perf_gate.py record                  # write perf_baseline.json
+    python perf_gate.py check                   # exit 1 on regression
+    python perf_gate.py check --repeats 9 --threshold 0.15
+"""
+
+import argparse
+import io
+import json
+import math
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import zipfile
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join(HERE, 'perf_baseline.json')
+
+GATE_MODELS = ['sentiment-model.onnx', 'mock-missing-model.onnx']
+GATE_BATCH_SIZES = [1, 64, 256]
+WARM_ITERATIONS = 200
+
+REPEATS = 7
+ALPHA = 0.05
+THRESHOLD = 0.10
+# Tails are noisier than medians
+P99_THRESHOLD = 0.25
+NOISE_MULTIPLIER = 3.0
+# Differences below this are timer noise whatever the ratio says (matters with a
+# low --threshold); capped at a share of the baseline so it never hides a
+# slowdown of a sub-0.1 ms path
+MIN_DELTA_MS = 0.02
+MIN_DELTA_SHARE = 0.05
+SIZE_THRESHOLD = 0.02
+
+HANDLER_FILES = ['inference_onnx.py']
+RUNTIME_PACKAGE = 'weave_runtime'
+
+
+def collect_once() -> dict:
+    """
+    One sample of every metric (runs in a fresh interpreter via --collect)
+
+    Returns:
+        {metric_name: value}
+    """
+    os.environ['LOCAL_MODEL_DIR'] = HERE
+    os.environ['EMF_METRICS'] = '0'
+    os.environ['LOG_LEVEL'] = 'ERROR'
+    os.environ['HISTOGRAM_FLUSH_EVERY'] = str(10**9)
+    os.environ['HISTOGRAM_FLUSH_SECONDS'] = str(10**9)
+    sys.path.insert(0, HERE)
+
+    start = time.perf_counter()
+    import inference_onnx as handler
+    metrics = {'import_ms': (time.perf_counter() - start) * 1000}
+
+    from benchmark_handler import bench_cold_load, bench_warm, invoke, make_event
+
+    metrics['first_request_ms'] = invoke(handler, make_event(GATE_MODELS[0], ['great product']))
+    metrics['cold_load_ms'] = bench_cold_load(handler, GATE_MODELS[0], 5)['p50_ms']
+
+    for model_name in GATE_MODELS:
+        handler.reset_model_cache()
+        for batch_size in GATE_BATCH_SIZES:
+            iterations = max(20, WARM_ITERATIONS // max(1, batch_size // 16))
+            result = bench_warm(handler, model_name, batch_size, 128, iterations, 0)
+            prefix = f"warm.{model_name}.b{batch_size}"
+            metrics[f"{prefix}.p50_ms"] = result['p50_ms']
+            metrics[f"{prefix}.p99_ms"] = result['p99_ms']
+
+    return metrics
+
+
+def handler_package_bytes() -> int:
+    """Size of a deflated zip of the handler and weave_runtime (no dependencies)"""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as zf:
+        for name in HANDLER_FILES:
+            zf.write(os.path.join(HERE, name), name)
+        for root, dirs, files in os.walk(os.path.join(HERE, RUNTIME_PACKAGE)):
+            dirs[:] = sorted(d for d in dirs if d != '__pycache__')
+            for name in sorted(files):
+                if name.endswith('.py'):
+                    path = os.path.join(root, name)
+                    zf.write(path, os.path.relpath(path, HERE))
+    return len(buffer.getvalue())
+
+
+def collect(repeats: int) -> dict:
+    """Run collect_once in `repeats` fresh interpreters; {metric: [samples]}"""
+    samples = {}
+    for i in range(repeats):
+        print(f"  repeat {i + 1}/{repeats}...")
+        proc = subprocess.run([sys.executable, os.path.abspath(__file__), '--collect'],
+                              cwd=HERE, capture_output=True, text=True)
+        if proc.returncode != 0:
+            raise RuntimeError(f"Benchmark run failed: {proc.stderr.strip()[-500:]}")
+        for name, value in json.loads(proc.stdout.strip().splitlines()[-1]).items():
+            samples.setdefault(name, []).append(round(value, 5))
+    return samples
+
+
+def mann_whitney_greater(current: list, baseline: list) -> float:
+    """
+    One-sided Mann-Whitney U p-value for "current tends to be larger"
+
+    Normal approximation with tie and continuity corrections; fine for the
+    5-15 samples per side the gate uses.
+    """
+    n1, n2 = len(current), len(baseline)
+    pooled = sorted([(value, 0) for value in current] + [(value, 1) for value in baseline])
+
+    # Average ranks over ties
+    ranks = [0.0] * len(pooled)
+    tie_term = 0
+    i = 0
+    while i < len(pooled):
+        j = i
+        while j + 1 < len(pooled) and pooled[j + 1][0] == pooled[i][0]:
+            j += 1
+        for k in range(i, j + 1):
+            ranks[k] = (i + j) / 2.0 + 1
+        t = j - i + 1
+        tie_term += t ** 3 - t
+        i = j + 1
+
+    rank_sum = sum(rank for rank, (_, group) in zip(ranks, pooled) if group == 0)
+    u = rank_sum - n1 * (n1 + 1) / 2.0
+    mean = n1 * n2 / 2.0
+    n = n1 + n2
+    variance = n1 * n2 / 12.0 * ((n + 1) - tie_term / (n * (n - 1)))
+    if variance <= 0:
+        return 1.0 if u <= mean else 0.0
+    z = (u - mean - 0.5) / math.sqrt(variance)
+    return 0.5 * math.erfc(z / math.sqrt(2))
+
+
+def relative_spread(samples: list) -> float:
+    """Scaled median absolute deviation relative to the median"""
+    median = statistics.median(samples)
+    if not median:
+        return 0.0
+    mad = statistics.median(abs(value - median) for value in samples)
+    return 1.4826 * mad / median
+
+
+def compare_metric(name: str, baseline: list, current: list, alpha: float,
+                   threshold: float) -> dict:
+    """Verdict for one latency metric"""
+    base_median = statistics.median(baseline)
+    cur_median = statistics.median(current)
+    change = (cur_median - base_median) / base_median if base_median else 0.0
+
+    rel_threshold = P99_THRESHOLD if name.endswith('p99_ms') else threshold
+    allowed = max(rel_threshold, NOISE_MULTIPLIER * relative_spread(baseline))
+    p_value = mann_whitney_greater(current, baseline)
+
+    min_delta = min(MIN_DELTA_MS, MIN_DELTA_SHARE * base_median)
+    regressed = (change > allowed and p_value < alpha
+                 and cur_median - base_median > min_delta)
+    return {
+        'metric': name,
+        'baseline': round(base_median, 4),
+        'current': round(cur_median, 4),
+        'change': round(change, 4),
+        'allowed': round(allowed, 4),
+        'p_value': round(p_value, 4),
+        'regressed': regressed,
+    }
+
+
+def compare(baseline: dict, current: dict, alpha: float, threshold: float) -> list:
+    """Verdicts for every metric present in both runs"""
+    verdicts = []
+    for name, base_samples in sorted(baseline['samples'].items()):
+        if name in current['samples']:
+            verdicts.append(compare_metric(name, base_samples, current['samples'][name],
+                                           alpha, threshold))
+
+    base_size, cur_size = baseline['package_bytes'], current['package_bytes']
+    change = (cur_size - base_size) / base_size
+    verdicts.append({
+        'metric': 'package_bytes',
+        'baseline': base_size,
+        'current': cur_size,
+        'change': round(change, 4),
+        'allowed': SIZE_THRESHOLD,
+        'p_value': None,
+        'regressed': change > SIZE_THRESHOLD,
+    })
+    return verdicts
+
+
+def run_benchmarks(repeats: int) -> dict:
+    """Samples plus the environment they were taken in"""
+    import numpy
+    import onnxruntime
+
+    return {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'repeats': repeats,
+        'environment': {
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'cpu_count': os.cpu_count(),
+            'numpy': numpy.__version__,
+            'onnxruntime': onnxruntime.__version__,
+        },
+        'package_bytes': handler_package_bytes(),
+        'samples': collect(repeats),
+    }
+
+
+def print_verdicts(verdicts: list) -> None:
+    print(f"\n  {'metric':<48} {'baseline':>10} {'current':>10} {'change':>8} "
+          f"{'allowed':>8} {'p':>7}")
+    for v in verdicts:
+        status = '[FAIL]' if v['regressed'] else '      '
+        p_value = f"{v['p_value']:.4f}" if v['p_value'] is not None else '-'
+        print(f"  {v['metric']:<48} {v['baseline']:>10} {v['current']:>10} "
+              f"{v['change']:>+8.1%} {v['allowed']:>8.1%} {p_value:>7} {status}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('command', nargs='?', choices=['record', 'check'], default='check')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--repeats', type=int, default=REPEATS)
+    parser.add_argument('--alpha', type=float, default=ALPHA)
+    parser.add_argument('--threshold', type=float, default=THRESHOLD,
+                        help='Minimum relative slowdown of a median that can fail the gate')
+    parser.add_argument('--output', help='Also write the current run and verdicts here')
+    parser.add_argument('--collect', action='store_true', help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+
+    if args.collect:
+        print(json.dumps(collect_once()))
+        sys.exit(0)
+
+    print("="*70)
+    print(" "*20 + "PERFORMANCE REGRESSION GATE")
+    print("="*70)
+
+    print(f"\nRunning benchmarks ({args.repeats} fresh-process repeats)...")
+    current = run_benchmarks(args.repeats)
+
+    if args.command == 'record':
+        with open(args.baseline, 'w') as f:
+            json.dump(current, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f"\n[SUCCESS] Baseline written to {args.baseline}")
+        sys.exit(0)
+
+    if not os.path.exists(args.baseline):
+        print(f"\n[ERROR] No baseline at {args.baseline}; run 'python perf_gate.py record' first")
+        sys.exit(2)
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+
+    if baseline.get('environment') != current['environment']:
+        print("\n[WARNING] Baseline was recorded in a different environment:")
+        print(f"  baseline: {baseline.get('environment')}")
+        print(f"  current:  {current['environment']}")
+
+    verdicts = compare(baseline, current, args.alpha, args.threshold)
+    print_verdicts(verdicts)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'current': current, 'verdicts': verdicts}, f, indent=2)
+
+    failed = [v['metric'] for v in verdicts if v['regressed']]
+    if failed:
+        print(f"\n[FAIL] {len(failed)} metric(s) regressed: {', '.join(failed)}")
+        sys.exit(1)
+    print(f"\n[SUCCESS] No regressions across {len(verdicts)} metrics")
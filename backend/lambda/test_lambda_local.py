@@ -218,7 +218,7 @@ def lambda_handler(event, context=None):
                 'Content-Type': 'application/json',
                 'Access-Control-Allow-Origin': '*'
             },
-            'body': json.dumps(response_body, indent=2)
+            'body': json.dumps(response_body, separators=(',', ':'))
         }
         
     except Exception as e:
@@ -0,0 +1,85 @@
+import base64
+import hashlib
+import io
+import os
+import sys
+
+import pytest
+from botocore.exceptions import ClientError
+
+HERE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Tests import the handler's modules the way the Lambda runtime does: from the package root
+sys.path.insert(0, HERE)
+
+# The handler serves the checked-in models offline, quietly
+os.environ.setdefault('LOCAL_MODEL_DIR', HERE)
+os.environ.setdefault('EMF_METRICS', '0')
+os.environ.setdefault('LOG_LEVEL', 'ERROR')
+
+
+class FakeS3:
+    """In-memory stand-in for the handler's S3 client (head/get/put/copy/download_file)"""
+
+    def __init__(self, exceptions):
+        self.exceptions = exceptions
+        self.objects = {}
+        self.calls = []
+
+    def put(self, key: str, body: bytes, **head) -> None:
+        head.setdefault('ETag', f'"{hashlib.md5(body).hexdigest()}"')
+        self.objects[key] = (body, dict(head, ContentLength=len(body)))
+
+    def _lookup(self, operation: str, Key: str):
+        self.calls.append((operation, Key))
+        if Key not in self.objects:
+            raise ClientError({'Error': {'Code': '404', 'Message': 'Not Found'}}, operation)
+        return self.objects[Key]
+
+    def head_object(self, Bucket, Key, **kwargs):
+        return dict(self._lookup('HeadObject', Key)[1])
+
+    def get_object(self, Bucket, Key, **kwargs):
+        if Key not in self.objects:
+            self.calls.append(('GetObject', Key))
+            raise self.exceptions.NoSuchKey({'Error': {'Code': 'NoSuchKey'}}, 'GetObject')
+        body, head = self._lookup('GetObject', Key)
+        return dict(head, Body=io.BytesIO(body))
+
+    def put_object(self, Bucket, Key, Body, **kwargs):
+        self.put(Key, Body)
+
+    def copy_object(self, Bucket, Key, CopySource, Metadata=None, ChecksumAlgorithm=None, **kwargs):
+        body, head = self._lookup('CopyObject', CopySource['Key'])
+        head = {'Metadata': dict(Metadata or head.get('Metadata') or {})}
+        if ChecksumAlgorithm == 'SHA256':
+            head['ChecksumSHA256'] = base64.b64encode(hashlib.sha256(body).digest()).decode()
+        self.put(Key, body, **head)
+
+    def download_file(self, Bucket, Key, Filename, ExtraArgs=None):
+        body, head = self._lookup('GetObject', Key)
+        if ExtraArgs and ExtraArgs.get('IfMatch') not in (None, head['ETag']):
+            raise ClientError({'Error': {'Code': '412'}}, 'GetObject')
+        with open(Filename, 'wb') as f:
+            f.write(body)
+
+
+@pytest.fixture
+def s3_handler(monkeypatch, tmp_path):
+    """The inference handler reading models from a FakeS3 bucket, with empty caches"""
+    import inference_onnx
+    from weave_runtime.model_cache import DiskModelCache
+    from weave_runtime.session_registry import SessionRegistry
+
+    fake = FakeS3(inference_onnx.s3_client.exceptions)
+    monkeypatch.setattr(inference_onnx, 's3_client', fake)
+    monkeypatch.setattr(inference_onnx, 'LOCAL_MODEL_DIR', '')
+    monkeypatch.setattr(inference_onnx, 'EXTERNAL_DATA_DIR', str(tmp_path / 'external'))
+    monkeypatch.setattr(inference_onnx, 'model_disk_cache', DiskModelCache(str(tmp_path / 'models')))
+    monkeypatch.setattr(inference_onnx, 'session_registry', SessionRegistry(max_models=4))
+    monkeypatch.setattr(inference_onnx, 'model_objects', {})
+    monkeypatch.setattr(inference_onnx, 'model_external_data', {})
+    monkeypatch.setattr(inference_onnx, 'model_prefetcher', None)
+    monkeypatch.setattr(inference_onnx, 'model_revalidator', None)
+    monkeypatch.setattr(inference_onnx, 'WRITE_MISSING_MANIFESTS', False)
+    return inference_onnx, fake
@@ -0,0 +1,206 @@
+import json
+import threading
+import time
+
+import pytest
+
+from weave_runtime.admission import AdmissionController, Rejected, request_tenant
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, 'condition not reached'
+        time.sleep(0.001)
+
+
+def test_admits_without_queueing_under_capacity():
+    controller = AdmissionController(capacity=2)
+    first, second = controller.acquire('a'), controller.acquire('b')
+    assert controller.in_flight == 2 and controller.queued == 0
+    controller.release(first)
+    controller.release(second)
+    assert controller.in_flight == 0
+
+
+def test_full_queue_is_rejected():
+    controller = AdmissionController(capacity=1, queue_limit=0)
+    held = controller.acquire('a')
+    with pytest.raises(Rejected) as excinfo:
+        controller.acquire('b')
+    assert excinfo.value.reason == 'queue_full'
+    assert controller.stats()['tenants']['b']['rejected'] == 1
+    controller.release(held)
+
+
+def test_freed_slot_goes_to_the_smallest_finish_tag():
+    controller = AdmissionController(capacity=1, queue_timeout=5)
+    held = controller.acquire('big', cost=64)
+    order = []
+
+    def run(uid, cost):
+        with controller.admit(uid, cost):
+            order.append(uid)
+
+    big = threading.Thread(target=run, args=('big', 64))
+    big.start()
+    wait_for(lambda: controller.queued == 1)
+    small = threading.Thread(target=run, args=('small', 1))
+    small.start()
+    wait_for(lambda: controller.queued == 2)
+
+    controller.release(held)
+    big.join(5)
+    small.join(5)
+    assert order == ['small', 'big']
+    assert controller.in_flight == 0
+
+
+def test_per_tenant_limit_leaves_slots_for_others():
+    controller = AdmissionController(capacity=2, per_tenant_limit=1, queue_timeout=5)
+    held = controller.acquire('a')
+    queued = threading.Thread(target=lambda: controller.release(controller.acquire('a')))
+    queued.start()
+    wait_for(lambda: controller.queued == 1)
+
+    other = controller.acquire('b')
+    assert controller.in_flight == 2
+    controller.release(other)
+    controller.release(held)
+    queued.join(5)
+    assert controller.in_flight == 0 and controller.queued == 0
+
+
+def test_queued_timeout_gives_virtual_time_back():
+    controller = AdmissionController(capacity=1, per_tenant_limit=1, queue_timeout=0.05)
+    held = controller.acquire('big')
+    before = controller.tenants['big'].last_finish
+
+    with pytest.raises(Rejected) as excinfo:
+        controller.acquire('big', cost=64)
+    assert excinfo.value.reason == 'queue_timeout'
+
+    tenant = controller.tenants['big']
+    assert tenant.last_finish == before
+    assert not tenant.queue and controller.queued == 0
+    controller.release(held)
+
+
+def test_withdrawn_ticket_moves_later_tickets_up():
+    controller = AdmissionController(capacity=1, per_tenant_limit=1, queue_timeout=5)
+    held = controller.acquire('a')
+    rejected, admitted = [], []
+    controller.submit('a', 10, admitted.append, rejected.append)
+    controller.submit('a', 1, admitted.append, rejected.append)
+    tenant = controller.tenants['a']
+    first, second = tenant.queue
+
+    with controller.lock:
+        controller._withdraw(first, tenant)
+    assert second.start_tag == first.start_tag
+    assert tenant.last_finish == second.finish_tag == first.start_tag + 1
+
+    controller.release(held)
+    assert admitted == [second] and not rejected
+
+
+def test_submit_admits_without_blocking():
+    controller = AdmissionController(capacity=1)
+    admitted, rejected = [], []
+
+    controller.submit('a', 1, admitted.append, rejected.append)
+    assert len(admitted) == 1 and not rejected
+
+    # Queued behind the first; admitted by the release, on the releasing thread
+    controller.submit('b', 1, admitted.append, rejected.append)
+    assert len(admitted) == 1
+    controller.release(admitted[0])
+    assert len(admitted) == 2 and admitted[1].uid == 'b'
+    controller.release(admitted[1])
+    assert controller.in_flight == 0
+
+
+def test_submit_rejects_when_queue_full():
+    controller = AdmissionController(capacity=1, queue_limit=1)
+    admitted, rejected = [], []
+    for _ in range(3):
+        controller.submit('a', 1, admitted.append, rejected.append)
+    assert len(admitted) == 1
+    assert [e.reason for e in rejected] == ['queue_full']
+
+
+def test_submit_expires_stale_tickets():
+    controller = AdmissionController(capacity=1, queue_timeout=0.05)
+    admitted, rejected = [], []
+    controller.submit('a', 1, admitted.append, rejected.append)
+    controller.submit('b', 1, admitted.append, rejected.append)
+    before = controller.tenants['b'].last_finish
+    assert before > 0 and not rejected
+
+    time.sleep(0.1)
+    controller.release(admitted[0])
+    assert [e.reason for e in rejected] == ['queue_timeout']
+    assert len(admitted) == 1
+    assert controller.tenants['b'].last_finish < before
+    assert controller.queued == 0 and controller.in_flight == 0
+
+
+def test_callbacks_may_reenter_the_controller():
+    controller = AdmissionController(capacity=1, queue_limit=0)
+    admitted, rejected = [], []
+    controller.submit('a', 1, admitted.append, rejected.append)
+
+    def retry(error):
+        rejected.append(error)
+        if len(rejected) < 3:
+            controller.submit('a', 1, admitted.append, retry)
+
+    done = threading.Event()
+    threading.Thread(target=lambda: (controller.submit('a', 1, admitted.append, retry), done.set())).start()
+    assert done.wait(5)
+    assert len(rejected) == 3
+
+
+def test_async_handler_rejects_over_capacity_tenant(monkeypatch):
+    import inference_onnx
+
+    controller = AdmissionController(capacity=1, per_tenant_limit=1, queue_limit=1)
+    monkeypatch.setattr(inference_onnx, 'request_admission', controller)
+    event = {'uid': 'tenant-a', 'model_name': 'sentiment-model.onnx', 'input': 'great product'}
+
+    held = controller.acquire('tenant-a')
+    queued = inference_onnx.lambda_handler_async(event)
+    response = inference_onnx.lambda_handler_async(event).result(timeout=30)
+    assert response['statusCode'] == 429
+    assert response['headers']['Retry-After'] == '1'
+
+    # Another tenant still gets a queue slot; both run once the slot frees up
+    other = inference_onnx.lambda_handler_async(dict(event, uid='tenant-b'))
+    assert not queued.done() and not other.done()
+    controller.release(held)
+    assert queued.result(timeout=30)['statusCode'] == 200
+    assert other.result(timeout=30)['statusCode'] == 200
+    assert controller.stats()['in_flight'] == 0
+
+
+def test_request_tenant_charges_the_batch_size():
+    assert request_tenant({'uid': 'a', 'input': ['x', 'y', 'z']}) == ('a', 3)
+    assert request_tenant({'uid': 'a', 'input': 'x'}) == ('a', 1)
+    assert request_tenant({'input': 'x'}) == ('anonymous', 1)
+    assert request_tenant(None) == ('anonymous', 1)
+
+
+def test_async_handler_parses_the_body_once(monkeypatch):
+    import inference_onnx
+
+    controller = AdmissionController(capacity=1)
+    monkeypatch.setattr(inference_onnx, 'request_admission', controller)
+    loads = inference_onnx.codec.loads
+    calls = []
+    monkeypatch.setattr(inference_onnx.codec, 'loads', lambda text: calls.append(text) or loads(text))
+    body = json.dumps({'uid': 'tenant-a', 'model_name': 'sentiment-model.onnx', 'input': ['a', 'b']})
+
+    response = inference_onnx.lambda_handler_async({'body': body}).result(timeout=30)
+    assert response['statusCode'] == 200
+    assert calls == [body]
+    assert controller.stats()['tenants']['tenant-a']['admitted'] == 1
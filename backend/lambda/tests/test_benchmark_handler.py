@@ -0,0 +1,11 @@
+import pytest
+
+import benchmark_handler
+
+
+def test_failed_cold_process_sample_raises_with_its_stderr(monkeypatch, tmp_path):
+    # No inference_onnx to import in the child's working directory
+    monkeypatch.setattr(benchmark_handler, 'HERE', str(tmp_path))
+    monkeypatch.setenv('PYTHONPATH', '')
+    with pytest.raises(RuntimeError, match="No module named 'inference_onnx'"):
+        benchmark_handler.bench_cold_process(str(tmp_path), 'sentiment-model.onnx', 1)
@@ -0,0 +1,39 @@
+import json
+import threading
+
+from weave_runtime import metrics
+from weave_runtime.coldstart import ColdStartTracer
+
+
+def test_concurrent_invocations_have_one_cold_start():
+    tracer = ColdStartTracer()
+    barrier = threading.Barrier(8)
+    invocations = []
+
+    def start():
+        barrier.wait()
+        for _ in range(200):
+            invocations.append(tracer.start_invocation())
+
+    threads = [threading.Thread(target=start) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sum(invocation['cold'] for invocation in invocations) == 1
+    assert sorted(invocation['count'] for invocation in invocations) == list(range(1, 1601))
+
+
+def test_failed_first_invocation_emits_the_timeline(monkeypatch, capsys):
+    import inference_onnx
+    monkeypatch.setattr(inference_onnx, 'tracer', ColdStartTracer())
+    monkeypatch.setattr(metrics, 'EMF_ENABLED', True)
+
+    response = inference_onnx.lambda_handler({'model_name': 'sentiment-model.onnx', 'input': 'hi'}, None)
+    assert response['statusCode'] == 400
+
+    records = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    timelines = [r for r in records if r.get('event') == 'cold_start_timeline']
+    assert len(timelines) == 1
+    assert timelines[0]['model'] == 'unknown'
@@ -0,0 +1,147 @@
+import threading
+from concurrent.futures import Future
+
+import numpy as np
+import onnx
+import pytest
+from onnx import numpy_helper
+
+from weave_runtime.micro_runtime import external_data_locations
+
+from test_model_sharing import MODEL, checksum, model_bytes, predict
+
+WEIGHTS = 'sentiment-model.weights'
+
+
+def external_model(directory, flipped: bool = False) -> tuple:
+    """The checked-in model with its weights in an external-data file (flipped swaps the two classes)"""
+    model = onnx.load_from_string(model_bytes())
+    if flipped:
+        for initializer in model.graph.initializer:
+            if initializer.name in ('W2', 'b2'):
+                array = numpy_helper.to_array(initializer)[..., ::-1]
+                initializer.CopyFrom(numpy_helper.from_array(np.ascontiguousarray(array), initializer.name))
+    directory.mkdir(exist_ok=True)
+    path = directory / MODEL
+    onnx.save_model(model, str(path), save_as_external_data=True, all_tensors_to_one_file=True,
+                    location=WEIGHTS, size_threshold=0)
+    return path.read_bytes(), (directory / WEIGHTS).read_bytes()
+
+
+def upload(s3, uid: str, graph: bytes, weights: bytes) -> None:
+    s3.put(f"{uid}/{WEIGHTS}", weights, **checksum(weights))
+    s3.put(f"{uid}/{MODEL}", graph, **checksum(graph))
+
+
+def test_locations_are_listed_without_reading_tensors(tmp_path):
+    graph, _ = external_model(tmp_path)
+    assert external_data_locations(graph) == [WEIGHTS]
+    assert external_data_locations(model_bytes()) == []
+
+
+def test_external_model_serves_like_the_embedded_one(s3_handler, tmp_path):
+    handler, s3 = s3_handler
+    s3.put(f"embedded/{MODEL}", model_bytes())
+    upload(s3, 'external', *external_model(tmp_path))
+
+    embedded = predict(handler, 'embedded')['prediction']['probabilities']
+    external = predict(handler, 'external')['prediction']['probabilities']
+    np.testing.assert_allclose(external, embedded, rtol=1e-6)
+
+
+def test_unchanged_weights_are_not_downloaded_again(s3_handler, tmp_path):
+    handler, s3 = s3_handler
+    upload(s3, 'a', *external_model(tmp_path))
+
+    predict(handler, 'a')
+    handler.reset_model_cache()
+    predict(handler, 'a')
+    assert s3.calls.count(('GetObject', f"a/{WEIGHTS}")) == 1
+
+
+def test_same_graph_different_weights_are_not_shared(s3_handler, tmp_path):
+    handler, s3 = s3_handler
+    graph, weights = external_model(tmp_path / 'a')
+    flipped_graph, flipped = external_model(tmp_path / 'b', flipped=True)
+    assert flipped_graph == graph and flipped != weights
+    upload(s3, 'a', graph, weights)
+    upload(s3, 'b', graph, flipped)
+
+    a, b = predict(handler, 'a'), predict(handler, 'b')
+    assert a['prediction']['probabilities'] == b['prediction']['probabilities'][::-1]
+    assert handler.session_registry.stats()['loads'] == 2
+    keys = {uid: handler.resolve_model_object(uid, MODEL).content_key for uid in ('a', 'b')}
+    assert keys['a'] != keys['b']
+    assert keys['a'].partition('#')[0] == keys['b'].partition('#')[0]
+
+
+def test_same_graph_and_weights_are_shared(s3_handler, tmp_path):
+    handler, s3 = s3_handler
+    graph, weights = external_model(tmp_path)
+    for uid in ('a', 'b'):
+        upload(s3, uid, graph, weights)
+
+    assert predict(handler, 'a')['prediction'] == predict(handler, 'b')['prediction']
+    assert handler.session_registry.stats()['loads'] == 1
+
+
+def test_unidentified_weights_are_not_shared(s3_handler, tmp_path):
+    handler, s3 = s3_handler
+    graph, weights = external_model(tmp_path)
+    for uid in ('a', 'b'):
+        s3.put(f"{uid}/{WEIGHTS}", weights, ETag='"parts-2"', ServerSideEncryption='aws:kms')
+        s3.put(f"{uid}/{MODEL}", graph)
+
+    predict(handler, 'a')
+    predict(handler, 'b')
+    assert handler.session_registry.stats()['loads'] == 2
+
+
+def test_weight_only_reupload_is_picked_up_by_revalidation(s3_handler, tmp_path):
+    handler, s3 = s3_handler
+    graph, weights = external_model(tmp_path / 'v1')
+    _, flipped = external_model(tmp_path / 'v2', flipped=True)
+    upload(s3, 'a', graph, weights)
+    before = predict(handler, 'a')['prediction']['probabilities']
+    assert handler.revalidate_model(('a', MODEL)) == 'unchanged'
+
+    s3.put(f"a/{WEIGHTS}", flipped)
+    assert handler.revalidate_model(('a', MODEL)) == 'reloaded'
+    assert predict(handler, 'a')['prediction']['probabilities'] == before[::-1]
+    assert handler.revalidate_model(('a', MODEL)) == 'unchanged'
+
+
+def test_waiter_loads_its_own_model_when_another_tenants_load_was_rekeyed(s3_handler, tmp_path):
+    handler, s3 = s3_handler
+    graph, weights = external_model(tmp_path / 'a')
+    _, flipped = external_model(tmp_path / 'b', flipped=True)
+    upload(s3, 'a', graph, weights)
+    upload(s3, 'b', graph, flipped)
+    a_object = handler.resolve_model_object('a', MODEL)
+    b_object = handler.resolve_model_object('b', MODEL)
+    assert a_object.content_key == b_object.content_key  # Weights not known before the first load
+
+    # b waits on a load of the shared key that a started
+    registry = handler.session_registry
+    pending = registry.loading[a_object.content_key] = Future()
+    result = {}
+    waiter = threading.Thread(target=lambda: result.update(b=handler.get_or_load_model('b', MODEL, b_object)))
+    waiter.start()
+    a_model = handler.load_model('a', MODEL, a_object)
+    with registry.lock:
+        del registry.loading[a_object.content_key]
+        registry.models[a_model.key] = a_model
+    pending.set_result(a_model)
+    waiter.join(5)
+
+    b_model, loaded = result['b']
+    assert loaded and b_model is not a_model
+    assert b_model.key == handler.resolve_model_object('b', MODEL).content_key != a_model.key
+
+
+def test_locations_outside_the_uid_prefix_are_rejected():
+    import inference_onnx
+    assert inference_onnx.model_relative_path('a', MODEL, 'sub/../w.bin') == 'w.bin'
+    for path in ('../b/w.bin', '/etc/passwd', '..', 'dir\\w.bin'):
+        with pytest.raises(ValueError):
+            inference_onnx.model_relative_path('a', MODEL, path)
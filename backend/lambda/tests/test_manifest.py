@@ -0,0 +1,56 @@
+import json
+
+import numpy as np
+from onnx import TensorProto, helper
+
+from weave_runtime.manifest import build_manifest, infer_preprocessor
+
+
+def float_input(width):
+    return [{'name': 'input', 'dtype': 'float32', 'shape': [None, width]}]
+
+
+def abs_model(width: int) -> bytes:
+    """(batch, width) float model that ONNX Runtime runs (the micro-runtime has no Abs)"""
+    graph = helper.make_graph(
+        [helper.make_node('Abs', ['input'], ['output'])], 'abs',
+        [helper.make_tensor_value_info('input', TensorProto.FLOAT, ['batch', width])],
+        [helper.make_tensor_value_info('output', TensorProto.FLOAT, ['batch', width])],
+    )
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid('', 17)])
+    model.ir_version = 8
+    return model.SerializeToString()
+
+
+def test_only_the_sentiment_shape_is_taken_as_text():
+    assert infer_preprocessor(float_input(128), {}) == {'kind': 'text_chars', 'max_length': 128}
+    assert infer_preprocessor(float_input(4), {})['kind'] == 'tensor'
+    assert infer_preprocessor(float_input(None), {})['kind'] == 'tensor'
+
+
+def test_metadata_selects_text_for_other_widths():
+    assert infer_preprocessor(float_input(64), {'preprocessor': 'text_chars'}) == {
+        'kind': 'text_chars', 'max_length': 64
+    }
+
+
+def test_float_row_model_takes_tensors(s3_handler):
+    handler, s3 = s3_handler
+    model_bytes = abs_model(4)
+    s3.put('a/abs.onnx', model_bytes)
+
+    session = handler.create_session(model_bytes)
+    manifest = build_manifest(session, model_bytes)
+    assert manifest['preprocessor'] == {'kind': 'tensor'}
+    assert handler.create_execution_context(session, manifest) is None
+
+    response = handler.lambda_handler(
+        {'uid': 'a', 'model_name': 'abs.onnx', 'input': [[-1.0, 2.0, -3.0, 4.0]]}, None
+    )
+    assert response['statusCode'] == 200, response['body']
+    model = handler.session_registry.models[handler.resolve_content_key('a', 'abs.onnx')]
+    assert model.manifest['preprocessor']['kind'] == 'tensor'
+    assert json.loads(response['body'])['prediction']
+    np.testing.assert_array_equal(
+        handler.run_inference(model, [[-1.0, 2.0, -3.0, 4.0]]), [[1.0, 2.0, 3.0, 4.0]]
+    )
@@ -0,0 +1,17 @@
+import json
+
+from weave_runtime import metrics
+
+
+def test_request_record_is_dimensioned_by_uid_and_model(monkeypatch, capsys):
+    import inference_onnx
+    monkeypatch.setattr(metrics, 'EMF_ENABLED', True)
+
+    for uid in ('a', 'b'):
+        event = {'uid': uid, 'model_name': 'sentiment-model.onnx', 'input': 'great product'}
+        assert inference_onnx.lambda_handler(event, None)['statusCode'] == 200
+
+    records = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    requests = [r for r in records if 'latency' in r]
+    assert [r['model'] for r in requests] == ['a/sentiment-model.onnx', 'b/sentiment-model.onnx']
+    assert requests[0]['_aws']['CloudWatchMetrics'][0]['Dimensions'] == [['model'], ['model', 'cache']]
@@ -0,0 +1,106 @@
+import os
+
+import numpy as np
+import pytest
+
+from weave_runtime.micro_runtime import NumpySession, UnsupportedModel
+
+from conftest import HERE
+
+ort = pytest.importorskip('onnxruntime')
+onnx = pytest.importorskip('onnx')
+from onnx import TensorProto, helper, numpy_helper  # noqa: E402
+
+RNG = np.random.default_rng(0)
+
+
+def build_model(nodes, initializers, input_width, output_width, opset=17):
+    graph = helper.make_graph(
+        nodes, 'micro',
+        [helper.make_tensor_value_info('x', TensorProto.FLOAT, ['batch', input_width])],
+        [helper.make_tensor_value_info('y', TensorProto.FLOAT, ['batch', output_width])],
+        [numpy_helper.from_array(value.astype(np.float32), name) for name, value in initializers.items()],
+    )
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid('', opset)])
+    model.ir_version = 8
+    return model.SerializeToString()
+
+
+def assert_matches_ort(model_bytes, input_width, batches=(1, 7, 64)):
+    micro = NumpySession(model_bytes)
+    reference = ort.InferenceSession(model_bytes, providers=['CPUExecutionProvider'])
+    for batch in batches:
+        x = RNG.standard_normal((batch, input_width)).astype(np.float32)
+        expected = reference.run(None, {'x': x})
+        actual = micro.run(None, {'x': x})
+        assert len(actual) == len(expected)
+        for a, e in zip(actual, expected):
+            assert a.shape == e.shape
+            np.testing.assert_allclose(a, e, rtol=1e-5, atol=1e-5)
+        # Outputs must not alias buffers reused by the next run
+        again = micro.run(None, {'x': x})
+        np.testing.assert_allclose(again[0], actual[0])
+
+
+def weights(*shape):
+    return RNG.standard_normal(shape) * 0.5
+
+
+def test_checked_in_model_matches_ort():
+    with open(os.path.join(HERE, 'sentiment-model.onnx'), 'rb') as f:
+        model_bytes = f.read()
+    micro = NumpySession(model_bytes)
+    reference = ort.InferenceSession(model_bytes, providers=['CPUExecutionProvider'])
+    name, shape = micro.input_name, micro.get_inputs()[0].shape
+    x = RNG.random((32, shape[1])).astype(np.float32)
+    for a, e in zip(micro.run(None, {name: x}), reference.run(None, {name: x})):
+        np.testing.assert_allclose(a, e, rtol=1e-5, atol=1e-5)
+
+
+def test_matmul_bias_relu_softmax_mlp():
+    nodes = [
+        helper.make_node('MatMul', ['x', 'w1'], ['h1']),
+        helper.make_node('Add', ['h1', 'b1'], ['h2']),
+        helper.make_node('Relu', ['h2'], ['h3']),
+        helper.make_node('MatMul', ['h3', 'w2'], ['h4']),
+        helper.make_node('Add', ['b2', 'h4'], ['h5']),
+        helper.make_node('Softmax', ['h5'], ['y'], axis=-1),
+    ]
+    inits = {'w1': weights(20, 32), 'b1': weights(32), 'w2': weights(32, 3), 'b2': weights(1, 3)}
+    assert_matches_ort(build_model(nodes, inits, 20, 3), 20)
+
+
+def test_gemm_attributes_and_wide_softmax():
+    nodes = [
+        helper.make_node('Gemm', ['x', 'w1', 'b1'], ['h1'], transB=1, alpha=0.5, beta=2.0),
+        helper.make_node('Tanh', ['h1'], ['h2']),
+        helper.make_node('Gemm', ['h2', 'w2', 'b2'], ['h3']),
+        helper.make_node('Softmax', ['h3'], ['y'], axis=1),
+    ]
+    inits = {'w1': weights(24, 10), 'b1': weights(24), 'w2': weights(24, 40), 'b2': weights(40)}
+    assert_matches_ort(build_model(nodes, inits, 10, 40), 10)
+
+
+def test_elementwise_ops_between_branches():
+    nodes = [
+        helper.make_node('MatMul', ['x', 'w1'], ['a']),
+        helper.make_node('Sigmoid', ['a'], ['s']),
+        helper.make_node('MatMul', ['x', 'w2'], ['b']),
+        helper.make_node('Mul', ['s', 'b'], ['m']),
+        helper.make_node('Sub', ['m', 'c'], ['d']),
+        helper.make_node('Div', ['d', 'k'], ['e']),
+        helper.make_node('Add', ['e', 'a'], ['f']),
+        helper.make_node('Identity', ['f'], ['y']),
+    ]
+    inits = {'w1': weights(8, 6), 'w2': weights(8, 6), 'c': weights(6), 'k': np.full(6, 1.5)}
+    assert_matches_ort(build_model(nodes, inits, 8, 6), 8)
+
+
+def test_unsupported_graphs_are_rejected():
+    conv = build_model([helper.make_node('Conv', ['x', 'w'], ['y'])], {'w': weights(2, 2, 1, 1)}, 4, 4)
+    with pytest.raises(UnsupportedModel):
+        NumpySession(conv)
+
+    mismatched = build_model([helper.make_node('MatMul', ['x', 'w'], ['y'])], {'w': weights(5, 3)}, 4, 3)
+    with pytest.raises(UnsupportedModel):
+        NumpySession(mismatched)
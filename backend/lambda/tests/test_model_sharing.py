@@ -0,0 +1,118 @@
+import base64
+import hashlib
+import json
+import os
+
+from weave_runtime.model_cache import content_key_from_head, verify_content
+
+from conftest import HERE
+
+MODEL = 'sentiment-model.onnx'
+
+
+def model_bytes():
+    with open(os.path.join(HERE, MODEL), 'rb') as f:
+        return f.read()
+
+
+def manifest_text(**changes):
+    with open(os.path.join(HERE, MODEL + '.manifest.json')) as f:
+        manifest = json.load(f)
+    manifest.update(changes)
+    return json.dumps(manifest).encode('utf-8')
+
+
+def checksum(body: bytes) -> dict:
+    """HEAD fields of an object uploaded with ChecksumAlgorithm='SHA256'"""
+    return {'ChecksumSHA256': base64.b64encode(hashlib.sha256(body).digest()).decode()}
+
+
+def predict(handler, uid):
+    response = handler.lambda_handler({'uid': uid, 'model_name': MODEL, 'input': 'great product'}, None)
+    assert response['statusCode'] == 200
+    return json.loads(response['body'])
+
+
+def test_metadata_hash_is_not_trusted():
+    sha = hashlib.sha256(b'model').hexdigest()
+    assert content_key_from_head({'Metadata': {'sha256': sha}}) is None
+    assert content_key_from_head({'Metadata': {'sha256': sha}, 'ETag': '"%s"' % ('0' * 32)}) is None
+
+
+def test_plain_etag_does_not_identify_content():
+    md5 = hashlib.md5(b'model').hexdigest()
+    assert content_key_from_head({'ETag': f'"{md5}"'}) is None
+    assert not verify_content(f"md5:{md5}", b'model')
+    assert verify_content(content_key_from_head(checksum(b'model')), b'model')
+
+
+def test_s3_checksum_identifies_content():
+    digest = hashlib.sha256(b'model').digest()
+    checksum = base64.b64encode(digest).decode()
+    assert content_key_from_head({'ChecksumSHA256': checksum}) == 'sha256:' + digest.hex()
+    assert content_key_from_head({'ChecksumSHA256': checksum, 'ChecksumType': 'COMPOSITE'}) is None
+    assert content_key_from_head({'ChecksumSHA256': checksum + '-3'}) is None
+
+
+def test_forged_metadata_does_not_reach_another_tenants_session(s3_handler):
+    handler, s3 = s3_handler
+    victim = model_bytes()
+    s3.put(f"victim/{MODEL}", victim, ETag='"etag-victim"', ServerSideEncryption='aws:kms', **checksum(victim))
+    s3.put(f"attacker/{MODEL}", b'not the victim model', ServerSideEncryption='aws:kms',
+           Metadata={'sha256': hashlib.sha256(victim).hexdigest()})
+
+    predict(handler, 'victim')
+    attacker = handler.resolve_model_object('attacker', MODEL)
+    assert attacker.content_key != handler.resolve_model_object('victim', MODEL).content_key
+    assert attacker.content_key.startswith('object:attacker/')
+
+
+def test_identical_models_share_a_session(s3_handler):
+    handler, s3 = s3_handler
+    for uid in ('a', 'b'):
+        s3.put(f"{uid}/{MODEL}", model_bytes(), **checksum(model_bytes()))
+
+    predict(handler, 'a')
+    predict(handler, 'b')
+    assert handler.session_registry.stats()['loads'] == 1
+
+
+def test_models_without_a_checksum_are_not_shared(s3_handler):
+    handler, s3 = s3_handler
+    for uid in ('a', 'b'):
+        s3.put(f"{uid}/{MODEL}", model_bytes())
+
+    predict(handler, 'a')
+    predict(handler, 'b')
+    assert ('GetObject', f"b/{MODEL}") in s3.calls
+    assert handler.session_registry.stats()['loads'] == 2
+    assert handler.resolve_model_object('b', MODEL).content_key.startswith('object:b/')
+
+
+def test_stored_manifests_are_not_shared_across_tenants(s3_handler):
+    handler, s3 = s3_handler
+    for uid in ('a', 'b', 'c'):
+        s3.put(f"{uid}/{MODEL}", model_bytes(), **checksum(model_bytes()))
+    s3.put(f"a/{MODEL}.manifest.json", manifest_text(labels={'0': 'bad', '1': 'good'}))
+    s3.put(f"b/{MODEL}.manifest.json", manifest_text(labels={'0': 'no', '1': 'yes'}))
+
+    a, b, c = (predict(handler, uid)['prediction'] for uid in ('a', 'b', 'c'))
+    assert a['label'] in ('bad', 'good')
+    assert b['label'] in ('no', 'yes')
+    assert c['label'] in ('negative', 'positive')
+
+    keys = {uid: handler.resolve_model_object(uid, MODEL).content_key for uid in ('a', 'b', 'c')}
+    assert len(set(keys.values())) == 3
+    assert {key.partition('#')[0] for key in keys.values()} == {keys['c']}
+    # The bytes are cached on disk once
+    assert len(os.listdir(handler.model_disk_cache.directory)) == 1
+
+
+def test_manifest_change_is_picked_up_by_revalidation(s3_handler):
+    handler, s3 = s3_handler
+    s3.put(f"a/{MODEL}", model_bytes())
+    predict(handler, 'a')
+
+    s3.put(f"a/{MODEL}.manifest.json", manifest_text(labels={'0': 'bad', '1': 'good'}))
+    assert handler.revalidate_model(('a', MODEL)) == 'reloaded'
+    assert predict(handler, 'a')['prediction']['label'] in ('bad', 'good')
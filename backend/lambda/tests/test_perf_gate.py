@@ -0,0 +1,57 @@
+import perf_gate
+
+# warm.sentiment-model.onnx.b1.p50_ms measured before and after a real +23% slowdown
+BASELINE_B1 = [0.0418, 0.0412, 0.0537, 0.0411, 0.0412, 0.0405, 0.0416]
+SLOWER_B1 = [0.0502, 0.0507, 0.0509, 0.051, 0.0507, 0.0514, 0.0508]
+
+
+def verdict(baseline, current, name='warm.sentiment-model.onnx.b1.p50_ms', threshold=perf_gate.THRESHOLD):
+    return perf_gate.compare_metric(name, baseline, current, perf_gate.ALPHA, threshold)
+
+
+def test_small_metric_regression_fails():
+    v = verdict(BASELINE_B1, SLOWER_B1)
+    assert v['change'] > 0.2
+    assert v['p_value'] < perf_gate.ALPHA
+    assert v['regressed']
+
+
+def test_clear_regression_fails():
+    v = verdict([2.71, 2.73, 2.81, 2.77, 2.77, 2.66, 2.71], [3.21, 3.25, 3.30, 3.22, 3.28, 3.26, 3.24])
+    assert v['change'] > 0.15
+    assert v['p_value'] < perf_gate.ALPHA
+    assert v['regressed']
+
+
+def test_unchanged_metric_passes():
+    assert not verdict(BASELINE_B1, [0.0415, 0.0409, 0.0412, 0.0421, 0.0410, 0.0413, 0.0418])['regressed']
+
+
+def test_noisy_baseline_widens_the_threshold():
+    baseline = [1.0, 1.3, 0.8, 1.2, 0.9, 1.4, 1.1]
+    v = verdict(baseline, [1.2, 1.25, 1.3, 1.22, 1.28, 1.26, 1.24], name='cold_load_ms')
+    assert v['allowed'] > perf_gate.THRESHOLD
+    assert not v['regressed']
+
+
+def test_timer_noise_floor_with_a_low_threshold():
+    # +3% of 0.5 ms is 0.015 ms: under the absolute floor
+    assert not verdict([0.5] * 7, [0.515] * 7, name='cold_load_ms', threshold=0.01)['regressed']
+    # +3% of 0.2 ms is 0.006 ms: under the floor, but the floor is capped at 5% of 0.2 ms
+    assert not verdict([0.2] * 7, [0.206] * 7, name='cold_load_ms', threshold=0.01)['regressed']
+    assert verdict([0.2] * 7, [0.212] * 7, name='cold_load_ms', threshold=0.01)['regressed']
+    assert verdict([10.0] * 7, [10.3] * 7, name='cold_load_ms', threshold=0.01)['regressed']
+
+
+def test_tail_metrics_use_the_p99_threshold():
+    baseline = [0.0534] * 7
+    assert not verdict(baseline, [0.0640] * 7, name='warm.x.b1.p99_ms')['regressed']
+    assert verdict(baseline, [0.0733] * 7, name='warm.x.b1.p99_ms')['regressed']
+
+
+def test_package_size_regression():
+    baseline = {'package_bytes': 100_000, 'samples': {}}
+    grown = {'package_bytes': 103_000, 'samples': {}}
+    same = {'package_bytes': 101_000, 'samples': {}}
+    assert perf_gate.compare(baseline, grown, perf_gate.ALPHA, perf_gate.THRESHOLD)[-1]['regressed']
+    assert not perf_gate.compare(baseline, same, perf_gate.ALPHA, perf_gate.THRESHOLD)[-1]['regressed']
@@ -0,0 +1,18 @@
+import numpy as np
+
+from weave_runtime.postprocess import to_probabilities
+
+
+def test_distributions_pass_through():
+    probs = np.array([[0.3, 0.7], [0.5, 0.5004]], dtype=np.float32)
+    assert to_probabilities(probs) is probs
+    empty = np.zeros((0, 2), dtype=np.float32)
+    assert to_probabilities(empty) is empty
+
+
+def test_logits_get_a_softmax():
+    for scores in ([[2.0, -1.0]], [[0.3, 0.8]], [[np.nan, 1.0]]):
+        scores = np.array(scores, dtype=np.float32)
+        expected = np.exp(scores - scores.max(axis=1, keepdims=True))
+        expected /= expected.sum(axis=1, keepdims=True)
+        np.testing.assert_allclose(to_probabilities(scores.copy()), expected)
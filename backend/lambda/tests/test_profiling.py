@@ -0,0 +1,103 @@
+import json
+import time
+
+import pytest
+
+from weave_runtime import profiling
+
+
+@pytest.fixture
+def secret(monkeypatch):
+    monkeypatch.setattr(profiling, 'PROFILE_SECRET', 'test-secret')
+    monkeypatch.setattr(profiling, 'PROFILE_ALL', False)
+    monkeypatch.setattr(profiling, 'PROFILE_MODELS', set())
+
+
+def test_valid_token_is_accepted(secret):
+    token = profiling.sign_profile_request('user1', 'model.onnx', int(time.time()) + 60)
+    assert profiling.profiling_requested({'profile': token}, 'user1', 'model.onnx')
+
+
+def test_token_is_bound_to_uid_and_model(secret):
+    token = profiling.sign_profile_request('user1', 'model.onnx', int(time.time()) + 60)
+    assert not profiling.profiling_requested({'profile': token}, 'user2', 'model.onnx')
+    assert not profiling.profiling_requested({'profile': token}, 'user1', 'other.onnx')
+
+
+def test_expired_token_is_rejected(secret):
+    token = profiling.sign_profile_request('user1', 'model.onnx', int(time.time()) - 1)
+    assert not profiling.profiling_requested({'profile': token}, 'user1', 'model.onnx')
+
+
+def test_long_lived_token_is_rejected(secret):
+    expires = int(time.time()) + profiling.PROFILE_TOKEN_MAX_SECONDS + 60
+    token = profiling.sign_profile_request('user1', 'model.onnx', expires)
+    assert not profiling.profiling_requested({'profile': token}, 'user1', 'model.onnx')
+
+
+def test_expiry_is_covered_by_the_signature(secret):
+    token = profiling.sign_profile_request('user1', 'model.onnx', int(time.time()) + 60)
+    _, signature = token.split('.')
+    forged = f"{int(time.time()) + 120}.{signature}"
+    assert not profiling.profiling_requested({'profile': forged}, 'user1', 'model.onnx')
+
+
+def test_unsigned_requests_are_ignored(secret, monkeypatch):
+    assert not profiling.profiling_requested({'profile': 'yes'}, 'user1', 'model.onnx')
+    monkeypatch.setattr(profiling, 'PROFILE_SECRET', '')
+    token = profiling.sign_profile_request('user1', 'model.onnx', int(time.time()) + 60, secret='')
+    assert not profiling.profiling_requested({'profile': token}, 'user1', 'model.onnx')
+
+
+def test_env_toggle_profiles_listed_models(secret, monkeypatch):
+    monkeypatch.setattr(profiling, 'PROFILE_MODELS', {'model.onnx'})
+    assert profiling.profiling_requested({}, 'user1', 'model.onnx')
+    assert not profiling.profiling_requested({}, 'user1', 'other.onnx')
+
+
+def test_summarize_profile(tmp_path):
+    events = [
+        {'cat': 'Node', 'name': 'mm1_kernel_time', 'dur': 30, 'args': {'op_name': 'MatMul'}},
+        {'cat': 'Node', 'name': 'add_kernel_time', 'dur': 10, 'args': {'op_name': 'Add'}},
+        {'cat': 'Node', 'name': 'mm2_kernel_time', 'dur': 20, 'args': {'op_name': 'MatMul'}},
+        {'cat': 'Node', 'name': 'mm1_fence_before', 'dur': 5, 'args': {'op_name': 'MatMul'}},
+        {'cat': 'Session', 'name': 'model_run', 'dur': 100},
+    ]
+    path = tmp_path / 'ort_profile_1.json'
+    path.write_text(json.dumps(events))
+
+    summary = profiling.summarize_profile(str(path))
+    assert summary['total_us'] == 60
+    assert summary['ops'][0] == {'op': 'MatMul', 'calls': 2, 'total_us': 50, 'pct': 83.3}
+    assert summary['top_nodes'][0] == {'node': 'mm1', 'total_us': 30}
+
+
+class FakeS3:
+    def __init__(self):
+        self.uploads = []
+
+    def upload_file(self, path, bucket, key):
+        with open(path) as f:
+            self.uploads.append((bucket, key, f.read()))
+
+
+def test_upload_removes_local_profile(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling, 'PROFILE_BUCKET', 'profiles-bucket')
+    path = tmp_path / 'ort_profile_1.json'
+    path.write_text('[]')
+
+    s3 = FakeS3()
+    uri = profiling.upload_profile(s3, 'user1', 'model.onnx', str(path))
+
+    assert uri == 's3://profiles-bucket/user1/profiles/model.onnx/ort_profile_1.json'
+    assert s3.uploads == [('profiles-bucket', 'user1/profiles/model.onnx/ort_profile_1.json', '[]')]
+    assert not path.exists()
+
+
+def test_profile_is_removed_without_bucket(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling, 'PROFILE_BUCKET', '')
+    path = tmp_path / 'ort_profile_1.json'
+    path.write_text('[]')
+    s3 = FakeS3()
+    assert profiling.upload_profile(s3, 'user1', 'model.onnx', str(path)) is None
+    assert not path.exists() and s3.uploads == []
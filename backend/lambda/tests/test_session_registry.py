@@ -0,0 +1,111 @@
+import threading
+import time
+
+import pytest
+
+from weave_runtime.session_registry import LoadedModel, SessionRegistry
+
+
+def model(key):
+    return LoadedModel(key, session=object(), manifest={})
+
+
+def call_with_timeout(fn, timeout=5):
+    """fn() on another thread; fails the test instead of hanging on a deadlock"""
+    result = {}
+    thread = threading.Thread(target=lambda: result.update(value=fn()), daemon=True)
+    thread.start()
+    thread.join(timeout)
+    assert not thread.is_alive(), 'call did not return (deadlock?)'
+    return result['value']
+
+
+def test_miss_with_a_staged_model_does_not_deadlock():
+    registry = SessionRegistry(max_models=1, max_staged=1)
+    registry.get_or_load('a', lambda: model('a'))
+    registry.get_or_load('b', lambda: model('b'), prefetch=True)
+    assert registry.stats()['staged'] == ['b']
+
+    loaded, was_loaded = call_with_timeout(lambda: registry.get_or_load('c', lambda: model('c')))
+    assert loaded.key == 'c' and was_loaded
+
+
+def test_alternating_requests_then_a_new_model():
+    registry = SessionRegistry(max_models=1, max_staged=1)
+    for key in ('a', 'b', 'a', 'b'):
+        call_with_timeout(lambda: registry.get_or_load(key, lambda: model(key), prefetch=key == 'b'))
+    call_with_timeout(lambda: registry.get_or_load('c', lambda: model('c')))
+    assert 'c' in registry
+
+
+def test_staged_model_is_promoted_without_a_load():
+    registry = SessionRegistry(max_models=1, max_staged=1)
+    registry.get_or_load('a', lambda: model('a'))
+    registry.get_or_load('b', lambda: model('b'), prefetch=True)
+
+    loaded, was_loaded = registry.get_or_load('b', lambda: pytest.fail('staged model reloaded'))
+    assert loaded.key == 'b' and not was_loaded
+    stats = registry.stats()
+    assert stats['models'] == ['b'] and stats['staged'] == [] and stats['loads'] == 2
+
+
+def test_promotion_inside_the_lock_keeps_the_promoted_model():
+    registry = SessionRegistry(max_models=1, max_staged=1)
+    registry.get_or_load('a', lambda: model('a'))
+    registry.get_or_load('b', lambda: model('b'), prefetch=True)
+    # Loaded 'a' was used after 'b' was staged; promotion must still evict 'a'
+    registry.get('a')
+    with registry.lock:
+        promoted = registry._get_locked('b')
+    assert promoted.key == 'b' and registry.stats()['models'] == ['b']
+
+
+def test_prefetch_into_a_full_registry_is_staged():
+    registry = SessionRegistry(max_models=1, max_staged=1)
+    registry.get_or_load('a', lambda: model('a'))
+    registry.get_or_load('b', lambda: model('b'), prefetch=True)
+    registry.get_or_load('c', lambda: model('c'), prefetch=True)
+    stats = registry.stats()
+    assert stats['models'] == ['a'] and stats['staged'] == ['c'] and stats['evictions'] == 1
+
+
+def test_concurrent_misses_share_one_load():
+    registry = SessionRegistry(max_models=2)
+    calls = []
+    started = threading.Event()
+
+    def slow_loader():
+        calls.append(1)
+        started.set()
+        time.sleep(0.1)
+        return model('a')
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(registry.get_or_load('a', slow_loader)))
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(calls) == 1
+    assert len({id(m) for m, _ in results}) == 1
+    assert sum(loaded for _, loaded in results) == 1
+
+
+def test_failed_load_raises_in_every_waiter_and_can_retry():
+    registry = SessionRegistry()
+
+    def failing():
+        raise RuntimeError('download failed')
+
+    with pytest.raises(RuntimeError):
+        registry.get_or_load('a', failing)
+    assert registry.get_or_load('a', lambda: model('a'))[1]
+
+
+def test_model_published_under_its_own_key():
+    registry = SessionRegistry(max_models=2)
+    loaded, _ = registry.get_or_load('sha256:wrong', lambda: model('object:uid/m'))
+    assert registry.get('object:uid/m') is loaded
+    assert registry.get('sha256:wrong') is None
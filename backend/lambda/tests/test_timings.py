@@ -0,0 +1,42 @@
+import json
+
+import pytest
+
+from weave_runtime import timings
+
+REQUEST = {'uid': 'a', 'model_name': 'sentiment-model.onnx', 'input': 'great product'}
+
+
+@pytest.fixture
+def handler(monkeypatch):
+    import inference_onnx
+    monkeypatch.setattr(timings, 'STAGE_TIMINGS_ENABLED', False)
+    return inference_onnx
+
+
+def invoke(handler, event) -> dict:
+    response = handler.lambda_handler(event, None)
+    assert response['statusCode'] == 200
+    return json.loads(response['body'])
+
+
+@pytest.mark.parametrize('event', [
+    {'body': json.dumps(REQUEST), 'queryStringParameters': {'timings': '1'}},
+    {'body': json.dumps(REQUEST), 'headers': {'x-timings': '1'}},
+    dict(REQUEST, timings=True),
+])
+def test_requested_timings_include_parsing(handler, event):
+    stages = invoke(handler, event)['timings']
+    assert {'parse', 'inference', 'total'} <= set(stages)
+
+
+def test_timings_stay_off_unless_requested_before_parsing(handler):
+    assert 'timings' not in invoke(handler, {'body': json.dumps(REQUEST)})
+    assert 'timings' not in invoke(handler, {'body': json.dumps(dict(REQUEST, timings=True))})
+    assert 'timings' not in invoke(handler, {'body': json.dumps(REQUEST), 'queryStringParameters': {'timings': '0'}})
+
+
+def test_body_flag_returns_timings_when_the_timer_runs(monkeypatch):
+    import inference_onnx
+    monkeypatch.setattr(timings, 'STAGE_TIMINGS_ENABLED', True)
+    assert 'parse' in invoke(inference_onnx, {'body': json.dumps(dict(REQUEST, timings=True))})['timings']
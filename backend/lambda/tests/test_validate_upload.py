@@ -0,0 +1,45 @@
+import json
+
+import pytest
+
+from test_model_sharing import MODEL, model_bytes
+
+
+@pytest.fixture
+def validator(s3_handler, monkeypatch):
+    import validate_upload
+    _, s3 = s3_handler
+    monkeypatch.setattr(validate_upload, 's3_client', s3)
+    return validate_upload, s3
+
+
+def s3_event(event_name: str, key: str) -> dict:
+    return {'Records': [{'eventName': event_name, 's3': {'bucket': {'name': 'models'}, 'object': {'key': key}}}]}
+
+
+def validated_keys(response: dict) -> list:
+    return [result['key'] for result in json.loads(response['body'])['results']]
+
+
+def test_self_copy_event_is_skipped(validator):
+    validate_upload, s3 = validator
+    key = f"a/{MODEL}"
+    s3.put(key, model_bytes())
+
+    assert validated_keys(validate_upload.lambda_handler(s3_event('ObjectCreated:Put', key), None)) == [key]
+    assert ('CopyObject', key) in s3.calls
+    assert 'ChecksumSHA256' in s3.objects[key][1]
+
+    assert validated_keys(validate_upload.lambda_handler(s3_event('ObjectCreated:Copy', key), None)) == []
+
+
+def test_other_copies_are_validated(validator):
+    validate_upload, s3 = validator
+    s3.put(f"a/{MODEL}", model_bytes())
+    validate_upload.lambda_handler(s3_event('ObjectCreated:Put', f"a/{MODEL}"), None)
+
+    # A server-side copy to another key keeps the source's metadata, marker included
+    s3.copy_object(Bucket='models', Key=f"b/{MODEL}", CopySource={'Bucket': 'models', 'Key': f"a/{MODEL}"})
+    response = validate_upload.lambda_handler(s3_event('ObjectCreated:Copy', f"b/{MODEL}"), None)
+    assert validated_keys(response) == [f"b/{MODEL}"]
+    assert f"b/{MODEL}.manifest.json" in s3.objects
@@ -0,0 +1,382 @@
+"""
+AWS Lambda function that validates ONNX models as they are uploaded
+Triggered by S3 ObjectCreated events, so broken models surface before the first cold load
+
+For every uploaded <uid>/<model>.onnx:
+    1. onnx.checker (full check with shape inference) when the onnx package is available
+    2. builds an ONNX Runtime session, recording load time and resident memory
+    3. runs warmup inferences through the inference handler's own preprocessors
+       and, for graphs the NumPy micro-runtime supports, checks it against ORT
+    4. writes <model>.onnx.manifest.json (with a "validation" block) for the
+       inference handler, and <model>.onnx.validation.json with the full report
+    5. optionally writes a graph-optimized <model>.optimized.onnx
+
+Deployment: same code package as weave-inference, handler
+validate_upload.lambda_handler, with an S3 event notification on the model
+bucket for ObjectCreated:* and suffix ".onnx".
+"""
+
+import base64
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+from urllib.parse import unquote_plus
+
+import numpy as np
+import onnxruntime as ort
+import boto3
+
+try:
+    import onnx
+except ImportError:
+    onnx = None
+
+from inference_onnx import PREPROCESSORS, external_model_path
+from weave_runtime.manifest import MANIFEST_SUFFIX, build_manifest, parse_manifest, serialize_manifest
+from weave_runtime.metrics import get_logger
+from weave_runtime.micro_runtime import NumpySession, UnsupportedModel, external_data_locations
+from weave_runtime.model_cache import content_key_from_head
+
+log = get_logger()
+
+s3_client = boto3.client('s3')
+
+VALIDATION_SUFFIX = '.validation.json'
+OPTIMIZED_SUFFIX = '.optimized.onnx'
+
+MAX_MODEL_BYTES = int(os.environ.get('MAX_MODEL_BYTES', str(500 * 1024 * 1024)))
+EMIT_OPTIMIZED_MODEL = os.environ.get('EMIT_OPTIMIZED_MODEL', '0') == '1'
+RECORD_CONTENT_HASH = os.environ.get('RECORD_CONTENT_HASH', '1') != '0'
+
+# Metadata on the checksum self-copy (value: the copied key), so the
+# ObjectCreated:Copy event it triggers isn't validated a second time
+SELF_COPY_METADATA_KEY = 'weave-validated-copy'
+
+# Micro-runtime outputs must match ORT's this closely to serve the model
+MICRO_RUNTIME_RTOL = 1e-3
+MICRO_RUNTIME_ATOL = 1e-5
+
+# Warmup inputs per preprocessor kind (tensor models get zeros of the declared shape)
+WARMUP_INPUTS = {
+    'text_chars': ['This model is being validated.', 'ok'],
+    'image_bytes': [base64.b64encode(bytes(64)).decode('ascii')] * 2,
+    'tfidf_sparse': ['This model is being validated.', 'ok'],
+}
+
+# Preprocessors whose inputs have no leading batch dimension (COO indices/values)
+SPARSE_PREPROCESSORS = {'tfidf_sparse'}
+
+
+def current_rss_mb() -> float:
+    """Resident set size right now (falls back to the peak where /proc is missing)"""
+    try:
+        with open('/proc/self/statm') as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+
+def is_model_key(key: str) -> bool:
+    return key.endswith('.onnx') and not key.endswith(OPTIMIZED_SUFFIX)
+
+
+def check_model_structure(model_bytes: bytes, report: dict, model_path: str = None) -> bool:
+    """
+    onnx.checker with shape inference; records opsets and IR version
+
+    Models with external data are checked from model_path, so the checker
+    can resolve their weight files.
+
+    Returns:
+        False when the checker rejects the model
+    """
+    if onnx is None:
+        report['checks']['onnx_checker'] = 'skipped (onnx not installed)'
+        return True
+
+    try:
+        model = onnx.load_from_string(model_bytes)
+        onnx.checker.check_model(model_path or model, full_check=True)
+    except Exception as e:
+        report['checks']['onnx_checker'] = 'failed'
+        report['errors'].append(f"onnx.checker: {e}")
+        return False
+
+    report['checks']['onnx_checker'] = 'passed'
+    report['ir_version'] = model.ir_version
+    report['opsets'] = {opset.domain or 'ai.onnx': opset.version for opset in model.opset_import}
+    return True
+
+
+def warmup_feeds(manifest: dict, batch_size: int) -> dict:
+    """Feeds for a warmup run, built the way real requests are"""
+    kind = manifest['preprocessor']['kind']
+    if kind in WARMUP_INPUTS:
+        return PREPROCESSORS[kind](WARMUP_INPUTS[kind][:batch_size], manifest)
+
+    feeds = {}
+    for spec in manifest['inputs']:
+        shape = [batch_size if i == 0 and d is None else (d or 1) for i, d in enumerate(spec['shape'])]
+        if spec['dtype'] == 'str':
+            feeds[spec['name']] = np.full(shape, '', dtype=object)
+        else:
+            feeds[spec['name']] = np.zeros(shape, dtype=spec['dtype'])
+    return feeds
+
+
+def run_warmup(session, manifest: dict, report: dict) -> bool:
+    """
+    First and second warmup runs at batch 1, then a batch of 2 when the batch dim is dynamic
+
+    Returns:
+        False when the model can't run on inputs shaped like real requests
+    """
+    try:
+        feeds = warmup_feeds(manifest, 1)
+        start = time.perf_counter()
+        outputs = session.run(None, feeds)
+        report['warmup_ms'] = round((time.perf_counter() - start) * 1000, 3)
+        start = time.perf_counter()
+        session.run(None, feeds)
+        report['warm_run_ms'] = round((time.perf_counter() - start) * 1000, 3)
+    except Exception as e:
+        report['checks']['warmup'] = 'failed'
+        report['errors'].append(f"Warmup inference failed: {e}")
+        return False
+    report['checks']['warmup'] = 'passed'
+
+    for spec, output in zip(manifest['outputs'], outputs):
+        if isinstance(output, np.ndarray) and output.dtype.kind == 'f' and not np.all(np.isfinite(output)):
+            report['warnings'].append(f"Output '{spec['name']}' is not finite on warmup input")
+
+    batch_dims = [spec['shape'][0] if spec['shape'] else None for spec in manifest['inputs']]
+    if manifest['preprocessor']['kind'] in SPARSE_PREPROCESSORS:
+        batch_dims = [None]
+    if all(d is None for d in batch_dims):
+        try:
+            session.run(None, warmup_feeds(manifest, 2))
+            report['checks']['dynamic_batch'] = 'passed'
+        except Exception as e:
+            report['checks']['dynamic_batch'] = 'failed'
+            report['warnings'].append(f"Batched requests will fail: {e}")
+            manifest['runtime']['max_batch_size'] = 1
+    else:
+        report['checks']['dynamic_batch'] = 'fixed'
+        report['warnings'].append(f"Fixed batch dimension {batch_dims}: batched requests are limited")
+        manifest['runtime']['max_batch_size'] = min(d for d in batch_dims if d is not None)
+    return True
+
+
+def check_micro_runtime(model_bytes: bytes, session, manifest: dict, report: dict) -> None:
+    """
+    Compare the NumPy micro-runtime's outputs with ORT's on warmup and random inputs
+    
+    The verdict becomes the manifest's micro_runtime hint: the inference
+    handler only serves the model from the micro-runtime when it matched.
+    """
+    try:
+        micro = NumpySession(model_bytes)
+    except UnsupportedModel as e:
+        report['checks']['micro_runtime'] = 'unsupported'
+        report['micro_runtime'] = str(e)
+        return
+    
+    warmup = warmup_feeds(manifest, manifest['runtime'].get('max_batch_size') or 2)
+    rng = np.random.default_rng(0)
+    random = {name: rng.standard_normal(x.shape).astype(x.dtype) for name, x in warmup.items()}
+    
+    max_diff, matches = 0.0, True
+    try:
+        for feeds in (warmup, random):
+            for expected, got in zip(session.run(None, feeds), micro.run(None, feeds)):
+                max_diff = max(max_diff, float(np.abs(expected - got).max(initial=0.0)))
+                matches &= bool(np.allclose(expected, got, rtol=MICRO_RUNTIME_RTOL, atol=MICRO_RUNTIME_ATOL))
+    except Exception as e:
+        report['warnings'].append(f"Micro-runtime failed, serving with ONNX Runtime: {e}")
+        matches = False
+    
+    report['checks']['micro_runtime'] = 'passed' if matches else 'mismatch'
+    report['micro_runtime_max_diff'] = max_diff
+    manifest['runtime']['micro_runtime'] = matches
+
+
+def optimize_model(model_bytes: bytes) -> bytes:
+    """Graph-optimized copy of the model (extended level, portable across CPUs)"""
+    fd, path = tempfile.mkstemp(suffix=OPTIMIZED_SUFFIX)
+    os.close(fd)
+    try:
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED
+        options.optimized_model_filepath = path
+        ort.InferenceSession(model_bytes, sess_options=options, providers=['CPUExecutionProvider'])
+        with open(path, 'rb') as f:
+            return f.read()
+    finally:
+        os.remove(path)
+
+
+def validate_model(model_bytes: bytes, model_path: str = None) -> tuple:
+    """
+    Validate model bytes
+
+    Args:
+        model_path: Local copy of a model with external data, its weight
+                    files next to it (see inference_onnx.external_model_path)
+
+    Returns:
+        (manifest or None, report); the manifest is None when validation failed
+    """
+    report = new_report(model_bytes)
+
+    if len(model_bytes) > MAX_MODEL_BYTES:
+        report['errors'].append(f"Model too large: {len(model_bytes)} > {MAX_MODEL_BYTES} bytes")
+        return None, report
+
+    if not check_model_structure(model_bytes, report, model_path):
+        return None, report
+
+    rss_before = current_rss_mb()
+    start = time.perf_counter()
+    try:
+        session = ort.InferenceSession(model_path or model_bytes, providers=['CPUExecutionProvider'])
+    except Exception as e:
+        report['checks']['session'] = 'failed'
+        report['errors'].append(f"ONNX Runtime can't load the model: {e}")
+        return None, report
+    report['load_ms'] = round((time.perf_counter() - start) * 1000, 3)
+    report['checks']['session'] = 'passed'
+    if model_path is not None and external_data_locations(model_bytes):
+        report['checks']['external_data'] = 'passed'
+
+    manifest = parse_manifest(build_manifest(session, model_bytes))
+    report['sha256'] = manifest['sha256']
+
+    if not run_warmup(session, manifest, report):
+        return None, report
+    report['model_rss_mb'] = round(current_rss_mb() - rss_before, 2)
+    check_micro_runtime(model_bytes, session, manifest, report)
+
+    report['status'] = 'passed'
+    manifest['validation'] = {
+        key: report.get(key) for key in ('status', 'validated_at', 'load_ms', 'warmup_ms', 'model_rss_mb')
+    }
+    return manifest, report
+
+
+def new_report(model_bytes: bytes) -> dict:
+    """Validation report for a model, status failed until every check passed"""
+    return {
+        'status': 'failed',
+        'size_bytes': len(model_bytes),
+        'checks': {},
+        'errors': [],
+        'warnings': [],
+        'versions': {'onnxruntime': ort.__version__, 'onnx': getattr(onnx, '__version__', None)},
+        'validated_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+    }
+
+
+def process_upload(bucket: str, key: str) -> dict:
+    """Validate one uploaded model and write its manifest, report and artifacts"""
+    response = s3_client.get_object(Bucket=bucket, Key=key, ChecksumMode='ENABLED')
+    model_bytes = response['Body'].read()
+    log.info("Validating s3://%s/%s (%.2f MB)", bucket, key, len(model_bytes) / (1024 * 1024))
+
+    # External-data weights must be uploaded before the model that references them
+    uid, _, model_name = key.partition('/')
+    try:
+        model_path, _ = external_model_path(uid, model_name, model_bytes, bucket)
+    except Exception as e:
+        manifest, report = None, new_report(model_bytes)
+        report['checks']['external_data'] = 'failed'
+        report['errors'].append(f"External data files unavailable: {e}")
+    else:
+        manifest, report = validate_model(model_bytes, model_path)
+    report['key'] = key
+
+    if manifest is not None:
+        if EMIT_OPTIMIZED_MODEL:
+            try:
+                optimized_key = key[:-len('.onnx')] + OPTIMIZED_SUFFIX
+                s3_client.put_object(Bucket=bucket, Key=optimized_key, Body=optimize_model(model_bytes))
+                report['optimized_key'] = optimized_key
+            except Exception as e:
+                report['warnings'].append(f"Optimized model not written: {e}")
+
+        s3_client.put_object(Bucket=bucket, Key=key + MANIFEST_SUFFIX,
+                             Body=serialize_manifest(manifest).encode('utf-8'),
+                             ContentType='application/json')
+
+        # The inference handler shares sessions only by an S3-verified
+        # SHA-256; when the upload has none, have S3 compute one by copying
+        # the object onto itself. The copy is marked so that its
+        # ObjectCreated:Copy event is skipped (see is_self_copy).
+        if RECORD_CONTENT_HASH and content_key_from_head(response) is None:
+            metadata = dict(response.get('Metadata') or {}, **{SELF_COPY_METADATA_KEY: key})
+            s3_client.copy_object(Bucket=bucket, Key=key, CopySource={'Bucket': bucket, 'Key': key},
+                                  ChecksumAlgorithm='SHA256',
+                                  Metadata=metadata, MetadataDirective='REPLACE',
+                                  ContentType=response.get('ContentType', 'application/octet-stream'))
+
+    s3_client.put_object(Bucket=bucket, Key=key + VALIDATION_SUFFIX,
+                         Body=json.dumps(report, indent=2).encode('utf-8'),
+                         ContentType='application/json')
+
+    if report['status'] == 'passed':
+        log.info("Model valid: %s (load %.1f ms, warmup %.1f ms, %s MB)", key,
+                 report['load_ms'], report['warmup_ms'], report.get('model_rss_mb'))
+    else:
+        log.error("Model failed validation: %s: %s", key, '; '.join(report['errors']))
+    return report
+
+
+def is_self_copy(bucket: str, key: str) -> bool:
+    """Is the object the checksum self-copy process_upload wrote (so already validated)?"""
+    try:
+        head = s3_client.head_object(Bucket=bucket, Key=key)
+    except s3_client.exceptions.ClientError:
+        return False  # process_upload reports it
+    return (head.get('Metadata') or {}).get(SELF_COPY_METADATA_KEY) == key
+
+
+def lambda_handler(event, context):
+    """
+    S3 event handler
+
+    Expected event: S3 notification with Records[].s3.bucket.name / .object.key
+
+    Returns:
+        {"statusCode": 200, "body": {"results": [{key, status, errors, warnings}]}}
+    """
+    results = []
+    for record in event.get('Records', []):
+        bucket = record['s3']['bucket']['name']
+        key = unquote_plus(record['s3']['object']['key'])
+        if not is_model_key(key):
+            continue
+
+        # Other server-side copies (from another key or bucket) are new uploads
+        if record.get('eventName', '').endswith(':Copy') and is_self_copy(bucket, key):
+            continue
+
+        report = process_upload(bucket, key)
+        results.append({k: report.get(k) for k in ('key', 'status', 'errors', 'warnings')})
+
+    return {
+        'statusCode': 200,
+        'body': json.dumps({'results': results})
+    }
+
+
+# For local testing: validate files on disk without S3
+if __name__ == "__main__":
+    paths = sys.argv[1:] or ['sentiment-model.onnx']
+    for path in paths:
+        with open(path, 'rb') as f:
+            _, result = validate_model(f.read(), path)
+        print(json.dumps(result, indent=2))
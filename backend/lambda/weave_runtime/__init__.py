@@ -0,0 +1,4 @@
+"""
+Runtime helpers for the ONNX inference Lambda handler
+Packaged next to inference_onnx.py in every deployment zip
+"""
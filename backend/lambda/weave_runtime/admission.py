@@ -0,0 +1,307 @@
+"""
+Per-tenant admission control for a shared, long-running inference process
+Per-uid concurrency limits, weighted fair queuing across tenants, bounded queues
+"""
+
+import itertools
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from weave_runtime.histogram import LogLinearHistogram
+
+TENANT_MAX_CONCURRENCY = int(os.environ.get('TENANT_MAX_CONCURRENCY', '4'))
+TENANT_QUEUE_LIMIT = int(os.environ.get('TENANT_QUEUE_LIMIT', '16'))
+ADMISSION_QUEUE_TIMEOUT = float(os.environ.get('ADMISSION_QUEUE_TIMEOUT', '10'))
+
+
+class Rejected(Exception):
+    """Request turned away: the tenant's queue is full or the wait timed out (HTTP 429)"""
+
+    def __init__(self, uid: str, reason: str, retry_after: float = 1.0):
+        super().__init__(f"Tenant {uid} over capacity ({reason})")
+        self.uid = uid
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class Ticket:
+    """One admitted or queued request"""
+
+    __slots__ = ('uid', 'cost', 'start_tag', 'finish_tag', 'enqueued', 'admitted_at', 'event',
+                 'on_admit', 'on_reject')
+
+    def __init__(self, uid: str, cost: float, start_tag: float, finish_tag: float):
+        self.uid = uid
+        self.cost = cost
+        self.start_tag = start_tag
+        self.finish_tag = finish_tag
+        self.enqueued = time.perf_counter()
+        self.admitted_at = None
+        self.event = threading.Event()
+        # Set for submit()ted tickets, which nobody waits on
+        self.on_admit = None
+        self.on_reject = None
+
+    @property
+    def wait_ms(self) -> float:
+        return ((self.admitted_at or time.perf_counter()) - self.enqueued) * 1000
+
+
+class TenantState:
+    """Queue, in-flight count and counters for one uid"""
+
+    __slots__ = ('weight', 'queue', 'in_flight', 'last_finish', 'admitted', 'rejected',
+                 'max_depth', 'wait_us')
+
+    def __init__(self, weight: float):
+        self.weight = weight
+        self.queue = deque()
+        self.in_flight = 0
+        self.last_finish = 0.0
+        self.admitted = 0
+        self.rejected = 0
+        self.max_depth = 0
+        self.wait_us = LogLinearHistogram()
+
+
+class AdmissionController:
+    """
+    Admission layer in front of a fixed pool of workers
+
+    Each request acquires one of `capacity` slots. A tenant holds at most
+    `per_tenant_limit` slots at once; beyond that (or when the pool is full)
+    its requests wait in a per-tenant queue of at most `queue_limit`
+    entries, and anything past that is rejected immediately.
+
+    Freed slots go to the queued request with the smallest virtual finish
+    tag (weighted fair queuing): a request costing c from a tenant of
+    weight w finishes c / w after the later of the tenant's previous finish
+    and the current virtual time. A tenant sending large batches therefore
+    gets its weighted share of slots, not of requests, and a quiet tenant's
+    next request is near the front of the line.
+
+    Usage:
+        with controller.admit(uid, cost=batch_size):
+            ...   # run the request
+
+        # Event-loop hosts, without blocking the caller:
+        controller.submit(uid, batch_size, on_admit=start, on_reject=answer_429)
+    """
+
+    def __init__(self, capacity: int, per_tenant_limit: int = TENANT_MAX_CONCURRENCY,
+                 queue_limit: int = TENANT_QUEUE_LIMIT, queue_timeout: float = ADMISSION_QUEUE_TIMEOUT,
+                 weights: dict = None, default_weight: float = 1.0):
+        self.capacity = capacity
+        self.per_tenant_limit = per_tenant_limit or capacity
+        self.queue_limit = queue_limit
+        self.queue_timeout = queue_timeout
+        self.weights = dict(weights or {})
+        self.default_weight = default_weight
+        self.lock = threading.Lock()
+        self.tenants = {}
+        self.in_flight = 0
+        self.queued = 0
+        self.virtual_time = 0.0
+        # submit() callbacks to run once the lock is released
+        self.callbacks = []
+
+    def _tenant(self, uid: str) -> TenantState:
+        tenant = self.tenants.get(uid)
+        if tenant is None:
+            tenant = self.tenants[uid] = TenantState(self.weights.get(uid, self.default_weight))
+        return tenant
+
+    def _tag(self, tenant: TenantState, uid: str, cost: float) -> Ticket:
+        start = max(self.virtual_time, tenant.last_finish)
+        tenant.last_finish = start + cost / tenant.weight
+        return Ticket(uid, cost, start, tenant.last_finish)
+
+    def _admit(self, ticket: Ticket, tenant: TenantState) -> None:
+        """Hand a slot to a ticket (lock held)"""
+        self.in_flight += 1
+        tenant.in_flight += 1
+        tenant.admitted += 1
+        self.virtual_time = max(self.virtual_time, ticket.start_tag)
+        ticket.admitted_at = time.perf_counter()
+        tenant.wait_us.record(int(ticket.wait_ms * 1000))
+        ticket.event.set()
+        if ticket.on_admit is not None:
+            self.callbacks.append((ticket.on_admit, ticket))
+
+    def _withdraw(self, ticket: Ticket, tenant: TenantState) -> None:
+        """Drop a queued ticket and give its virtual time back to the tenant (lock held)"""
+        index = tenant.queue.index(ticket)
+        del tenant.queue[index]
+        self.queued -= 1
+        tenant.rejected += 1
+        # Later tickets were tagged after this one; move them up into its place
+        shift = ticket.finish_tag - ticket.start_tag
+        for later in itertools.islice(tenant.queue, index, None):
+            later.start_tag -= shift
+            later.finish_tag -= shift
+        tenant.last_finish -= shift
+
+    def _expire(self) -> None:
+        """Reject submit()ted tickets queued for longer than queue_timeout (lock held)"""
+        deadline = time.perf_counter() - self.queue_timeout
+        for uid, tenant in self.tenants.items():
+            while tenant.queue and tenant.queue[0].on_reject is not None \
+                    and tenant.queue[0].enqueued < deadline:
+                ticket = tenant.queue[0]
+                self._withdraw(ticket, tenant)
+                self.callbacks.append((ticket.on_reject, Rejected(uid, 'queue_timeout')))
+
+    def _run_callbacks(self) -> None:
+        """Run pending submit() callbacks (lock not held: they may call back in)"""
+        if not self.callbacks:
+            return
+        with self.lock:
+            callbacks, self.callbacks = self.callbacks, []
+        for callback, arg in callbacks:
+            callback(arg)
+
+    def _dispatch(self) -> None:
+        """Fill free slots from the queues, smallest finish tag first (lock held)"""
+        if self.queued:
+            self._expire()
+        while self.queued and self.in_flight < self.capacity:
+            best = None
+            for tenant in self.tenants.values():
+                if tenant.queue and tenant.in_flight < self.per_tenant_limit:
+                    if best is None or tenant.queue[0].finish_tag < best.queue[0].finish_tag:
+                        best = tenant
+            if best is None:
+                return
+            self.queued -= 1
+            self._admit(best.queue.popleft(), best)
+
+    def acquire(self, uid: str, cost: float = 1.0) -> Ticket:
+        """
+        Wait for a slot
+
+        Raises:
+            Rejected: the tenant's queue is full, or no slot freed up within queue_timeout
+        """
+        try:
+            ticket, tenant = self._enqueue(uid, cost)
+        finally:
+            self._run_callbacks()
+        if ticket.event.wait(self.queue_timeout):
+            return ticket
+
+        with self.lock:
+            if ticket.event.is_set():
+                # Admitted between the timeout and taking the lock
+                return ticket
+            self._withdraw(ticket, tenant)
+        raise Rejected(uid, 'queue_timeout')
+
+    def submit(self, uid: str, cost: float, on_admit, on_reject) -> None:
+        """
+        acquire() for callers that must not block
+
+        on_admit(ticket) runs once the ticket holds a slot, on this thread or
+        on the one releasing a slot; the ticket must be release()d as usual.
+        on_reject(Rejected) runs when the tenant's queue is full, or when the
+        ticket has waited past queue_timeout by the time a slot frees up.
+        """
+        try:
+            self._enqueue(uid, cost, on_admit, on_reject)
+        except Rejected as e:
+            on_reject(e)
+        finally:
+            self._run_callbacks()
+
+    def _enqueue(self, uid: str, cost: float, on_admit=None, on_reject=None) -> tuple:
+        """Tag a request and admit or queue it; (ticket, tenant)"""
+        with self.lock:
+            tenant = self._tenant(uid)
+            ticket = self._tag(tenant, uid, max(cost, 1.0))
+            ticket.on_admit = on_admit
+            ticket.on_reject = on_reject
+
+            # Nothing ahead of it: admit without queueing
+            if not tenant.queue and self.in_flight < self.capacity and \
+                    tenant.in_flight < self.per_tenant_limit and not self.queued:
+                self._admit(ticket, tenant)
+                return ticket, tenant
+
+            if len(tenant.queue) >= self.queue_limit:
+                tenant.rejected += 1
+                # The tag was never used; give the tenant its virtual time back
+                tenant.last_finish = ticket.start_tag
+                raise Rejected(uid, 'queue_full')
+
+            tenant.queue.append(ticket)
+            tenant.max_depth = max(tenant.max_depth, len(tenant.queue))
+            self.queued += 1
+            self._dispatch()
+        return ticket, tenant
+
+    def release(self, ticket: Ticket) -> None:
+        """Return a ticket's slot and admit whoever is next"""
+        with self.lock:
+            self.in_flight -= 1
+            self.tenants[ticket.uid].in_flight -= 1
+            self._dispatch()
+        self._run_callbacks()
+
+    @contextmanager
+    def admit(self, uid: str, cost: float = 1.0):
+        ticket = self.acquire(uid, cost)
+        try:
+            yield ticket
+        finally:
+            self.release(ticket)
+
+    def stats(self) -> dict:
+        """Current depth and in-flight counts, plus wait-time percentiles per tenant"""
+        with self.lock:
+            return {
+                'capacity': self.capacity,
+                'in_flight': self.in_flight,
+                'queued': self.queued,
+                'tenants': {
+                    uid: {
+                        'weight': tenant.weight,
+                        'in_flight': tenant.in_flight,
+                        'queue_depth': len(tenant.queue),
+                        'max_queue_depth': tenant.max_depth,
+                        'admitted': tenant.admitted,
+                        'rejected': tenant.rejected,
+                        'wait_ms': tenant.wait_us.summary(scale=1000.0),
+                    }
+                    for uid, tenant in self.tenants.items()
+                },
+            }
+
+    def flush(self) -> dict:
+        """stats(), then reset the per-tenant counters and wait histograms"""
+        record = self.stats()
+        with self.lock:
+            for uid in list(self.tenants):
+                tenant = self.tenants[uid]
+                if not tenant.queue and not tenant.in_flight:
+                    # Idle tenants are dropped so the table tracks active uids
+                    del self.tenants[uid]
+                    continue
+                tenant.admitted = tenant.rejected = 0
+                tenant.max_depth = len(tenant.queue)
+                tenant.wait_us = LogLinearHistogram()
+        return record
+
+
+def request_tenant(body) -> tuple:
+    """
+    (uid, cost) of a parsed request body for admission: cost is its batch size
+
+    Bodies that aren't a JSON object (unparseable, or None) are charged to
+    "anonymous" at cost 1 and left for the handler to reject.
+    """
+    if not isinstance(body, dict):
+        return 'anonymous', 1
+    inputs = body.get('input')
+    return str(body.get('uid') or 'anonymous'), len(inputs) if isinstance(inputs, list) else 1
@@ -0,0 +1,107 @@
+"""
+Request/response codecs for the inference handler
+Uses orjson when it is installed and falls back to the stdlib json module
+"""
+
+import json
+import os
+
+import numpy as np
+
+from weave_runtime.metrics import get_logger
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+log = get_logger()
+
+
+def _to_builtin(obj):
+    """Convert NumPy values the encoder can't handle natively"""
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+class StdlibCodec:
+    """
+    json module codec with compact separators
+
+    NumPy arrays and scalars are converted through tolist()/item() as they
+    are reached, so callers can hand over arrays without copying them first.
+    """
+
+    name = 'json'
+
+    def loads(self, data):
+        return json.loads(data)
+
+    def dumps(self, obj) -> str:
+        return json.dumps(obj, separators=(',', ':'), default=_to_builtin)
+
+
+class OrjsonCodec:
+    """
+    orjson codec
+
+    Serializes contiguous NumPy arrays natively (no intermediate Python
+    lists) and writes float32 values with their shortest round-trip repr.
+    """
+
+    name = 'orjson'
+
+    def loads(self, data):
+        return orjson.loads(data)
+
+    def dumps(self, obj) -> str:
+        return orjson.dumps(
+            obj, default=_to_builtin, option=orjson.OPT_SERIALIZE_NUMPY
+        ).decode('utf-8')
+
+
+CODECS = {
+    'json': StdlibCodec,
+    'orjson': OrjsonCodec,
+}
+
+
+def get_codec(name: str = None):
+    """
+    Pick a codec by name
+
+    Args:
+        name: 'orjson', 'json' or 'auto' (default: RESPONSE_CODEC env var,
+              then 'auto', which prefers orjson when installed)
+
+    Returns:
+        Codec instance with loads() and dumps()
+    """
+    name = (name or os.environ.get('RESPONSE_CODEC', 'auto')).lower()
+
+    if name == 'auto':
+        name = 'orjson' if orjson is not None else 'json'
+
+    if name not in CODECS:
+        raise ValueError(f"Unknown codec: {name}")
+    if name == 'orjson' and orjson is None:
+        log.warning("orjson not installed, falling back to json")
+        name = 'json'
+
+    return CODECS[name]()
+
+
+def round_floats(values: np.ndarray, precision: int = None) -> np.ndarray:
+    """
+    Round a float array to `precision` decimals for the response
+
+    Rounding happens in float64 so the encoded text is the short decimal
+    (0.8731) rather than the float32 neighbour (0.8730999827384949).
+    Non-float arrays and precision=None pass through untouched.
+    """
+    if precision is None or not np.issubdtype(values.dtype, np.floating):
+        return values
+    return np.round(values.astype(np.float64), precision)
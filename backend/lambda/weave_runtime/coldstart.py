@@ -0,0 +1,126 @@
+"""
+Cold-start timeline tracer
+Import this first in the handler module so its clock starts before heavy imports
+"""
+
+import os
+import sys
+import threading
+import time
+import uuid
+
+# Captured at import time: the earliest point the handler module can observe
+MODULE_IMPORT_NS = time.perf_counter_ns()
+MODULE_IMPORT_EPOCH = time.time()
+
+
+def process_start_epoch() -> float:
+    """
+    Wall-clock time the process started (Linux only, 10ms resolution)
+
+    Lets the timeline show how long the runtime spent before our module
+    was imported. Returns None where /proc isn't available.
+    """
+    try:
+        with open('/proc/self/stat') as f:
+            # Field 22 (starttime, in clock ticks since boot); the command name
+            # in field 2 may contain spaces, so split after its closing paren
+            start_ticks = int(f.read().rsplit(')', 1)[1].split()[19])
+        with open('/proc/stat') as f:
+            boot_time = next(int(line.split()[1]) for line in f if line.startswith('btime'))
+        return boot_time + start_ticks / os.sysconf('SC_CLK_TCK')
+    except (OSError, ValueError, IndexError, StopIteration):
+        return None
+
+
+class ColdStartTracer:
+    """
+    Records init milestones and tags the first invocation of each instance
+
+    Usage (module level, in import order):
+        tracer.mark('import_numpy')
+        tracer.mark('import_onnxruntime')
+
+    Usage (per request):
+        invocation = tracer.start_invocation()
+        ...
+        response['instance'] = tracer.instance_metadata(invocation)
+        if invocation['cold']:
+            tracer.timeline(stages_ms)
+    """
+
+    def __init__(self):
+        self.instance_id = uuid.uuid4().hex[:12]
+        self.marks = []
+        self.last_ns = MODULE_IMPORT_NS
+        self.init_done_ns = None
+        self.invocations = 0
+        self.first_invocation_ns = None
+        # Requests may start concurrently on worker threads (lambda_handler_async)
+        self.lock = threading.Lock()
+
+    def mark(self, milestone: str) -> None:
+        """Record an init milestone; its duration is the time since the previous one"""
+        now = time.perf_counter_ns()
+        self.marks.append((milestone, now - self.last_ns))
+        self.last_ns = now
+
+    def start_invocation(self) -> dict:
+        """Count an invocation; the first one per instance is the cold one"""
+        now = time.perf_counter_ns()
+        with self.lock:
+            if self.init_done_ns is None:
+                self.init_done_ns = self.last_ns
+            self.invocations += 1
+            cold = self.first_invocation_ns is None
+            if cold:
+                self.first_invocation_ns = now
+            return {'cold': cold, 'count': self.invocations, 'start_ns': now}
+
+    def uptime_s(self) -> float:
+        """Seconds since the handler module was imported"""
+        return (time.perf_counter_ns() - MODULE_IMPORT_NS) / 1e9
+
+    def instance_metadata(self, invocation: dict) -> dict:
+        """Instance fields included in every response"""
+        return {
+            'id': self.instance_id,
+            'cold': invocation['cold'],
+            'invocation': invocation['count'],
+            'uptime_s': round(self.uptime_s(), 3),
+        }
+
+    def timeline(self, stages_ms: dict = None) -> dict:
+        """
+        Full cold-start timeline: pre-import, module init, gap, first invocation
+
+        Args:
+            stages_ms: StageTimer breakdown of the first invocation
+
+        Returns:
+            Dict of milestones in milliseconds
+        """
+        init_ms = {name: round(ns / 1e6, 3) for name, ns in self.marks}
+        init_total_ns = (self.init_done_ns or self.last_ns) - MODULE_IMPORT_NS
+
+        process_start = process_start_epoch()
+        record = {
+            'instance': self.instance_id,
+            'python': sys.version.split()[0],
+            'before_import_ms': (
+                round((MODULE_IMPORT_EPOCH - process_start) * 1000, 1)
+                if process_start is not None else None
+            ),
+            'init_ms': init_ms,
+            'init_total_ms': round(init_total_ns / 1e6, 3),
+            'init_to_first_invocation_ms': (
+                round((self.first_invocation_ns - (self.init_done_ns or self.last_ns)) / 1e6, 3)
+                if self.first_invocation_ns is not None else None
+            ),
+            'first_invocation_ms': stages_ms or {},
+        }
+        return record
+
+
+# One tracer per process (= per Lambda instance)
+tracer = ColdStartTracer()
@@ -0,0 +1,103 @@
+"""
+Accept-Encoding negotiation and response body compression
+gzip is always available; brotli is used when the module is installed
+"""
+
+import base64
+import gzip
+import os
+import time
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Bodies smaller than this are sent as-is; the header overhead isn't worth it
+MIN_COMPRESS_BYTES = int(os.environ.get('COMPRESSION_MIN_BYTES', '1024'))
+
+# Low levels: most of the size win for a fraction of the CPU time
+GZIP_LEVEL = int(os.environ.get('GZIP_LEVEL', '1'))
+BROTLI_QUALITY = int(os.environ.get('BROTLI_QUALITY', '1'))
+
+
+def parse_accept_encoding(header: str) -> dict:
+    """
+    Parse an Accept-Encoding header into {encoding: q}
+
+    Example:
+        "br;q=1.0, gzip;q=0.8, *;q=0.1" -> {'br': 1.0, 'gzip': 0.8, '*': 0.1}
+    """
+    accepted = {}
+    for part in (header or '').split(','):
+        fields = part.strip().split(';')
+        coding = fields[0].strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in fields[1:]:
+            name, _, value = param.strip().partition('=')
+            if name.strip() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[coding] = q
+    return accepted
+
+
+def choose_encoding(header: str) -> str:
+    """
+    Pick the response encoding for an Accept-Encoding header
+
+    Returns:
+        'br', 'gzip' or None (send uncompressed)
+    """
+    accepted = parse_accept_encoding(header)
+    wildcard = accepted.get('*', 0.0)
+
+    candidates = ['br', 'gzip'] if brotli is not None else ['gzip']
+    best, best_q = None, 0.0
+    for coding in candidates:
+        q = accepted.get(coding, wildcard)
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+def compress_body(body: str, accept_encoding: str, min_bytes: int = None) -> tuple:
+    """
+    Compress a response body if the client accepts it and it's big enough
+
+    Args:
+        body: Encoded response body
+        accept_encoding: Request's Accept-Encoding header (may be None)
+        min_bytes: Size threshold (default: COMPRESSION_MIN_BYTES)
+
+    Returns:
+        (encoding, payload, stats): encoding is None when the body is sent
+        as-is; otherwise payload is the base64 text to return with
+        isBase64Encoded. stats has sizes, ratio and compression time.
+    """
+    raw = body.encode('utf-8')
+    threshold = MIN_COMPRESS_BYTES if min_bytes is None else min_bytes
+
+    encoding = choose_encoding(accept_encoding) if len(raw) >= threshold else None
+    if encoding is None:
+        return None, body, None
+
+    start = time.perf_counter_ns()
+    if encoding == 'br':
+        compressed = brotli.compress(raw, quality=BROTLI_QUALITY)
+    else:
+        compressed = gzip.compress(raw, compresslevel=GZIP_LEVEL, mtime=0)
+    elapsed_ms = (time.perf_counter_ns() - start) / 1e6
+
+    stats = {
+        'encoding': encoding,
+        'raw_bytes': len(raw),
+        'compressed_bytes': len(compressed),
+        'ratio': round(len(raw) / max(len(compressed), 1), 2),
+        'time_ms': round(elapsed_ms, 3),
+    }
+    return encoding, base64.b64encode(compressed).decode('ascii'), stats
@@ -0,0 +1,227 @@
+"""
+Log-linear (HDR-style) latency histograms kept inside a warm instance
+Flushed as percentile summaries; serialized form merges across instances
+"""
+
+import math
+import os
+import threading
+import time
+
+# 2**SUB_BUCKET_BITS linear sub-buckets per power of two: ~3% worst-case error
+SUB_BUCKET_BITS = 5
+
+FLUSH_SECONDS = float(os.environ.get('HISTOGRAM_FLUSH_SECONDS', '60'))
+FLUSH_EVERY = int(os.environ.get('HISTOGRAM_FLUSH_EVERY', '1000'))
+
+SUMMARY_PERCENTILES = (50, 90, 99, 99.9)
+
+
+class LogLinearHistogram:
+    """
+    Histogram of non-negative integer values (we use microseconds)
+
+    Values below 2**p get one bucket each; above that every power of two is
+    split into 2**(p-1) equal buckets, so relative error stays under
+    2**-(p-1) at any magnitude. Counts live in a sparse dict keyed by bucket
+    index, which keeps empty histograms tiny and merging trivial.
+    """
+
+    __slots__ = ('p', 'half', 'counts', 'count', 'total', 'min', 'max')
+
+    def __init__(self, p: int = SUB_BUCKET_BITS):
+        self.p = p
+        self.half = 1 << (p - 1)
+        self.counts = {}
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = 0
+
+    def bucket_index(self, value: int) -> int:
+        """Bucket for a value"""
+        magnitude = value.bit_length() - self.p
+        if magnitude <= 0:
+            return value
+        return magnitude * self.half + (value >> magnitude)
+
+    def bucket_bounds(self, index: int) -> tuple:
+        """[low, high) value range covered by a bucket"""
+        magnitude = max(index // self.half - 1, 0)
+        low = (index - magnitude * self.half) << magnitude
+        return low, low + (1 << magnitude)
+
+    def record(self, value: int) -> None:
+        """Add one value"""
+        index = self.bucket_index(value)
+        counts = self.counts
+        counts[index] = counts.get(index, 0) + 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+        if self.min is None or value < self.min:
+            self.min = value
+
+    def percentile(self, q: float) -> float:
+        """Value at percentile q (0-100), reported as its bucket midpoint"""
+        if not self.count:
+            return None
+        target = max(1, math.ceil(q / 100.0 * self.count))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= target:
+                low, high = self.bucket_bounds(index)
+                return min((low + high - 1) / 2.0, self.max)
+        return float(self.max)
+
+    def summary(self, percentiles=SUMMARY_PERCENTILES, scale: float = 1.0) -> dict:
+        """Count, mean, max and percentiles, each divided by `scale`"""
+        if not self.count:
+            return {'count': 0}
+        result = {
+            'count': self.count,
+            'mean': round(self.total / self.count / scale, 3),
+            'max': round(self.max / scale, 3),
+        }
+        for q in percentiles:
+            result[f"p{q:g}".replace('.', '')] = round(self.percentile(q) / scale, 3)
+        return result
+
+    def merge(self, other: 'LogLinearHistogram') -> None:
+        """Add another histogram's counts into this one"""
+        if other.p != self.p:
+            raise ValueError(f"Can't merge histograms with p={other.p} into p={self.p}")
+        for index, n in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + n
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+        if other.min is not None and (self.min is None or other.min < self.min):
+            self.min = other.min
+
+    def to_dict(self) -> dict:
+        """Compact serialized form for logs"""
+        return {
+            'p': self.p,
+            'count': self.count,
+            'total': self.total,
+            'min': self.min,
+            'max': self.max,
+            'counts': {str(index): n for index, n in self.counts.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'LogLinearHistogram':
+        """Rebuild a histogram from to_dict() output"""
+        hist = cls(data['p'])
+        hist.counts = {int(index): n for index, n in data['counts'].items()}
+        hist.count = data['count']
+        hist.total = data['total']
+        hist.min = data['min']
+        hist.max = data['max']
+        return hist
+
+
+class HistogramRegistry:
+    """
+    Latency histograms per model and per stage, flushed periodically
+
+    Safe to share between request threads: recording and flushing take a
+    lock (uncontended in a single-threaded Lambda instance).
+
+    Usage:
+        registry.record_stages(model_name, timer.stages, timer.total_ns())
+        flushed = registry.maybe_flush()   # dict to log, or None
+    """
+
+    def __init__(self, flush_seconds: float = FLUSH_SECONDS, flush_every: int = FLUSH_EVERY):
+        self.flush_seconds = flush_seconds
+        self.flush_every = flush_every
+        self.histograms = {}
+        self.recorded = 0
+        self.window_start = time.time()
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+
+    def get(self, model: str, stage: str) -> LogLinearHistogram:
+        """Histogram for (model, stage), created on first use"""
+        key = (model, stage)
+        hist = self.histograms.get(key)
+        if hist is None:
+            hist = self.histograms[key] = LogLinearHistogram()
+        return hist
+
+    def record_stages(self, model: str, stages_ns: dict, total_ns: int = None) -> None:
+        """Record one request's stage timings (nanoseconds) in microseconds"""
+        with self.lock:
+            for stage, ns in stages_ns.items():
+                self.get(model, stage).record(ns // 1000)
+            if total_ns is not None:
+                self.get(model, 'total').record(total_ns // 1000)
+            self.recorded += 1
+
+    def due(self) -> bool:
+        """Has the flush interval (time or invocations) elapsed?"""
+        return self.recorded > 0 and (
+            self.recorded >= self.flush_every
+            or time.time() - self.window_start >= self.flush_seconds
+        )
+
+    def flush(self) -> dict:
+        """
+        Summarize and reset
+
+        Returns:
+            {"window_s", "requests", "models": {model: {stage: summary}},
+             "histograms": {"model|stage": serialized}} with latencies in ms
+        """
+        with self.lock:
+            now = time.time()
+            histograms, self.histograms = self.histograms, {}
+            recorded, self.recorded = self.recorded, 0
+            window_start, self.window_start = self.window_start, now
+
+        models = {}
+        serialized = {}
+        for (model, stage), hist in histograms.items():
+            models.setdefault(model, {})[stage] = hist.summary(scale=1000.0)
+            serialized[f"{model}|{stage}"] = hist.to_dict()
+
+        return {
+            'window_s': round(now - window_start, 3),
+            'requests': recorded,
+            'models': models,
+            'histograms': serialized,
+        }
+
+    def maybe_flush(self) -> dict:
+        """flush() if due, else None (one thread flushes a given window)"""
+        if not self.due() or not self.flush_lock.acquire(blocking=False):
+            return None
+        try:
+            return self.flush() if self.due() else None
+        finally:
+            self.flush_lock.release()
+
+
+def merge_serialized(records: list) -> dict:
+    """
+    Merge flushed records (e.g. from many instances' logs)
+
+    Args:
+        records: Dicts as returned by HistogramRegistry.flush()
+
+    Returns:
+        {"model|stage": LogLinearHistogram}
+    """
+    merged = {}
+    for record in records:
+        for key, data in record.get('histograms', {}).items():
+            hist = LogLinearHistogram.from_dict(data)
+            if key in merged:
+                merged[key].merge(hist)
+            else:
+                merged[key] = hist
+    return merged
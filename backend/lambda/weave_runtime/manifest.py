@@ -0,0 +1,241 @@
+"""
+Per-model manifests: signatures, preprocessor, labels and runtime hints
+Stored next to the model as <model_name>.manifest.json and cached with its session
+"""
+
+import hashlib
+import json
+import os
+
+from weave_runtime.postprocess import DEFAULT_LABELS, MAX_IMPLICIT_CLASSES, load_label_map
+
+MANIFEST_VERSION = 1
+MANIFEST_SUFFIX = '.manifest.json'
+
+# Write generated manifests back next to the model so later cold starts skip inference
+WRITE_MISSING_MANIFESTS = os.environ.get('WRITE_MANIFESTS', '1') != '0'
+
+# Preprocessors the handler can dispatch to
+PREPROCESSORS = ('text_chars', 'image_bytes', 'tensor', 'tfidf_sparse')
+TASKS = ('sentiment', 'classifier', 'generic')
+
+DEFAULT_TEXT_LENGTH = 128
+
+# scikit-learn's default tokenizer, for tfidf_sparse models that don't ship one
+DEFAULT_TOKEN_PATTERN = r"(?u)\b\w\w+\b"
+
+# ONNX tensor type -> numpy dtype name
+ORT_TO_DTYPE = {
+    'tensor(float)': 'float32',
+    'tensor(double)': 'float64',
+    'tensor(float16)': 'float16',
+    'tensor(int64)': 'int64',
+    'tensor(int32)': 'int32',
+    'tensor(int8)': 'int8',
+    'tensor(uint8)': 'uint8',
+    'tensor(bool)': 'bool',
+    'tensor(string)': 'str',
+}
+
+# Output dtypes ExecutionContext can bind
+BINDABLE_DTYPES = {'float32', 'float64', 'int64', 'int32'}
+
+
+class InputError(Exception):
+    """Request input doesn't match what the model's manifest expects (HTTP 400)"""
+
+
+def manifest_key(uid: str, model_name: str) -> str:
+    """S3 key (or path under LOCAL_MODEL_DIR) of a model's manifest"""
+    return f"{uid}/{model_name}{MANIFEST_SUFFIX}"
+
+
+def describe_tensors(nodes) -> list:
+    """Name, dtype and shape (None for symbolic dims) of session inputs/outputs"""
+    return [
+        {
+            'name': node.name,
+            'dtype': ORT_TO_DTYPE.get(node.type, node.type),
+            'shape': [d if isinstance(d, int) else None for d in node.shape],
+        }
+        for node in nodes
+    ]
+
+
+def infer_preprocessor(inputs: list, metadata: dict) -> dict:
+    """
+    Pick the preprocessor for a model
+
+    A "preprocessor" metadata entry wins. Without one, only the sentiment
+    models' single (batch, 128) float input gets the char-feature text
+    preprocessor; anything else, including other (batch, N) float inputs,
+    takes raw tensors from the request. The choice is written to the
+    generated manifest, where it can be corrected. Sparse TF-IDF models
+    carry their vocabulary and tokenizer settings in metadata.
+    """
+    kind = metadata.get('preprocessor')
+    if kind not in PREPROCESSORS:
+        sentiment_input = (
+            len(inputs) == 1 and inputs[0]['dtype'] == 'float32'
+            and inputs[0]['shape'][1:] == [DEFAULT_TEXT_LENGTH]
+        )
+        kind = 'text_chars' if sentiment_input else 'tensor'
+
+    preprocessor = {'kind': kind}
+    if kind == 'text_chars':
+        width = inputs[0]['shape'][1] if len(inputs[0]['shape']) == 2 else None
+        preprocessor['max_length'] = width or int(metadata.get('max_length', DEFAULT_TEXT_LENGTH))
+    elif kind == 'tfidf_sparse':
+        preprocessor['vocabulary'] = json.loads(metadata.get('vocabulary', '[]'))
+        preprocessor['token_pattern'] = metadata.get('token_pattern', DEFAULT_TOKEN_PATTERN)
+        preprocessor['lowercase'] = metadata.get('lowercase', 'true').lower() != 'false'
+        preprocessor['ngram_range'] = json.loads(metadata.get('ngram_range', '[1, 1]'))
+    return preprocessor
+
+
+def primary_output_index(outputs: list) -> int:
+    """
+    Output to postprocess
+
+    sklearn-converted classifiers emit (label, probabilities); the
+    probabilities carry more information, so prefer them.
+    """
+    if (len(outputs) > 1 and outputs[0]['dtype'] == 'int64' and len(outputs[0]['shape']) == 1
+            and outputs[1]['dtype'] in ('float32', 'float64') and len(outputs[1]['shape']) == 2):
+        return 1
+    return 0
+
+
+def infer_task(preprocessor: dict, output: dict, labels: dict, metadata: dict) -> tuple:
+    """
+    (task, labels) for a model's primary output
+
+    Two-class outputs on the text preprocessor are the sentiment demo models
+    and get the negative/positive labels; other narrow outputs are generic
+    classifiers with class_<n> names unless the model ships labels.
+    """
+    task = metadata.get('task')
+    shape = output['shape']
+    width = shape[1] if len(shape) == 2 else None
+
+    if task not in TASKS:
+        if labels is not None or (width is not None and width <= MAX_IMPLICIT_CLASSES):
+            task = 'classifier'
+        else:
+            task = 'generic'
+
+        if task == 'classifier':
+            is_sentiment_labels = labels is not None and set(labels.values()) == set(DEFAULT_LABELS.values())
+            text_model = preprocessor['kind'] in ('text_chars', 'tfidf_sparse')
+            if is_sentiment_labels or (labels is None and width == 2 and text_model):
+                task = 'sentiment'
+
+    if task == 'sentiment' and labels is None:
+        labels = dict(DEFAULT_LABELS)
+    return task, labels
+
+
+def runtime_hints(inputs: list, outputs: list, preprocessor: dict, metadata: dict) -> dict:
+    """Session and execution hints the handler applies when loading the model"""
+    io_binding = (
+        preprocessor['kind'] == 'text_chars'
+        and all(isinstance(d, int) for d in inputs[0]['shape'][1:])
+        and all(o['dtype'] in BINDABLE_DTYPES for o in outputs)
+    )
+
+    def int_or_none(key):
+        try:
+            return int(metadata[key])
+        except (KeyError, TypeError, ValueError):
+            return None
+
+    return {
+        'io_binding': io_binding,
+        'intra_op_threads': int_or_none('intra_op_threads'),
+        'max_batch_size': int_or_none('max_batch_size'),
+    }
+
+
+def build_manifest(session, model_bytes: bytes = None) -> dict:
+    """
+    Generate a manifest from a loaded session (and optionally the model bytes)
+
+    Returns:
+        JSON-serializable manifest dict
+    """
+    try:
+        metadata = dict(session.get_modelmeta().custom_metadata_map)
+    except Exception:
+        metadata = {}
+
+    inputs = describe_tensors(session.get_inputs())
+    outputs = describe_tensors(session.get_outputs())
+    preprocessor = infer_preprocessor(inputs, metadata)
+    primary = primary_output_index(outputs)
+    task, labels = infer_task(preprocessor, outputs[primary], load_label_map(session), metadata)
+
+    manifest = {
+        'version': MANIFEST_VERSION,
+        'inputs': inputs,
+        'outputs': outputs,
+        'primary_output': primary,
+        'preprocessor': preprocessor,
+        'task': task,
+        'labels': {str(k): v for k, v in labels.items()} if labels is not None else None,
+        'runtime': runtime_hints(inputs, outputs, preprocessor, metadata),
+    }
+    if model_bytes is not None:
+        manifest['sha256'] = hashlib.sha256(model_bytes).hexdigest()
+        manifest['size_bytes'] = len(model_bytes)
+    return manifest
+
+
+def parse_manifest(raw) -> dict:
+    """
+    Load a stored manifest (bytes, str or dict), normalizing label keys to ints
+
+    Returns:
+        Manifest dict, or None if it is unreadable or from another version
+    """
+    try:
+        manifest = json.loads(raw) if isinstance(raw, (bytes, str)) else dict(raw)
+    except ValueError:
+        return None
+
+    if manifest.get('version') != MANIFEST_VERSION:
+        return None
+    if manifest.get('preprocessor', {}).get('kind') not in PREPROCESSORS:
+        return None
+
+    if manifest.get('labels') is not None:
+        manifest['labels'] = {int(k): v for k, v in manifest['labels'].items()}
+    return manifest
+
+
+def manifest_matches(manifest: dict, session, model_bytes: bytes = None) -> bool:
+    """
+    Does a stored manifest still describe this model?
+
+    Compares input/output names and, when both are known, the model size;
+    hashing every cold load would cost more than regenerating.
+    """
+    if model_bytes is not None and manifest.get('size_bytes') not in (None, len(model_bytes)):
+        return False
+    return (
+        [i['name'] for i in manifest['inputs']] == [i.name for i in session.get_inputs()]
+        and [o['name'] for o in manifest['outputs']] == [o.name for o in session.get_outputs()]
+    )
+
+
+def manifest_digest(manifest: dict) -> str:
+    """Short hash of a manifest's stored form (identifies it in session keys)"""
+    return hashlib.sha256(serialize_manifest(manifest).encode('utf-8')).hexdigest()[:16]
+
+
+def serialize_manifest(manifest: dict) -> str:
+    """Stable JSON text for storage (keys starting with "_" are runtime caches and are dropped)"""
+    stored = dict(manifest)
+    stored['preprocessor'] = {k: v for k, v in stored['preprocessor'].items() if not k.startswith('_')}
+    if stored.get('labels') is not None:
+        stored['labels'] = {str(k): v for k, v in stored['labels'].items()}
+    return json.dumps(stored, indent=2, sort_keys=True)
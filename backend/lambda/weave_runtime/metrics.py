@@ -0,0 +1,229 @@
+"""
+Structured logging and CloudWatch Embedded Metric Format (EMF) records
+One EMF JSON line per request; CloudWatch extracts the metrics from the log
+"""
+
+import json
+import logging
+import os
+import sys
+import time
+
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO').upper()
+METRICS_NAMESPACE = os.environ.get('METRICS_NAMESPACE', 'Weave/Inference')
+EMF_ENABLED = os.environ.get('EMF_METRICS', '1') != '0'
+
+# Dimension sets: per model ("<uid>/<model_name>"), and per model split by cache status
+DIMENSIONS = [['model'], ['model', 'cache']]
+
+
+def get_logger(name: str = 'weave') -> logging.Logger:
+    """
+    Logger for handler code, honoring LOG_LEVEL
+
+    The Lambda runtime installs its own root handler; locally we add a
+    plain stderr one so debug output is still visible.
+    """
+    if not logging.getLogger().handlers:
+        logging.basicConfig(format='%(levelname)s %(name)s: %(message)s')
+
+    logger = logging.getLogger(name)
+    logger.setLevel(getattr(logging, LOG_LEVEL, logging.INFO))
+    return logger
+
+
+def build_emf_record(model: str, cache: str, metrics: dict, units: dict = None,
+                     properties: dict = None) -> dict:
+    """
+    Build one EMF record
+
+    Args:
+        model: Model key dimension (e.g. "user123/sentiment-model.onnx")
+        cache: Cache status dimension ("warm", "cold" or "mock")
+        metrics: Metric name -> numeric value (None values are skipped)
+        units: Metric name -> CloudWatch unit (default Milliseconds)
+        properties: Extra searchable fields that are not metrics
+
+    Returns:
+        Dict ready to be written as a single JSON log line
+    """
+    units = units or {}
+    values = {name: value for name, value in metrics.items() if value is not None}
+
+    record = {
+        '_aws': {
+            'Timestamp': int(time.time() * 1000),
+            'CloudWatchMetrics': [{
+                'Namespace': METRICS_NAMESPACE,
+                'Dimensions': DIMENSIONS,
+                'Metrics': [
+                    {'Name': name, 'Unit': units.get(name, 'Milliseconds')}
+                    for name in values
+                ],
+            }],
+        },
+        'model': model,
+        'cache': cache,
+    }
+    if properties:
+        record.update(properties)
+    record.update(values)
+    return record
+
+
+def emit_request_metrics(model: str, cache: str, latency_ms: float, batch_size: int,
+                         stages_ms: dict = None, response_bytes: int = None,
+                         compression: dict = None, properties: dict = None,
+                         dumps=None) -> None:
+    """
+    Write the per-request EMF record to stdout
+
+    Args:
+        model: Model key, "<uid>/<model_name>"
+        cache: Cache status ("warm", "cold" or "mock")
+        latency_ms: End-to-end handler latency
+        batch_size: Number of inputs in the request
+        stages_ms: Stage timings from StageTimer.as_ms()
+        response_bytes: Size of the body as sent
+        compression: Stats from compress_body(), if the body was compressed
+        properties: Extra non-metric fields (uid, request id, ...)
+        dumps: JSON encoder to use (defaults to json.dumps)
+    """
+    if not EMF_ENABLED:
+        return
+
+    metrics = {'latency': latency_ms, 'batch_size': batch_size,
+               'response_bytes': response_bytes}
+    units = {'batch_size': 'Count', 'compression_ratio': 'None',
+             'response_bytes': 'Bytes'}
+
+    for stage, value in (stages_ms or {}).items():
+        if stage != 'total':
+            metrics[f'stage_{stage}'] = value
+
+    if compression:
+        metrics['compression_ratio'] = compression['ratio']
+        metrics['compression_time'] = compression['time_ms']
+        metrics['response_bytes'] = compression['compressed_bytes']
+
+    record = build_emf_record(model, cache, metrics, units, properties)
+
+    # Written straight to stdout: the runtime's log formatter would prefix the
+    # line and CloudWatch only parses EMF from lines that are pure JSON
+    sys.stdout.write((dumps or json.dumps)(record) + '\n')
+
+
+def emit_cold_start_timeline(timeline: dict, model: str, dumps=None) -> None:
+    """
+    Write the once-per-instance cold-start timeline as an EMF record
+
+    Args:
+        timeline: Record from ColdStartTracer.timeline()
+        model: Model key ("<uid>/<model_name>") served by the first invocation
+        dumps: JSON encoder to use (defaults to json.dumps)
+    """
+    if not EMF_ENABLED:
+        return
+
+    metrics = {
+        'init_total': timeline.get('init_total_ms'),
+        'before_import': timeline.get('before_import_ms'),
+        'first_invocation': timeline.get('first_invocation_ms', {}).get('total'),
+    }
+    properties = {'event': 'cold_start_timeline', 'timeline': timeline}
+
+    record = build_emf_record(model, 'cold', metrics, properties=properties)
+    sys.stdout.write((dumps or json.dumps)(record) + '\n')
+
+
+def emit_histogram_flush(flushed: dict, dumps=None) -> None:
+    """
+    Write a periodic latency histogram flush as one JSON log line
+
+    Carries percentile summaries for dashboards plus the serialized
+    histograms, which merge_histograms.py combines across instances.
+
+    Args:
+        flushed: Record from HistogramRegistry.flush()
+        dumps: JSON encoder to use (defaults to json.dumps)
+    """
+    record = {'event': 'latency_histograms', 'timestamp': int(time.time() * 1000)}
+    record.update(flushed)
+    sys.stdout.write((dumps or json.dumps)(record) + '\n')
+
+
+def emit_admission_metrics(flushed: dict, dumps=None) -> None:
+    """
+    Write per-tenant queue depth and wait time as EMF records, one per tenant
+
+    Args:
+        flushed: Record from AdmissionController.flush()
+        dumps: JSON encoder to use (defaults to json.dumps)
+    """
+    if not EMF_ENABLED:
+        return
+
+    dumps = dumps or json.dumps
+    for uid, tenant in flushed['tenants'].items():
+        wait = tenant['wait_ms']
+        metrics = {
+            'queue_depth': tenant['queue_depth'],
+            'max_queue_depth': tenant['max_queue_depth'],
+            'admitted': tenant['admitted'],
+            'rejected': tenant['rejected'],
+            'queue_wait_p50': wait.get('p50'),
+            'queue_wait_p99': wait.get('p99'),
+        }
+        values = {name: value for name, value in metrics.items() if value is not None}
+        record = {
+            '_aws': {
+                'Timestamp': int(time.time() * 1000),
+                'CloudWatchMetrics': [{
+                    'Namespace': METRICS_NAMESPACE,
+                    'Dimensions': [['tenant']],
+                    'Metrics': [
+                        {'Name': name, 'Unit': 'Milliseconds' if name.startswith('queue_wait') else 'Count'}
+                        for name in values
+                    ],
+                }],
+            },
+            'event': 'admission',
+            'tenant': uid,
+            'in_flight': tenant['in_flight'],
+        }
+        record.update(values)
+        sys.stdout.write(dumps(record) + '\n')
+
+
+def emit_prefetch_metrics(flushed: dict, dumps=None) -> None:
+    """
+    Write model prefetch counters and hit rate as one EMF record
+
+    Args:
+        flushed: Record from Prefetcher.flush()
+        dumps: JSON encoder to use (defaults to json.dumps)
+    """
+    if not EMF_ENABLED:
+        return
+
+    metrics = {name: flushed.get(name) for name in
+               ('scheduled', 'fetched', 'skipped', 'failed', 'hits', 'wasted', 'bytes', 'hit_rate')}
+    values = {name: value for name, value in metrics.items() if value is not None}
+    units = {'bytes': 'Bytes', 'hit_rate': 'None'}
+    record = {
+        '_aws': {
+            'Timestamp': int(time.time() * 1000),
+            'CloudWatchMetrics': [{
+                'Namespace': METRICS_NAMESPACE,
+                'Dimensions': [[]],
+                'Metrics': [
+                    {'Name': f'prefetch_{name}', 'Unit': units.get(name, 'Count')}
+                    for name in values
+                ],
+            }],
+        },
+        'event': 'prefetch',
+        'pending': flushed.get('pending'),
+    }
+    record.update({f'prefetch_{name}': value for name, value in values.items()})
+    sys.stdout.write((dumps or json.dumps)(record) + '\n')
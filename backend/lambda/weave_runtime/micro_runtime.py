@@ -0,0 +1,533 @@
+"""
+Pure-NumPy executor for small MLP graphs
+Runs MatMul/Gemm/elementwise/activation graphs without importing onnxruntime
+"""
+
+import os
+from collections import namedtuple
+
+import numpy as np
+
+# Larger models spend their time in BLAS either way; leave them to ONNX Runtime
+MICRO_RUNTIME_MAX_BYTES = int(os.environ.get('MICRO_RUNTIME_MAX_BYTES', str(16 * 1024 * 1024)))
+MICRO_RUNTIME_MAX_NODES = int(os.environ.get('MICRO_RUNTIME_MAX_NODES', '64'))
+
+# Rows at most this wide (class scores) are reduced column by column
+NARROW_WIDTH = 16
+
+# TensorProto.DataType -> ORT type string (only float tensors are executed)
+ONNX_TYPES = {1: 'tensor(float)', 6: 'tensor(int32)', 7: 'tensor(int64)', 11: 'tensor(double)'}
+FLOAT = 1
+
+SUPPORTED_OPS = {'MatMul', 'Gemm', 'Add', 'Sub', 'Mul', 'Div', 'Relu', 'Sigmoid', 'Tanh',
+                 'Softmax', 'Identity', 'Constant'}
+
+# Same attributes handler code reads from onnxruntime's NodeArg / ModelMetadata
+TensorInfo = namedtuple('TensorInfo', ['name', 'type', 'shape'])
+ModelMeta = namedtuple('ModelMeta', ['producer_name', 'graph_name', 'custom_metadata_map'])
+
+
+class UnsupportedModel(Exception):
+    """The graph uses something the micro-runtime doesn't run; use ONNX Runtime"""
+
+
+# ----------------------------------------------------------------------------
+# Protobuf wire format: just enough of onnx.proto for small dense graphs
+# ----------------------------------------------------------------------------
+
+def _varint(buf, pos: int) -> tuple:
+    result = shift = 0
+    while True:
+        byte = buf[pos]
+        pos += 1
+        result |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return result, pos
+        shift += 7
+
+
+def _signed(value: int) -> int:
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def _fields(buf):
+    """(field number, wire type, value) for each field of a message"""
+    pos, end = 0, len(buf)
+    while pos < end:
+        key, pos = _varint(buf, pos)
+        field, wire = key >> 3, key & 7
+        if wire == 0:
+            value, pos = _varint(buf, pos)
+        elif wire == 2:
+            length, pos = _varint(buf, pos)
+            value = buf[pos:pos + length]
+            pos += length
+        elif wire == 5:
+            value = buf[pos:pos + 4]
+            pos += 4
+        elif wire == 1:
+            value = buf[pos:pos + 8]
+            pos += 8
+        else:
+            raise UnsupportedModel(f"Unexpected protobuf wire type {wire}")
+        yield field, wire, value
+
+
+def _ints(wire: int, value) -> list:
+    """Repeated int64 field entry, packed or not"""
+    if wire == 0:
+        return [_signed(value)]
+    values, pos = [], 0
+    while pos < len(value):
+        item, pos = _varint(value, pos)
+        values.append(_signed(item))
+    return values
+
+
+def _text(value) -> str:
+    return bytes(value).decode('utf-8')
+
+
+def _parse_tensor(buf) -> np.ndarray:
+    dims, data_type, raw, floats = [], FLOAT, None, []
+    for field, wire, value in _fields(buf):
+        if field == 1:
+            dims.extend(_ints(wire, value))
+        elif field == 2:
+            data_type = value
+        elif field == 4:
+            floats.append(np.frombuffer(value, dtype='<f4'))
+        elif field == 9:
+            raw = value
+        elif field in (13, 14):
+            raise UnsupportedModel("Tensors with external data aren't supported")
+        elif field in (5, 7, 10):
+            raise UnsupportedModel("Only float initializers are supported")
+
+    if data_type != FLOAT:
+        raise UnsupportedModel(f"Only float initializers are supported (got type {data_type})")
+    data = np.frombuffer(raw, dtype='<f4') if raw is not None else np.concatenate(floats or [np.empty(0, '<f4')])
+    # Copy: aligned, writable, native-endian memory BLAS can use directly
+    return data.astype(np.float32).reshape(dims)
+
+
+def _parse_value_info(buf) -> TensorInfo:
+    name, elem_type, shape = '', 0, []
+    for field, _, value in _fields(buf):
+        if field == 1:
+            name = _text(value)
+        elif field == 2:
+            for type_field, _, tensor_type in _fields(value):
+                if type_field != 1:
+                    raise UnsupportedModel(f"Non-tensor graph input/output: {name}")
+                for tensor_field, _, tensor_value in _fields(tensor_type):
+                    if tensor_field == 1:
+                        elem_type = tensor_value
+                    elif tensor_field == 2:
+                        for _, _, dim in _fields(tensor_value):
+                            size = None
+                            for dim_field, _, dim_value in _fields(dim):
+                                size = _signed(dim_value) if dim_field == 1 else _text(dim_value)
+                            shape.append(size)
+    return TensorInfo(name, ONNX_TYPES.get(elem_type, f'tensor({elem_type})'), shape)
+
+
+def _parse_attribute(buf) -> tuple:
+    name, value = '', None
+    for field, wire, raw in _fields(buf):
+        if field == 1:
+            name = _text(raw)
+        elif field == 2:
+            value = float(np.frombuffer(raw, dtype='<f4')[0])
+        elif field == 3:
+            value = _signed(raw)
+        elif field == 4:
+            value = _text(raw)
+        elif field == 5:
+            value = _parse_tensor(raw)
+        elif field == 8:
+            value = (value or []) + _ints(wire, raw)
+    return name, value
+
+
+def _parse_node(buf) -> dict:
+    node = {'inputs': [], 'outputs': [], 'op_type': '', 'domain': '', 'attributes': {}, 'raw_attributes': []}
+    for field, _, value in _fields(buf):
+        if field == 1:
+            node['inputs'].append(_text(value))
+        elif field == 2:
+            node['outputs'].append(_text(value))
+        elif field == 4:
+            node['op_type'] = _text(value)
+        elif field == 5:
+            node['raw_attributes'].append(value)
+        elif field == 7:
+            node['domain'] = _text(value)
+    return node
+
+
+def parse_model(model_bytes: bytes) -> dict:
+    """
+    The parts of an ONNX ModelProto the micro-runtime needs
+
+    Nodes are checked against SUPPORTED_OPS before any weights are copied,
+    so unsupported models are turned away cheaply.
+
+    Raises:
+        UnsupportedModel: unsupported ops, domains, dtypes or sizes
+    """
+    buf = memoryview(model_bytes)
+    graph, metadata, producer, opset = None, {}, '', None
+    try:
+        for field, _, value in _fields(buf):
+            if field == 2:
+                producer = _text(value)
+            elif field == 7:
+                graph = value
+            elif field == 8:
+                domain, version = '', None
+                for opset_field, _, opset_value in _fields(value):
+                    if opset_field == 1:
+                        domain = _text(opset_value)
+                    elif opset_field == 2:
+                        version = opset_value
+                if domain in ('', 'ai.onnx'):
+                    opset = version
+            elif field == 14:
+                entry = dict((f, _text(v)) for f, _, v in _fields(value))
+                metadata[entry.get(1, '')] = entry.get(2, '')
+        if graph is None:
+            raise UnsupportedModel("Model has no graph")
+
+        graph_name, nodes, initializers, inputs, outputs = '', [], [], [], []
+        for field, _, value in _fields(graph):
+            if field == 1:
+                node = _parse_node(value)
+                if node['domain'] not in ('', 'ai.onnx') or node['op_type'] not in SUPPORTED_OPS:
+                    raise UnsupportedModel(f"Unsupported op: {node['domain'] or 'ai.onnx'}.{node['op_type']}")
+                nodes.append(node)
+                if len(nodes) > MICRO_RUNTIME_MAX_NODES:
+                    raise UnsupportedModel(f"More than {MICRO_RUNTIME_MAX_NODES} nodes")
+            elif field == 2:
+                graph_name = _text(value)
+            elif field == 5:
+                initializers.append(value)
+            elif field == 11:
+                inputs.append(value)
+            elif field == 12:
+                outputs.append(value)
+            elif field == 15:
+                raise UnsupportedModel("Sparse initializers aren't supported")
+
+        if sum(len(i) for i in initializers) > MICRO_RUNTIME_MAX_BYTES:
+            raise UnsupportedModel(f"Weights larger than {MICRO_RUNTIME_MAX_BYTES} bytes")
+
+        constants = {}
+        for raw in initializers:
+            name = next((_text(v) for f, _, v in _fields(raw) if f == 8), '')
+            constants[name] = _parse_tensor(raw)
+        for node in nodes:
+            node['attributes'] = dict(_parse_attribute(raw) for raw in node.pop('raw_attributes'))
+        # Older exporters also list initializers as graph inputs
+        inputs = [info for info in map(_parse_value_info, inputs) if info.name not in constants]
+        outputs = [_parse_value_info(raw) for raw in outputs]
+    except (IndexError, ValueError) as e:
+        # Truncated or malformed protobuf (UnicodeDecodeError is a ValueError)
+        raise UnsupportedModel(f"Unreadable model: {e}")
+
+    return {
+        'opset': opset,
+        'producer': producer,
+        'graph_name': graph_name,
+        'metadata': metadata,
+        'nodes': nodes,
+        'constants': constants,
+        'inputs': inputs,
+        'outputs': outputs,
+    }
+
+
+def external_data_locations(model_bytes: bytes) -> list:
+    """
+    Files a model's tensors are stored in (ONNX external data), in first-use order
+
+    Covers initializers, sparse initializers and tensor attributes in the
+    main graph and its subgraphs. Locations are as written in the model:
+    paths relative to the model file.
+
+    Raises:
+        UnsupportedModel: unreadable protobuf
+    """
+    locations = {}
+
+    def tensor(buf):
+        external, location = False, None
+        for field, _, value in _fields(buf):
+            if field == 14:
+                external = value == 1
+            elif field == 13:
+                entry = dict((f, _text(v)) for f, _, v in _fields(value))
+                if entry.get(1) == 'location':
+                    location = entry.get(2)
+        if external and location:
+            locations.setdefault(location, None)
+
+    def attribute(buf):
+        for field, _, value in _fields(buf):
+            if field in (5, 10):
+                tensor(value)
+            elif field in (6, 11):
+                graph(value)
+
+    def graph(buf):
+        for field, _, value in _fields(buf):
+            if field == 1:
+                for node_field, _, node_value in _fields(value):
+                    if node_field == 5:
+                        attribute(node_value)
+            elif field == 5:
+                tensor(value)
+            elif field == 15:
+                for sparse_field, _, sparse_value in _fields(value):
+                    if sparse_field in (1, 2):
+                        tensor(sparse_value)
+
+    try:
+        for field, _, value in _fields(memoryview(model_bytes)):
+            if field == 7:
+                graph(value)
+    except (IndexError, ValueError) as e:
+        raise UnsupportedModel(f"Unreadable model: {e}")
+    return list(locations)
+
+
+# ----------------------------------------------------------------------------
+# Kernels
+# ----------------------------------------------------------------------------
+
+def _linear(weights: np.ndarray, bias: np.ndarray = None):
+    """x @ W (+ b), the bias added in place into the fresh product"""
+    if bias is None:
+        return lambda x: np.matmul(x, weights)
+
+    def linear(x):
+        out = np.matmul(x, weights)
+        out += bias
+        return out
+    return linear
+
+
+def _elementwise(ufunc, constant: np.ndarray, in_place: bool):
+    """Elementwise op against a constant broadcast along the batch"""
+    if in_place:
+        return lambda x: ufunc(x, constant, out=x)
+    return lambda x: ufunc(x, constant)
+
+
+def _relu(in_place: bool, width: int):
+    return lambda x: np.maximum(x, 0, out=x if in_place else None)
+
+
+def _tanh(in_place: bool, width: int):
+    return lambda x: np.tanh(x, out=x if in_place else None)
+
+
+def _sigmoid(in_place: bool, width: int):
+    def sigmoid(x):
+        y = np.negative(x, out=x if in_place else None)
+        np.exp(y, out=y)
+        y += 1
+        return np.reciprocal(y, out=y)
+    return sigmoid
+
+
+def _row_reduce(ufunc, width: int):
+    """(batch, 1) row reduction; narrow rows go column by column, which NumPy vectorizes far better"""
+    if not 2 <= width <= NARROW_WIDTH:
+        return lambda y: ufunc.reduce(y, axis=1, keepdims=True)
+
+    def reduce(y):
+        out = ufunc(y[:, 0:1], y[:, 1:2])
+        for i in range(2, width):
+            ufunc(out, y[:, i:i + 1], out=out)
+        return out
+    return reduce
+
+
+def _softmax(in_place: bool, width: int):
+    row_max = _row_reduce(np.maximum, width)
+    row_sum = _row_reduce(np.add, width)
+
+    def softmax(x):
+        y = np.subtract(x, row_max(x), out=x if in_place else None)
+        np.exp(y, out=y)
+        y /= row_sum(y)
+        return y
+    return softmax
+
+
+ELEMENTWISE = {'Add': np.add, 'Sub': np.subtract, 'Mul': np.multiply, 'Div': np.divide}
+UNARY = {'Relu': _relu, 'Sigmoid': _sigmoid, 'Tanh': _tanh, 'Softmax': _softmax}
+
+
+class NumpySession:
+    """
+    Drop-in for onnxruntime.InferenceSession on small dense graphs
+
+    Accepts graphs of MatMul / Gemm / Add / Sub / Mul / Div / Relu / Sigmoid /
+    Tanh / Softmax / Identity over one float input of shape (batch, features),
+    with float initializers. The graph is checked statically at load: every
+    value is a (batch, width) matrix, weights line up with the widths they
+    multiply, and constants broadcast along the batch. Anything else raises
+    UnsupportedModel.
+
+    Weights are copied into aligned float32 arrays once and bound into the
+    kernels; a MatMul followed by its bias Add runs as one step, and
+    elementwise ops and activations write in place into intermediates
+    nothing else reads.
+
+    Exposes get_inputs(), get_outputs(), get_modelmeta() and run() like an
+    InferenceSession, so manifests, preprocessors and postprocessing work on
+    either.
+    """
+
+    def __init__(self, model_bytes: bytes):
+        model = parse_model(model_bytes)
+        self._inputs = model['inputs']
+        self._outputs = model['outputs']
+        self._output_names = [o.name for o in self._outputs]
+        self._meta = ModelMeta(model['producer'], model['graph_name'], model['metadata'])
+
+        if len(self._inputs) != 1 or self._inputs[0].type != 'tensor(float)':
+            raise UnsupportedModel("Needs exactly one float input")
+        shape = self._inputs[0].shape
+        if len(shape) != 2 or not isinstance(shape[1], int):
+            raise UnsupportedModel(f"Needs a (batch, features) input, got {shape}")
+
+        self.input_name = self._inputs[0].name
+        self.plan = self._compile(model['nodes'], model['constants'], model['opset'], shape[1])
+
+    def _compile(self, nodes: list, constants: dict, opset: int, input_width: int) -> list:
+        """(kernel, input, second input or None, output) steps, shapes checked along the way"""
+        widths = {self.input_name: input_width}
+        output_names = set(self._output_names)
+
+        uses = {}
+        for node in nodes:
+            for name in node['inputs']:
+                uses[name] = uses.get(name, 0) + 1
+
+        def width_of(name):
+            if name not in widths:
+                raise UnsupportedModel(f"'{name}' is not a (batch, width) value")
+            return widths[name]
+
+        def broadcast_constant(name, width):
+            value = constants.get(name)
+            if value is None or value.ndim > 2 or value.size not in (1, width) or \
+                    (value.ndim == 2 and value.shape[0] != 1):
+                return None
+            return value
+
+        def scratch(name):
+            # Intermediates read by one node only can be overwritten by it
+            return name in widths and name != self.input_name and \
+                uses.get(name) == 1 and name not in output_names
+
+        plan = []
+        linear_steps = {}
+        for node in nodes:
+            op, inputs, attributes = node['op_type'], node['inputs'], node['attributes']
+            if len(node['outputs']) != 1:
+                raise UnsupportedModel(f"{op} with {len(node['outputs'])} outputs")
+            output = node['outputs'][0]
+
+            if op == 'Constant':
+                value = attributes.get('value')
+                if not isinstance(value, np.ndarray):
+                    raise UnsupportedModel("Constant without a float tensor value")
+                constants[output] = value
+                continue
+
+            if op in ('MatMul', 'Gemm'):
+                weights = constants.get(inputs[1])
+                if weights is None or weights.ndim != 2 or attributes.get('transA', 0):
+                    raise UnsupportedModel(f"{op} needs a 2-D weight initializer")
+                if attributes.get('transB', 0):
+                    weights = weights.T
+                if weights.shape[0] != width_of(inputs[0]):
+                    raise UnsupportedModel(f"{op} weight {weights.shape} doesn't match width {width_of(inputs[0])}")
+                width = weights.shape[1]
+
+                bias = None
+                if op == 'Gemm':
+                    weights = weights * np.float32(attributes.get('alpha', 1.0))
+                    if len(inputs) > 2 and inputs[2]:
+                        bias = broadcast_constant(inputs[2], width)
+                        if bias is None:
+                            raise UnsupportedModel("Gemm bias must broadcast along the batch")
+                        bias = bias * np.float32(attributes.get('beta', 1.0))
+
+                weights = np.ascontiguousarray(weights)
+                linear_steps[output] = (len(plan), weights, bias)
+                plan.append((_linear(weights, bias), inputs[0], None, output))
+                widths[output] = width
+
+            elif op in ELEMENTWISE:
+                a, b = inputs
+                if a in constants and op in ('Add', 'Mul'):
+                    a, b = b, a
+                width = width_of(a)
+
+                if b in constants:
+                    constant = broadcast_constant(b, width)
+                    if constant is None:
+                        raise UnsupportedModel(f"{op} constant must broadcast along the batch")
+                    linear = linear_steps.get(a)
+                    if op == 'Add' and linear is not None and linear[2] is None and scratch(a):
+                        # MatMul + bias: fold into the MatMul step
+                        index, weights, _ = linear
+                        source = plan[index][1]
+                        plan[index] = (_linear(weights, constant), source, None, output)
+                        linear_steps[output] = (index, weights, constant)
+                    else:
+                        plan.append((_elementwise(ELEMENTWISE[op], constant, scratch(a)), a, None, output))
+                else:
+                    if width_of(b) != width:
+                        raise UnsupportedModel(f"{op} of values with widths {width} and {width_of(b)}")
+                    ufunc, in_place = ELEMENTWISE[op], scratch(a)
+                    kernel = (lambda x, y, ufunc=ufunc: ufunc(x, y, out=x)) if in_place else ufunc
+                    plan.append((kernel, a, b, output))
+                widths[output] = width
+
+            elif op in UNARY:
+                if op == 'Softmax':
+                    default_axis = -1 if (opset or 13) >= 13 else 1
+                    if attributes.get('axis', default_axis) not in (1, -1):
+                        raise UnsupportedModel("Softmax over the batch axis")
+                width = widths[output] = width_of(inputs[0])
+                plan.append((UNARY[op](scratch(inputs[0]), width), inputs[0], None, output))
+
+            elif op == 'Identity':
+                plan.append((np.array, inputs[0], None, output))
+                widths[output] = width_of(inputs[0])
+
+        for name in output_names:
+            width_of(name)
+        return plan
+
+    def get_inputs(self) -> list:
+        return list(self._inputs)
+
+    def get_outputs(self) -> list:
+        return list(self._outputs)
+
+    def get_modelmeta(self) -> ModelMeta:
+        return self._meta
+
+    def run(self, output_names, feeds: dict) -> list:
+        """Same contract as InferenceSession.run (output_names None means all)"""
+        values = {self.input_name: np.asarray(feeds[self.input_name], dtype=np.float32)}
+        for kernel, a, b, output in self.plan:
+            values[output] = kernel(values[a]) if b is None else kernel(values[a], values[b])
+        return [values[name] for name in (output_names or self._output_names)]
@@ -0,0 +1,173 @@
+"""
+Content-addressed model identity and on-disk model cache
+Identical models uploaded by different uids share one download and one session
+"""
+
+import base64
+import binascii
+import hashlib
+import os
+import re
+import tempfile
+from collections import namedtuple
+
+MODEL_CACHE_DIR = os.environ.get('MODEL_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'weave-models'))
+MODEL_CACHE_MAX_BYTES = int(os.environ.get('MODEL_CACHE_MAX_BYTES', str(256 * 1024 * 1024)))
+
+_EXTERNAL_DATA_DIGEST = re.compile(r'#x[0-9a-f]{16}$')
+
+# What a uid's model object currently is: content key (cache identity, with
+# the stored manifest's digest), version (ETag, or mtime under LOCAL_MODEL_DIR),
+# size in bytes (or None) and the stored manifest read with it (or None)
+ModelObject = namedtuple('ModelObject', 'content_key version size manifest', defaults=(None,))
+
+
+def content_key_from_head(head: dict) -> str:
+    """
+    Content identity of an S3 object from its HEAD response (ChecksumMode=ENABLED)
+
+    The key is shared across uids, so only the full-object SHA-256 checksum
+    S3 verified at upload is used. A plain ETag is an MD5, which can be made
+    to collide, so objects without that checksum stay scoped to their uid.
+    User-defined metadata is never trusted.
+
+    Returns:
+        "sha256:<hex>", or None when the content can't be identified
+    """
+    checksum = head.get('ChecksumSHA256') or ''
+    if checksum and '-' not in checksum and head.get('ChecksumType', 'FULL_OBJECT') == 'FULL_OBJECT':
+        try:
+            digest = base64.b64decode(checksum, validate=True)
+        except (binascii.Error, ValueError):
+            digest = b''
+        if len(digest) == 32:
+            return f"sha256:{digest.hex()}"
+    return None
+
+
+def with_manifest(content_key: str, manifest_digest: str) -> str:
+    """
+    Key of a model served with a stored manifest: "<content key>#<manifest digest>"
+
+    A stored manifest changes how the model is served (labels, task,
+    preprocessing, runtime hints), so uids share a session only when both
+    match. Disk cache entries stay keyed by the bytes alone.
+    """
+    return f"{content_key}#{manifest_digest}" if manifest_digest else content_key
+
+
+def with_external_data(content_key: str, weights_digest: str) -> str:
+    """
+    Key of a model whose weights are external data: "<content key>#x<weights digest>"
+
+    The .onnx object only references its weight files, so uids share a
+    session only when the files are the same too, and a re-uploaded weight
+    file changes the key. A weights digest already on the key is replaced
+    (removed when weights_digest is None).
+    """
+    content_key = _EXTERNAL_DATA_DIGEST.sub('', content_key)
+    return f"{content_key}#x{weights_digest}" if weights_digest else content_key
+
+
+def external_data_digest(weights: dict) -> str:
+    """Digest of a model's weight files from {location: identity}, first 16 hex chars"""
+    text = '\n'.join(f"{location}={identity}" for location, identity in sorted(weights.items()))
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()[:16]
+
+
+def bytes_key(content_key: str) -> str:
+    """The part of a key that identifies the model bytes (without manifest or weights digests)"""
+    return content_key.partition('#')[0]
+
+
+def content_key_for_bytes(model_bytes: bytes) -> str:
+    return f"sha256:{hashlib.sha256(model_bytes).hexdigest()}"
+
+
+def verify_content(content_key: str, model_bytes: bytes) -> bool:
+    """Do the bytes match their content key?"""
+    algorithm, _, expected = bytes_key(content_key).partition(':')
+    if algorithm != 'sha256':
+        return False
+    return hashlib.sha256(model_bytes).hexdigest() == expected
+
+
+class DiskModelCache:
+    """
+    Model bytes on local disk, keyed by content
+
+    Files are written atomically and evicted least-recently-used first once
+    the directory passes max_bytes. Entries are shared by every uid whose
+    object has the same content; callers resolve (and authorize) the uid's
+    own object before asking for its content key here.
+    """
+
+    def __init__(self, directory: str = MODEL_CACHE_DIR, max_bytes: int = MODEL_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    def path(self, content_key: str) -> str:
+        return os.path.join(self.directory, bytes_key(content_key).replace(':', '-') + '.onnx')
+
+    def get(self, content_key: str) -> bytes:
+        """Cached bytes for a content key, or None"""
+        path = self.path(content_key)
+        try:
+            with open(path, 'rb') as f:
+                model_bytes = f.read()
+            os.utime(path)
+        except OSError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return model_bytes
+
+    def contains(self, content_key: str) -> bool:
+        """Is the key cached? (doesn't count as a hit or refresh the entry)"""
+        return os.path.isfile(self.path(content_key))
+
+    def put(self, content_key: str, model_bytes: bytes) -> bool:
+        """
+        Store bytes (best effort: a full or read-only disk only costs the cache)
+
+        Returns:
+            Whether the entry was written
+        """
+        if len(model_bytes) > self.max_bytes:
+            return False
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            self.evict(self.max_bytes - len(model_bytes))
+            fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix='.part')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(model_bytes)
+            os.replace(temp_path, self.path(content_key))
+        except OSError:
+            return False
+        return True
+
+    def evict(self, budget: int) -> None:
+        """Remove least recently used entries until the cache fits in budget bytes"""
+        entries = []
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= budget:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+
+    def stats(self) -> dict:
+        return {'hits': self.hits, 'misses': self.misses}
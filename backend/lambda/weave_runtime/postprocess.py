@@ -0,0 +1,197 @@
+"""
+Batch-aware postprocessing for ONNX model outputs
+Argmax, softmax and top-k run over the whole batch in NumPy
+"""
+
+import json
+
+import numpy as np
+
+from weave_runtime.codec import round_floats
+
+# Fallback labels for two-class models without label metadata
+DEFAULT_LABELS = {0: 'negative', 1: 'positive'}
+
+# Outputs at most this wide are treated as class scores when no labels are set
+MAX_IMPLICIT_CLASSES = 10
+
+
+def load_label_map(session) -> dict:
+    """
+    Read the class label map from ONNX model metadata
+
+    The model's metadata_props may carry a "labels" entry holding either a
+    JSON list (index -> label) or a JSON object ({"0": "negative", ...}).
+
+    Returns:
+        Dict of class index -> label, or None when the model has no labels
+    """
+    try:
+        raw = session.get_modelmeta().custom_metadata_map.get('labels')
+    except Exception:
+        return None
+
+    if not raw:
+        return None
+
+    try:
+        labels = json.loads(raw)
+    except ValueError:
+        # Plain comma-separated list
+        labels = [label.strip() for label in raw.split(',')]
+
+    if isinstance(labels, list):
+        return {i: str(label) for i, label in enumerate(labels)}
+    if isinstance(labels, dict):
+        return {int(k): str(v) for k, v in labels.items()}
+    return None
+
+
+def to_probabilities(scores: np.ndarray) -> np.ndarray:
+    """
+    Row-wise probabilities for a (batch, classes) score matrix
+
+    Outputs that are already a distribution (non-negative rows summing to 1
+    within 1e-3) pass through untouched; anything else is treated as logits.
+    The check is two reductions rather than np.all + np.allclose, which
+    cost more than the softmax itself on small batches.
+    """
+    if scores.size == 0:
+        return scores
+    if scores.min() >= 0 and np.abs(scores.sum(axis=1) - 1.0).max() <= 1e-3:
+        return scores
+
+    shifted = scores - scores.max(axis=1, keepdims=True)
+    exp = np.exp(shifted)
+    exp /= exp.sum(axis=1, keepdims=True)
+    return exp
+
+
+def label_for(labels: dict, class_index: int) -> str:
+    """Label for a class index, falling back to class_<n>"""
+    return labels.get(class_index, f'class_{class_index}')
+
+
+def top_k_classes(probs: np.ndarray, k: int) -> tuple:
+    """
+    Top-k class indices and scores per row, highest first
+
+    Uses argpartition so only the k winners get sorted.
+    """
+    k = min(k, probs.shape[1])
+    if k < probs.shape[1]:
+        part = np.argpartition(probs, -k, axis=1)[:, -k:]
+    else:
+        part = np.broadcast_to(np.arange(probs.shape[1]), probs.shape)
+    part_scores = np.take_along_axis(probs, part, axis=1)
+    order = np.argsort(-part_scores, axis=1, kind="stable")
+    classes = np.take_along_axis(part, order, axis=1)
+    scores = np.take_along_axis(part_scores, order, axis=1)
+    return classes, scores
+
+
+def postprocess_batch(output: np.ndarray, labels: dict = None, top_k: int = None,
+                      max_values: int = None, precision: int = None, task: str = None) -> dict:
+    """
+    Postprocess a whole batch of model output at once
+
+    Numeric fields are left as NumPy arrays for the response codec to
+    serialize directly; they may alias the model's output buffers, so encode
+    the result before running the next request.
+
+    Args:
+        output: Raw model output, first axis is the batch
+        labels: Class index -> label map (from model metadata)
+        top_k: Only return the k best classes per row
+        max_values: Truncate generic outputs to this many values per row
+        precision: Round floats to this many decimals (None keeps full precision)
+        task: 'sentiment', 'classifier' or 'generic' from the model manifest;
+            None guesses from the output shape
+
+    Returns:
+        Column-oriented result: each field holds one entry per batch row
+    """
+    output = np.asarray(output)
+    batch_size = output.shape[0] if output.ndim else 1
+
+    if task is None:
+        is_classifier = output.ndim == 2 and (
+            labels is not None or top_k is not None or output.shape[1] <= MAX_IMPLICIT_CLASSES
+        )
+    else:
+        is_classifier = output.ndim == 2 and task != 'generic'
+
+    if is_classifier:
+        if labels is None and output.shape[1] == 2 and task in (None, 'sentiment'):
+            labels = DEFAULT_LABELS
+        labels = labels or {}
+
+        probs = to_probabilities(output)
+        predicted = np.argmax(probs, axis=1)
+        confidence = probs[np.arange(batch_size), predicted]
+        predicted_labels = [label_for(labels, c) for c in predicted.tolist()]
+
+        result = {
+            "predicted_class": predicted,
+            "label": predicted_labels,
+            "confidence": round_floats(confidence, precision),
+        }
+        if task in (None, 'sentiment'):
+            result["sentiment"] = predicted_labels
+
+        if top_k is not None:
+            classes, scores = top_k_classes(probs, top_k)
+            result["top_k"] = {
+                "classes": classes,
+                "labels": [[label_for(labels, c) for c in row] for row in classes.tolist()],
+                "scores": round_floats(scores, precision),
+            }
+        else:
+            result["probabilities"] = round_floats(probs, precision)
+    elif output.ndim == 0:
+        result = {"prediction": [round_floats(output, precision).item()]}
+    else:
+        flat = output.reshape(batch_size, -1)
+        if max_values is not None and flat.shape[1] > max_values:
+            # Slice first so wide rows are never fully converted
+            result = {
+                "prediction": round_floats(np.ascontiguousarray(flat[:, :max_values]), precision),
+                "truncated": True,
+            }
+        else:
+            result = {"prediction": round_floats(output, precision)}
+
+    result["shape"] = list(output.shape)
+    return result
+
+
+def first_row(batch_result: dict) -> dict:
+    """Collapse a one-row column-oriented result back to scalar fields"""
+    result = {}
+    for key, value in batch_result.items():
+        if key in ("shape", "truncated"):
+            result[key] = value
+        elif key == "top_k":
+            result[key] = {k: v[0] for k, v in value.items()}
+        else:
+            result[key] = value[0]
+    return result
+
+
+def postprocess_output(output: np.ndarray, labels: dict = None, top_k: int = None,
+                       max_values: int = None, precision: int = None, task: str = None) -> dict:
+    """
+    Postprocess ONNX model output for a single input
+
+    Args:
+        output: Raw model output
+        labels: Class index -> label map (from model metadata)
+        top_k: Only return the k best classes
+        max_values: Truncate generic outputs to this many values
+        precision: Round floats to this many decimals
+        task: Model task from the manifest (None guesses)
+
+    Returns:
+        Formatted result dictionary
+    """
+    return first_row(postprocess_batch(output, labels, top_k, max_values, precision, task))
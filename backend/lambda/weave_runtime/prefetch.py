@@ -0,0 +1,212 @@
+"""
+Per-uid co-access learning and background prefetch of likely-next models
+A tenant that calls model A and then model B gets B fetched while it is idle
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+
+PREFETCH_ENABLED = os.environ.get('PREFETCH_MODELS', '1') != '0'
+# A model is prefetched once it followed the current one this often, and in this share of cases
+PREFETCH_MIN_COUNT = int(os.environ.get('PREFETCH_MIN_COUNT', '2'))
+PREFETCH_MIN_PROBABILITY = float(os.environ.get('PREFETCH_MIN_PROBABILITY', '0.3'))
+PREFETCH_MAX_CANDIDATES = int(os.environ.get('PREFETCH_MAX_CANDIDATES', '2'))
+# Quiet time after the last request before a prefetch starts
+PREFETCH_IDLE_MS = float(os.environ.get('PREFETCH_IDLE_MS', '50'))
+# Average download rate for prefetches, and the largest model worth prefetching
+PREFETCH_BYTES_PER_SECOND = int(os.environ.get('PREFETCH_BYTES_PER_SECOND', str(32 * 1024 * 1024)))
+PREFETCH_MAX_MODEL_BYTES = int(os.environ.get('PREFETCH_MAX_MODEL_BYTES', str(64 * 1024 * 1024)))
+# Prefetched models not requested within this many seconds count as wasted
+PREFETCH_TTL_SECONDS = float(os.environ.get('PREFETCH_TTL_SECONDS', '600'))
+
+MAX_TRACKED_UIDS = 1024
+MAX_TRACKED_MODELS = 32
+MAX_QUEUED = 8
+
+
+class CoAccessTracker:
+    """
+    First-order transition counts between one uid's consecutive models
+
+    Per uid, counts how often each model followed each other model.
+    Bounded: the least recently active uids are forgotten first, and a uid
+    keeps transitions out of at most MAX_TRACKED_MODELS models.
+    """
+
+    def __init__(self, min_count: int = PREFETCH_MIN_COUNT,
+                 min_probability: float = PREFETCH_MIN_PROBABILITY,
+                 max_uids: int = MAX_TRACKED_UIDS):
+        self.min_count = min_count
+        self.min_probability = min_probability
+        self.max_uids = max_uids
+        # uid -> (last model, {model: {next model: count}})
+        self.uids = OrderedDict()
+
+    def observe(self, uid: str, model_name: str) -> None:
+        """Record that uid just used model_name"""
+        state = self.uids.get(uid)
+        if state is None:
+            state = self.uids[uid] = [None, OrderedDict()]
+            if len(self.uids) > self.max_uids:
+                self.uids.popitem(last=False)
+        else:
+            self.uids.move_to_end(uid)
+
+        last, transitions = state
+        if last is not None and last != model_name:
+            counts = transitions.get(last)
+            if counts is None:
+                counts = transitions[last] = {}
+                if len(transitions) > MAX_TRACKED_MODELS:
+                    transitions.popitem(last=False)
+            else:
+                transitions.move_to_end(last)
+            counts[model_name] = counts.get(model_name, 0) + 1
+        state[0] = model_name
+
+    def predict(self, uid: str, model_name: str, limit: int = PREFETCH_MAX_CANDIDATES) -> list:
+        """Models likely to follow model_name for uid, most likely first"""
+        state = self.uids.get(uid)
+        counts = state[1].get(model_name) if state is not None else None
+        if not counts:
+            return []
+        total = sum(counts.values())
+        likely = [(count, name) for name, count in counts.items()
+                  if count >= self.min_count and count / total >= self.min_probability]
+        return [name for _, name in sorted(likely, reverse=True)[:limit]]
+
+
+class Prefetcher:
+    """
+    Background thread fetching the models a uid is likely to call next
+
+    The handler calls observe() once per served request. Predicted models
+    are queued and fetched by fetch(uid, model_name, max_bytes), which
+    returns (level, bytes_downloaded) with level "memory", "disk" or None
+    (nothing done: already cached, too large, or unavailable).
+
+    Prefetches never compete with requests: the worker waits for idle_ms of
+    quiet after the last request before each one, and the token bucket
+    keeps the average download rate under bytes_per_second. On Lambda the
+    environment is frozen between invocations, so prefetches only make
+    progress in the gaps a warm instance is actually running.
+    """
+
+    def __init__(self, fetch, tracker: CoAccessTracker = None,
+                 idle_ms: float = PREFETCH_IDLE_MS,
+                 bytes_per_second: int = PREFETCH_BYTES_PER_SECOND,
+                 max_model_bytes: int = PREFETCH_MAX_MODEL_BYTES,
+                 ttl_seconds: float = PREFETCH_TTL_SECONDS):
+        self.fetch = fetch
+        self.tracker = tracker or CoAccessTracker()
+        self.idle_s = idle_ms / 1000
+        self.bytes_per_second = bytes_per_second
+        self.max_model_bytes = max_model_bytes
+        self.ttl_seconds = ttl_seconds
+
+        self.lock = threading.Lock()
+        self.wakeup = threading.Condition(self.lock)
+        self.queue = deque()
+        self.thread = None
+        self.active = None
+        self.last_request = time.monotonic()
+        self.available_at = 0.0
+        # (uid, model_name) -> (level, fetched at) for prefetches not yet requested
+        self.prefetched = {}
+        self.counters = dict.fromkeys(
+            ('scheduled', 'fetched', 'skipped', 'failed', 'hits', 'wasted', 'bytes'), 0
+        )
+
+    def observe(self, uid: str, model_name: str, cold: bool = False) -> None:
+        """
+        Record a served request and queue prefetches of the likely next models
+
+        Args:
+            cold: The request had to load its model; a prefetch into memory
+                  that ends in a cold load was wasted
+        """
+        key = (uid, model_name)
+        with self.lock:
+            self.last_request = time.monotonic()
+            entry = self.prefetched.pop(key, None)
+            if entry is not None:
+                self.counters['wasted' if entry[0] == 'memory' and cold else 'hits'] += 1
+
+            self.tracker.observe(uid, model_name)
+            queued = False
+            for candidate in self.tracker.predict(uid, model_name):
+                job = (uid, candidate)
+                if job in self.prefetched or job in self.queue or job == self.active:
+                    continue
+                if len(self.queue) >= MAX_QUEUED:
+                    self.queue.popleft()
+                self.queue.append(job)
+                self.counters['scheduled'] += 1
+                queued = True
+
+            if queued:
+                if self.thread is None:
+                    self.thread = threading.Thread(target=self.run, name='weave-prefetch', daemon=True)
+                    self.thread.start()
+                self.wakeup.notify()
+
+    def run(self) -> None:
+        while True:
+            with self.lock:
+                while not self.queue:
+                    self.wakeup.wait()
+                # Start only after a quiet period and once the byte budget allows it
+                while True:
+                    now = time.monotonic()
+                    delay = max(self.last_request + self.idle_s, self.available_at) - now
+                    if delay <= 0:
+                        break
+                    self.wakeup.wait(delay)
+                if not self.queue:
+                    continue
+                uid, model_name = job = self.active = self.queue.popleft()
+
+            try:
+                level, nbytes = self.fetch(uid, model_name, self.max_model_bytes)
+            except Exception:
+                level, nbytes = 'failed', 0
+
+            with self.lock:
+                self.active = None
+                if level is None or level == 'failed':
+                    self.counters['skipped' if level is None else 'failed'] += 1
+                else:
+                    self.counters['fetched'] += 1
+                    self.prefetched[job] = (level, time.monotonic())
+                self.counters['bytes'] += nbytes
+                if nbytes and self.bytes_per_second > 0:
+                    self.available_at = max(self.available_at, time.monotonic()) + nbytes / self.bytes_per_second
+
+    def stats(self) -> dict:
+        """Counters so far; hit_rate is the share of resolved prefetches that were used"""
+        with self.lock:
+            self._expire()
+            stats = dict(self.counters)
+            stats['pending'] = len(self.prefetched)
+            stats['queued'] = len(self.queue)
+        resolved = stats['hits'] + stats['wasted']
+        stats['hit_rate'] = round(stats['hits'] / resolved, 4) if resolved else None
+        return stats
+
+    def flush(self) -> dict:
+        """stats(), then reset the counters (pending prefetches carry over)"""
+        record = self.stats()
+        with self.lock:
+            for name in self.counters:
+                self.counters[name] = 0
+        return record
+
+    def _expire(self) -> None:
+        """Count prefetches older than ttl_seconds as wasted (lock held)"""
+        cutoff = time.monotonic() - self.ttl_seconds
+        for key, (_, fetched_at) in list(self.prefetched.items()):
+            if fetched_at < cutoff:
+                del self.prefetched[key]
+                self.counters['wasted'] += 1
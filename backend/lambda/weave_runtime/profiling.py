@@ -0,0 +1,167 @@
+"""
+On-demand ONNX Runtime operator profiling
+Builds a throwaway profiling-enabled session and summarizes time per op type
+"""
+
+import hashlib
+import hmac
+import json
+import os
+import time
+
+# ORT_PROFILING=1 profiles every request; ORT_PROFILE_MODELS limits it to some models
+PROFILE_ALL = os.environ.get('ORT_PROFILING', '0') == '1'
+PROFILE_MODELS = {m.strip() for m in os.environ.get('ORT_PROFILE_MODELS', '').split(',') if m.strip()}
+
+# Secret for per-request "profile" flags; unset means request flags are ignored
+PROFILE_SECRET = os.environ.get('PROFILE_SECRET', '')
+# Longest lifetime a signed "profile" token may have
+PROFILE_TOKEN_MAX_SECONDS = int(os.environ.get('PROFILE_TOKEN_MAX_SECONDS', '900'))
+
+# Raw profiles are written to PROFILE_DIR, then moved to s3://PROFILE_BUCKET/<uid>/profiles/
+# when set (deleted otherwise; the response carries the summary)
+PROFILE_DIR = os.environ.get('PROFILE_DIR', '/tmp')
+PROFILE_BUCKET = os.environ.get('PROFILE_BUCKET', '')
+
+PROFILE_RUNS = int(os.environ.get('PROFILE_RUNS', '5'))
+
+
+def sign_profile_request(uid: str, model_name: str, expires: int, secret: str = None) -> str:
+    """
+    Token a caller sends as "profile" to profile one request
+
+    Args:
+        expires: Unix time after which the token is rejected
+
+    Returns:
+        "<expires>.<hex HMAC-SHA256 of uid/model_name/expires>"
+    """
+    key = (secret if secret is not None else PROFILE_SECRET).encode('utf-8')
+    payload = f"{uid}/{model_name}/{int(expires)}".encode('utf-8')
+    return f"{int(expires)}.{hmac.new(key, payload, hashlib.sha256).hexdigest()}"
+
+
+def profiling_requested(body: dict, uid: str, model_name: str) -> bool:
+    """
+    Should this request run through a profiling session?
+
+    True when profiling is on for all models or this model, or when the
+    request carries a valid, unexpired token in its "profile" field.
+    Tokens valid for longer than PROFILE_TOKEN_MAX_SECONDS are rejected,
+    so a leaked token cannot be replayed indefinitely.
+    """
+    if PROFILE_ALL or model_name in PROFILE_MODELS:
+        return True
+
+    token = body.get('profile')
+    if not PROFILE_SECRET or not isinstance(token, str):
+        return False
+    expires, _, _ = token.partition('.')
+    if not expires.isdigit():
+        return False
+    remaining = int(expires) - time.time()
+    if remaining <= 0 or remaining > PROFILE_TOKEN_MAX_SECONDS:
+        return False
+    return hmac.compare_digest(token, sign_profile_request(uid, model_name, int(expires)))
+
+
+def summarize_profile(profile_path: str, top: int = 10) -> dict:
+    """
+    Aggregate an ORT profile JSON into time per operator type
+
+    Args:
+        profile_path: File returned by InferenceSession.end_profiling()
+        top: Number of op types to keep in the summary
+
+    Returns:
+        {"total_us", "ops": [{"op", "calls", "total_us", "pct"}], "top_nodes": [...]}
+    """
+    with open(profile_path) as f:
+        events = json.load(f)
+
+    by_op = {}
+    by_node = {}
+    for event in events:
+        if event.get('cat') != 'Node' or not event.get('name', '').endswith('_kernel_time'):
+            continue
+        op = event.get('args', {}).get('op_name', 'unknown')
+        node = event['name'][:-len('_kernel_time')]
+        dur = event.get('dur', 0)
+
+        calls, total = by_op.get(op, (0, 0))
+        by_op[op] = (calls + 1, total + dur)
+        by_node[node] = by_node.get(node, 0) + dur
+
+    total_us = sum(total for _, total in by_op.values())
+    ops = [
+        {
+            'op': op,
+            'calls': calls,
+            'total_us': total,
+            'pct': round(100.0 * total / total_us, 1) if total_us else 0.0,
+        }
+        for op, (calls, total) in sorted(by_op.items(), key=lambda item: -item[1][1])
+    ]
+    top_nodes = sorted(by_node.items(), key=lambda item: -item[1])[:top]
+
+    return {
+        'total_us': total_us,
+        'ops': ops[:top],
+        'top_nodes': [{'node': node, 'total_us': dur} for node, dur in top_nodes],
+    }
+
+
+def profile_inference(model_bytes: bytes, feeds: dict, runs: int = None) -> tuple:
+    """
+    Run a model under a profiling-enabled session and summarize it
+
+    The session is created for this call only and dropped afterwards, so the
+    cached serving session never pays the profiling overhead.
+
+    Args:
+        model_bytes: Serialized ONNX model, or the path of one (models with external data)
+        feeds: Input name -> array, as for session.run
+        runs: Number of profiled runs (default PROFILE_RUNS); the first one
+              includes kernel setup, so its nodes show up as slower calls
+
+    Returns:
+        (summary, profile_path)
+    """
+    import onnxruntime as ort
+
+    options = ort.SessionOptions()
+    options.enable_profiling = True
+    options.profile_file_prefix = os.path.join(PROFILE_DIR, f"ort_profile_{int(time.time() * 1000)}")
+
+    runs = PROFILE_RUNS if runs is None else max(runs, 1)
+    session = ort.InferenceSession(model_bytes, options, providers=['CPUExecutionProvider'])
+    for _ in range(runs):
+        session.run(None, feeds)
+    profile_path = session.end_profiling()
+
+    summary = summarize_profile(profile_path)
+    summary['runs'] = runs
+    return summary, profile_path
+
+
+def upload_profile(s3_client, uid: str, model_name: str, profile_path: str) -> str:
+    """
+    Move a raw profile to s3://PROFILE_BUCKET/<uid>/profiles/ when configured
+
+    The local file is removed either way (without a bucket only its summary
+    is kept), so /tmp does not fill up with profiles across warm invocations.
+
+    Returns:
+        The S3 URI, or None if no bucket is configured
+    """
+    try:
+        if not PROFILE_BUCKET:
+            return None
+        key = f"{uid}/profiles/{model_name}/{os.path.basename(profile_path)}"
+        s3_client.upload_file(profile_path, PROFILE_BUCKET, key)
+        return f"s3://{PROFILE_BUCKET}/{key}"
+    finally:
+        try:
+            os.remove(profile_path)
+        except OSError:
+            pass
@@ -0,0 +1,99 @@
+"""
+Background freshness checks for cached models (stale-while-revalidate)
+Requests keep serving the loaded version while a re-upload is picked up
+"""
+
+import os
+import threading
+import time
+from collections import deque
+
+# Seconds a model is served before its object is checked again (0 disables checks)
+MODEL_REVALIDATE_SECONDS = float(os.environ.get('MODEL_REVALIDATE_SECONDS', '60'))
+
+MAX_TRACKED_KEYS = 4096
+
+
+class Revalidator:
+    """
+    Re-checks models on a background thread once their last check is stale
+
+    The handler calls touch(key) on every request. A key checked more than
+    interval seconds ago is queued for check(key), which runs on the
+    revalidation thread and returns a status string ("unchanged",
+    "reloaded", ...) counted in stats(). The request that noticed the
+    staleness is served from what is loaded; only later requests see a new
+    version, once check() has swapped it in. A failing check() is retried
+    after the next interval.
+
+    Only models that are being requested are checked, so an idle instance
+    makes no HEAD calls. On Lambda the environment is frozen between
+    invocations; a check started by one request finishes while the
+    instance runs the next ones.
+    """
+
+    def __init__(self, check, interval: float = MODEL_REVALIDATE_SECONDS):
+        self.check = check
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.wakeup = threading.Condition(self.lock)
+        self.checked = {}
+        self.queue = deque()
+        self.queued = set()
+        self.thread = None
+        self.counters = {'checks': 0, 'failures': 0}
+
+    def touch(self, key) -> None:
+        """Note that key is being served; queue a check when the last one is stale"""
+        now = time.monotonic()
+        checked_at = self.checked.get(key)
+        if checked_at is None:
+            # Just resolved: as fresh as a check
+            if len(self.checked) >= MAX_TRACKED_KEYS:
+                self.checked.clear()
+            self.checked[key] = now
+            return
+        if now - checked_at < self.interval or key in self.queued:
+            return
+
+        with self.lock:
+            if key in self.queued:
+                return
+            self.queued.add(key)
+            self.queue.append(key)
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, name='weave-revalidate', daemon=True)
+                self.thread.start()
+            self.wakeup.notify()
+
+    def run(self) -> None:
+        while True:
+            with self.lock:
+                while not self.queue:
+                    self.wakeup.wait()
+                key = self.queue.popleft()
+
+            try:
+                status = self.check(key)
+            except Exception:
+                status = 'failures'
+
+            with self.lock:
+                self.counters['checks'] += 1
+                self.counters[status] = self.counters.get(status, 0) + 1
+                self.checked[key] = time.monotonic()
+                self.queued.discard(key)
+
+    def forget(self, key) -> None:
+        """Drop key's check time (its next touch() counts as freshly resolved)"""
+        self.checked.pop(key, None)
+
+    def clear(self) -> None:
+        self.checked.clear()
+
+    def stats(self) -> dict:
+        with self.lock:
+            stats = dict(self.counters)
+            stats['tracked'] = len(self.checked)
+            stats['queued'] = len(self.queue)
+        return stats
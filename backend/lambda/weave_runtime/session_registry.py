@@ -0,0 +1,200 @@
+"""
+Loaded models shared by every request thread in a process
+Lookups are lock-free; only loads and evictions take the registry lock
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from contextlib import contextmanager
+
+# Models kept loaded at once (Lambda serves one model per instance; threaded hosts may want more)
+MAX_CACHED_MODELS = int(os.environ.get('MAX_CACHED_MODELS', '1'))
+# Extra sessions prefetched ahead of use, held outside MAX_CACHED_MODELS until requested
+PREFETCH_SLOTS = int(os.environ.get('PREFETCH_SLOTS', '1'))
+
+
+class LoadedModel:
+    """
+    A session with its manifest and a pool of execution contexts
+
+    Published to the registry fully built and never mutated afterwards,
+    except for the context pool. Request threads share the session (ONNX
+    Runtime and NumpySession both allow concurrent run() calls) but each
+    checks out its own ExecutionContext, since bound buffers are per-run
+    state.
+    """
+
+    __slots__ = ('key', 'session', 'manifest', 'make_context', 'contexts', 'loaded_at', 'last_used')
+
+    def __init__(self, key: str, session, manifest: dict, context=None, make_context=None):
+        """
+        Args:
+            key: Content key the model is published under
+            context: First execution context (built during warmup), or None
+                     when the model can't use one
+            make_context: Builds another context when all are checked out
+        """
+        self.key = key
+        self.session = session
+        self.manifest = manifest
+        self.make_context = make_context if context is not None else None
+        self.contexts = deque([context] if context is not None else [])
+        self.loaded_at = self.last_used = time.monotonic()
+
+    @contextmanager
+    def execution_context(self):
+        """
+        Check out an idle ExecutionContext (None when the model runs without one)
+
+        Single-threaded callers reuse the same context every time; concurrent
+        callers get one each, created on demand. Arrays a context returns are
+        overwritten by its next run, so copy them before the block exits.
+        """
+        if self.make_context is None:
+            yield None
+            return
+
+        try:
+            context = self.contexts.pop()
+        except IndexError:
+            context = self.make_context()
+        try:
+            yield context
+        finally:
+            if context is not None:
+                self.contexts.append(context)
+
+
+class SessionRegistry:
+    """
+    Thread-safe cache of LoadedModels keyed by model content
+
+    get() is a plain dict read, so warm requests never contend. A miss goes
+    through get_or_load(): concurrent misses on one key share a single load
+    while the other threads wait on it, and loads of different keys run in
+    parallel. Evicted models stay usable by threads already running them;
+    the session is freed when the last of them drops its reference.
+
+    Prefetched models that don't fit go to up to max_staged staging slots
+    instead of evicting a model in use; the first get() moves them in.
+    """
+
+    def __init__(self, max_models: int = MAX_CACHED_MODELS, max_staged: int = PREFETCH_SLOTS):
+        self.max_models = max(1, max_models)
+        self.max_staged = max(0, max_staged)
+        self.lock = threading.Lock()
+        self.models = {}
+        self.staged = {}
+        self.loading = {}
+        self.loads = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> LoadedModel:
+        """The loaded model for a content key, or None"""
+        model = self.models.get(key)
+        if model is None and self.staged:
+            with self.lock:
+                return self._get_locked(key)
+        if model is not None:
+            model.last_used = time.monotonic()
+        return model
+
+    def _get_locked(self, key: str) -> LoadedModel:
+        """get() with the lock held (never re-takes it): a staged model is moved in"""
+        model = self.models.get(key) or self.staged.pop(key, None)
+        if model is not None:
+            # Refreshed before _evict() so a promoted model isn't the victim
+            model.last_used = time.monotonic()
+            if key not in self.models:
+                self.models[key] = model
+                self._evict()
+        return model
+
+    def get_or_load(self, key: str, loader, prefetch: bool = False) -> tuple:
+        """
+        The model for key, loading it with loader() on a miss
+
+        loader() returns a LoadedModel, or None when there is nothing to
+        cache (e.g. the model doesn't exist). The model is published under
+        its own key, which may differ from the requested one. An exception
+        from loader() is raised in every thread waiting on that load.
+
+        With prefetch=True and the registry full, the model is staged rather
+        than evicting one in use (see can_prefetch()).
+
+        Returns:
+            (model or None, loaded): loaded is True in the thread that ran loader()
+        """
+        model = self.get(key)
+        if model is not None:
+            return model, False
+
+        with self.lock:
+            model = self._get_locked(key)
+            if model is not None:
+                return model, False
+            pending = self.loading.get(key)
+            leader = pending is None
+            if leader:
+                pending = self.loading[key] = Future()
+
+        if not leader:
+            return pending.result(), False
+
+        try:
+            model = loader()
+        except BaseException as e:
+            with self.lock:
+                del self.loading[key]
+            pending.set_exception(e)
+            raise
+
+        with self.lock:
+            del self.loading[key]
+            self.loads += 1
+            if model is not None:
+                if prefetch and len(self.models) >= self.max_models:
+                    self.staged[model.key] = model
+                    while len(self.staged) > self.max_staged:
+                        del self.staged[next(iter(self.staged))]
+                        self.evictions += 1
+                else:
+                    self.models[model.key] = model
+                    self._evict()
+        pending.set_result(model)
+        return model, True
+
+    def can_prefetch(self) -> bool:
+        """Is there a free slot or a staging slot for a prefetched model?"""
+        with self.lock:
+            return len(self.models) < self.max_models or self.max_staged > 0
+
+    def __contains__(self, key: str) -> bool:
+        """Is the key loaded or staged? (unlike get(), doesn't count as a use)"""
+        return key in self.models or key in self.staged
+
+    def _evict(self) -> None:
+        """Drop least recently used models beyond max_models (lock held)"""
+        while len(self.models) > self.max_models:
+            victim = min(self.models.values(), key=lambda m: m.last_used)
+            del self.models[victim.key]
+            self.evictions += 1
+
+    def clear(self) -> None:
+        with self.lock:
+            self.models = {}
+            self.staged = {}
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {
+                'models': sorted(self.models),
+                'staged': sorted(self.staged),
+                'loading': len(self.loading),
+                'loads': self.loads,
+                'evictions': self.evictions,
+                'contexts': {key: len(model.contexts) for key, model in self.models.items()},
+            }
@@ -0,0 +1,93 @@
+"""
+Per-stage request timers built on time.perf_counter_ns
+Each mark() charges the time since the previous mark to a named stage
+"""
+
+import os
+from time import perf_counter_ns
+
+# Set STAGE_TIMINGS=0 to swap in the no-op timer unless a request asks for timings
+STAGE_TIMINGS_ENABLED = os.environ.get('STAGE_TIMINGS', '1') != '0'
+
+
+class StageTimer:
+    """
+    Lap timer for one request
+
+    Usage:
+        timer = StageTimer()
+        body = parse(event)
+        timer.mark('parse')
+        output = session.run(...)
+        timer.mark('inference')
+        timer.as_ms()   # {'parse': 0.012, 'inference': 0.41, 'total': 0.422}
+
+    Marking the same stage twice accumulates, so loops can charge several
+    laps to one stage.
+    """
+
+    __slots__ = ('start_ns', 'last_ns', 'stages')
+
+    enabled = True
+
+    def __init__(self):
+        self.start_ns = self.last_ns = perf_counter_ns()
+        self.stages = {}
+
+    def mark(self, stage: str) -> None:
+        """Charge the time since the last mark to `stage`"""
+        now = perf_counter_ns()
+        self.stages[stage] = self.stages.get(stage, 0) + (now - self.last_ns)
+        self.last_ns = now
+
+    def skip(self) -> None:
+        """Drop the time since the last mark (it isn't charged to any stage)"""
+        self.last_ns = perf_counter_ns()
+
+    def total_ns(self) -> int:
+        """Nanoseconds since the timer was created"""
+        return perf_counter_ns() - self.start_ns
+
+    def as_ms(self, precision: int = 3) -> dict:
+        """Stage durations in milliseconds, plus the running total"""
+        timings = {stage: round(ns / 1e6, precision) for stage, ns in self.stages.items()}
+        timings['total'] = round(self.total_ns() / 1e6, precision)
+        return timings
+
+    def server_timing(self) -> str:
+        """Stages formatted as a Server-Timing header value"""
+        return ', '.join(f"{stage};dur={ns / 1e6:.3f}" for stage, ns in self.stages.items())
+
+
+class NullTimer:
+    """Drop-in StageTimer that records nothing"""
+
+    __slots__ = ()
+
+    enabled = False
+    stages = {}
+
+    def mark(self, stage: str) -> None:
+        pass
+
+    def skip(self) -> None:
+        pass
+
+    def total_ns(self) -> int:
+        return 0
+
+    def as_ms(self, precision: int = 3) -> dict:
+        return {}
+
+    def server_timing(self) -> str:
+        return ''
+
+
+NULL_TIMER = NullTimer()
+
+
+def start_timer(requested: bool = False):
+    """A running StageTimer, or the shared no-op timer when timings are off"""
+    if STAGE_TIMINGS_ENABLED or requested:
+        return StageTimer()
+    return NULL_TIMER